@@ -0,0 +1,120 @@
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+
+#-----------------------------------------------------------------------------------------------------------------------
+# module _logger, the configuration of logging handlers and levels is left to the application
+_logger = logging.getLogger(__name__)
+
+#-----------------------------------------------------------------------------------------------------------------------
+# for each index the modules containing the numba kernels it uses, each with the kernels which are called from 
+# Python code mapped to the signatures of these calls, the kernels called by these kernels are compiled along with 
+# them, and the numba.vectorize kernels are compiled from their own explicit signatures when the module is imported
+_PALMER_KERNELS = {'_water_balance_cell': ['(float64, ' + ', '.join(['float64[::1]'] * 9) + ')'],
+                   '_water_balance_grid': ['(float64[::1], float64[:, ::1], float64[:, ::1])'],
+                   '_pdsi_from_zindex_cell': ['(float64[::1], float64[::1], float64[::1], float64[::1])'],
+                   '_pdsi_from_zindex_grid': ['(float64[:, ::1],)'],
+                   '_self_calibrate': ['(float64[::1], float64[::1], int64, int64, int64, float64[::1])'],
+                   '_self_calibrate_grid': ['(float64[:, ::1], float64[:, ::1], int64, int64, int64, float64[:, ::1])']}
+_INDEX_KERNELS = {'spi': {'compute': {}},
+                  'spei': {'compute': {}},
+                  'pnp': {},
+                  'pet': {},
+                  'palmers': {'palmer': _PALMER_KERNELS},
+                  'scaled': {'compute': {}}}
+
+#-----------------------------------------------------------------------------------------------------------------------
+def warmup(indices=None):
+    '''
+    Compiles the numba kernels used by the computations of the specified indices, against the explicit signatures 
+    of their calls. The kernels are compiled with caching enabled, so the compiled code is also written to the 
+    on-disk cache, where it's picked up by later processes rather than being compiled again. This is useful before 
+    starting a pool of worker processes, or as part of an installation step. Failures to compile are logged rather 
+    than raised, in which case the kernels are compiled (or fail) when first used.
+
+    Kernels with parallel loops are compiled in a separate Python process rather than in this one. Compiling 
+    these starts numba's threading layer, and some threading layers (for example TBB) leave a process that forks 
+    afterwards unable to exit. This keeps the calling process safe to fork, for example to start a pool of worker 
+    processes, which then load the parallel kernels from the on-disk cache.
+
+    :param indices: names of the indices for which kernels should be compiled, any of 'spi', 'spei', 'pnp', 'pet', 
+                    'palmers', and 'scaled' (SPI, SPEI, and PNP), or None for all indices
+    '''
+
+    if indices is None:
+        indices = list(_INDEX_KERNELS.keys())
+
+    # get the kernels of each module used by any of the indices
+    modules_kernels = {}
+    for index in indices:
+        if index not in _INDEX_KERNELS:
+            message = 'Unsupported index argument: {0}'.format(index)
+            _logger.error(message)
+            raise ValueError(message)
+        for module_name, kernels in _INDEX_KERNELS[index].items():
+            modules_kernels.setdefault(module_name, {}).update(kernels)
+
+    # nothing is compiled when numba's JIT compilation is disabled, for example when debugging
+    import numba
+    if numba.config.DISABLE_JIT:
+        return
+
+    # compile the kernels without parallel loops in this process
+    parallel_kernels = _compile_kernels(modules_kernels, parallel=False)
+    if not parallel_kernels:
+        return
+
+    # compile the kernels with parallel loops in a new Python process, writing these to the on-disk cache, 
+    # the process imports this package from the same location as this process
+    code = 'import json, sys; sys.path.insert(0, sys.argv[1]); import climate_indices; ' + \
+           'climate_indices._compile_kernels(json.loads(sys.argv[2]), True)'
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        exit_code = subprocess.call([sys.executable, '-c', code, package_parent, json.dumps(parallel_kernels)])
+        if exit_code != 0:
+            _logger.warning('Failed to compile the parallel kernels, process exit code: %s', exit_code)
+    except Exception:
+        _logger.warning('Failed to compile the parallel kernels', exc_info=True)
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _compile_kernels(modules_kernels, 
+                     parallel):
+    '''
+    Compiles either the kernels without parallel loops or those with parallel loops, against the explicit 
+    signatures of their calls. Failures to compile are logged rather than raised.
+
+    :param modules_kernels: dictionary of module names to dictionaries of kernel names to signatures
+    :param parallel: whether to compile the kernels with parallel loops rather than those without
+    :return: the kernels which weren't compiled because these are of the other kind, 
+             in the same form as the modules_kernels argument
+    :rtype: dictionary of strings to dictionaries of strings to lists of strings
+    '''
+
+    other_kernels = {}
+    for module_name, kernels in modules_kernels.items():
+
+        # importing the module compiles its numba.vectorize kernels
+        try:
+            module = importlib.import_module('climate_indices.' + module_name)
+        except Exception:
+            _logger.warning('Failed to compile the kernels of module %s', module_name, exc_info=True)
+            continue
+
+        for kernel_name, signatures in kernels.items():
+
+            kernel = getattr(module, kernel_name)
+            if bool(kernel.targetoptions.get('parallel')) != parallel:
+                other_kernels.setdefault(module_name, {})[kernel_name] = signatures
+                continue
+
+            for signature in signatures:
+                try:
+                    kernel.compile(signature)
+                except Exception:
+                    _logger.warning('Failed to compile kernel %s.%s%s', module_name, kernel_name, signature, 
+                                    exc_info=True)
+
+    return other_kernels
@@ -1,12 +1,16 @@
+'''
+Distribution fitting, transformation, and scaling computations used for the climate indices.
+
+SciPy is imported within the functions using it rather than at module level, so that it's only loaded when used.
+'''
 #import lmoments3  """ Use this once it works with a more recent version of numpy """
 from enum import Enum
 import logging
 import math
+import os
 from math import exp, lgamma, pi, sqrt
 import numba
 import numpy as np
-import scipy.special
-import scipy.stats
 
 from climate_indices import utils
 
@@ -27,20 +31,23 @@ class Periodicity(Enum):
     daily = 366
 
 #-----------------------------------------------------------------------------------------------------------------------
-# set up a basic, global _logger
-logging.basicConfig(level=logging.WARN,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    datefmt='%Y-%m-%d  %H:%M:%S')
+# module _logger, the configuration of logging handlers and levels is left to the application
 _logger = logging.getLogger(__name__)
 
+# numba target for the compiled Pearson Type III fitting ufunc, set the environment variable to 'parallel' 
+# in order to spread large arrays over all cores, the default of 'cpu' is best when running one process per core
+_PEARSON_FIT_TARGET = os.environ.get('CLIMATE_INDICES_PEARSON_TARGET', 'cpu')
+
+# numba target for the compiled gamma fitting ufunc, as above
+_GAMMA_FIT_TARGET = os.environ.get('CLIMATE_INDICES_GAMMA_TARGET', 'cpu')
+
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def sum_to_scale(values,
                  scale):
     '''
-    Compute a sliding sums array using 1-D convolution. The initial (scale - 1) elements 
-    of the result array will be padded with np.NaN values. Missing values are not ignored, i.e. if a np.NaN
-    (missing) value is part of the group of values to be summed then the sum will be np.NaN
+    Compute a sliding sums array, from a cumulative sum along the time axis as with sum_to_scales(). The initial 
+    (scale - 1) elements of the result array will be padded with np.NaN values. Missing values are not ignored, 
+    i.e. if a np.NaN (missing) value is part of the group of values to be summed then the sum will be np.NaN
     
     For example if the first array is [3, 4, 6, 2, 1, 3, 5, 8, 5] and the number of values to sum is 3 then the resulting
     array will be [np.NaN, np.NaN, 13, 12, 9, 6, 9, 16, 18].
@@ -53,25 +60,86 @@ def sum_to_scale(values,
     Y[i] == sum(X[i - n + 1:i + 1]), where i >= n - 1 and X[i - n + 1:i + 1] contains no NaN values
     Y[i] == np.NaN, where i >= n - 1 and X[i - n + 1:i + 1] contains one or more NaN values
          
-    :param values: the array of values over which we'll compute sliding sums
+    :param values: the array of values over which we'll compute sliding sums, for arrays with more than one
+                   dimension the sums are computed along the final (time) axis, for example a 2-D array with
+                   shape (cells, time) will result in sliding sums computed for each cell's time series
     :param scale: the number of values for which each sliding summation will encompass, for example if this value
-                  is 3 then the first two elements of the output array will contain the pad value and the third 
-                  element of the output array will contain the sum of the first three elements, and so on 
-    :return: an array of sliding sums, equal in length to the input values array, left padded with NaN values  
+                  is 3 then the first two elements of the output array will contain the pad value and the third
+                  element of the output array will contain the sum of the first three elements, and so on
+    :return: an array of sliding sums, equal in shape to the input values array, left padded with NaN values
     '''
-    
+
     # don't bother if the number of values to sum is 1 (will result in duplicate array)
     if scale == 1:
         return values
+
+    return sum_to_scales(values, [scale])[0]
+
+#-----------------------------------------------------------------------------------------------------------------------
+def sum_to_scales(values,
+                  scales):
+    '''
+    Compute sliding sums arrays for several scales from a single cumulative sum pass over the values, rather 
+    than a separate summation over the values for each scale. The result for each scale is as described for 
+    sum_to_scale(), i.e. the initial (scale - 1) elements are padded with np.NaN values, and a sum over a group 
+    of values which includes a np.NaN (missing) value is np.NaN.
+
+    Each sum is the difference of two cumulative sums, so sums can differ from a direct summation of the values 
+    by a floating point rounding error, except that a sum over a group of only zero values is always exactly zero 
+    and the sums at a scale of 1 are the values themselves.
+
+    :param values: the array of values over which we'll compute sliding sums, for arrays with more than one
+                   dimension the sums are computed along the final (time) axis, for example a 2-D array with
+                   shape (cells, time) will result in sliding sums computed for each cell's time series
+    :param scales: the numbers of values for which each sliding summation will encompass, see sum_to_scale()
+    :return: an array of sliding sums with shape (scales, ...), i.e. the sliding sums for each scale stacked 
+             along a new leading axis, each equal in shape to the input values array and left padded with NaN 
+             values, 32-bit floats for 32-bit float values and otherwise 64-bit floats
+    :rtype: numpy.ndarray of floats
+    '''
+
+    # validate the scales
+    for scale in scales:
+        if scale < 1:
+            message = 'Invalid scale argument: {0} -- scales must be at least 1'.format(scale)
+            _logger.error(message)
+            raise ValueError(message)
+
+    # the cumulative sums are taken with 64-bit floats, since the rounding error of 
+    # a long cumulative sum of 32-bit floats would swamp the differences of these
+    original_values = np.asarray(values)
+    values = original_values.astype(np.float64)
+    missings = np.isnan(values)
     
-    # get the valid sliding summations with 1D convolution
-    sliding_sums = np.convolve(values, np.ones(scale), mode='valid')
-    
-    # pad the first (n - 1) elements of the array with NaN values
-    return np.hstack(([np.NaN]*(scale - 1), sliding_sums))
+    # get the cumulative sums along the time axis, prepended with a zero so that the sum of the values 
+    # from i to j is the difference of the cumulative sums at j + 1 and i, with missing values counted rather 
+    # than summed, and with nonzero values counted so that a sum of only zeros can be set to exactly zero
+    padding = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    cumulative_sums = np.pad(np.cumsum(np.where(missings, 0.0, values), axis=-1), padding, mode='constant')
+    cumulative_missings = np.pad(np.cumsum(missings, axis=-1), padding, mode='constant')
+    cumulative_nonzeros = np.pad(np.cumsum(values != 0.0, axis=-1), padding, mode='constant')
+
+    # allocate the stacked sums for all scales, with the first (scale - 1) elements of the time axis left as NaNs
+    scaled_values = np.full((len(scales),) + values.shape, np.NaN, dtype=utils.float_type(original_values))
+
+    time_length = values.shape[-1]
+    for scale_index, scale in enumerate(scales):
+
+        # the sums at a scale of 1 are the values themselves, so use these rather than the cumulative sum differences
+        if scale == 1:
+            scaled_values[scale_index] = original_values
+            
+        # get the valid sliding sums, if the time series is long enough to have any
+        elif time_length >= scale:
+            
+            valid_sums = cumulative_sums[..., scale:] - cumulative_sums[..., :-scale]
+            valid_sums[(cumulative_nonzeros[..., scale:] - cumulative_nonzeros[..., :-scale]) == 0] = 0.0
+            valid_sums[(cumulative_missings[..., scale:] - cumulative_missings[..., :-scale]) > 0] = np.NaN
+            scaled_values[scale_index, ..., scale - 1:] = valid_sums
+            
+    return scaled_values
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _estimate_pearson3_parameters(lmoments):    
     '''
     Estimate parameters via L-moments for the Pearson Type III distribution, based on Fortran code written 
@@ -132,7 +200,6 @@ def _estimate_pearson3_parameters(lmoments):
     return pearson3_parameters
 
 #-----------------------------------------------------------------------------------------------------------------------    
-@numba.jit
 def _estimate_lmoments(values):
     '''
     Estimate sample L-moments, based on Fortran code written for inclusion in IBM Research Report RC20525,
@@ -201,30 +268,126 @@ def _estimate_lmoments(values):
     return lmoments
     
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+def _estimate_lmoments_grid(values):
+    '''
+    Estimate sample L-moments for many samples at once, as an array equivalent of _estimate_lmoments(). The samples
+    are along the first axis of the values array, for example the years of a (years, steps, cells) array of values, 
+    and the L-moments are computed from the unbiased sample probability weighted moments of the sorted values.
+    
+    :param values: N-D array of float values, with missing values as NaNs
+    :return: the first three sample L-moments (lambda-1, lambda-2, and tau-3) of each sample, each with the shape 
+             of the values array without its first axis, with all three equal to zero where lambda-2 is zero, 
+             and NaN where there are fewer than four non-missing values
+    :rtype: three numpy.ndarray objects of floats
+    '''
+    
+    # sort the values of each sample into ascending order, with missing values sorted to the end
+    values = np.sort(values, axis=0)
+    number_of_values = np.count_nonzero(~np.isnan(values), axis=0).astype(np.float64)
+    values = np.where(np.isnan(values), 0.0, values)
+    
+    # the ranks of the sorted values, as a column that broadcasts against the values
+    ranks = np.arange(values.shape[0], dtype=np.float64).reshape((-1,) + (1,) * (values.ndim - 1))
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        # get the first three probability weighted moments, the missing values 
+        # sorted to the end have been replaced by zeros, so don't contribute
+        n = np.where(number_of_values < 4, np.NaN, number_of_values)
+        b0 = np.sum(values, axis=0) / n
+        b1 = np.sum(ranks * values, axis=0) / (n * (n - 1))
+        b2 = np.sum(ranks * (ranks - 1) * values, axis=0) / (n * (n - 1) * (n - 2))
+    
+        # get the L-moments from the probability weighted moments
+        lambda_1 = b0
+        lambda_2 = (2 * b1) - b0
+        tau_3 = ((6 * b2) - (6 * b1) + b0) / lambda_2
+
+    # the L-moments are all zeros where lambda-2 is zero
+    zero_lambda_2 = (lambda_2 == 0)
+    lambda_1[zero_lambda_2] = 0.0
+    tau_3[zero_lambda_2] = 0.0
+    
+    return lambda_1, lambda_2, tau_3
+    
+#-----------------------------------------------------------------------------------------------------------------------
+def _estimate_pearson3_parameters_grid(lambda_1, 
+                                       lambda_2,
+                                       tau_3):
+    '''
+    Estimate parameters via L-moments for the Pearson Type III distribution for many sets of L-moments at once, 
+    as an array equivalent of _estimate_pearson3_parameters(). The L-moments are expected to be valid, i.e. 
+    lambda-2 > 0 and abs(tau-3) < 1, with NaN parameters resulting where these are not.
+    
+    :param lambda_1: array of the first L-moments
+    :param lambda_2: array of the second L-moments
+    :param tau_3: array of the third L-moment ratios (L-skewness)
+    :return the Pearson Type III parameters (location, scale, and skew) corresponding to the input L-moments,
+            each with the same shape as the L-moments arrays
+    :rtype: three numpy.ndarray objects of floats
+    '''
+    
+    import scipy.special
+
+    C1 = 0.2906
+    C2 = 0.1882
+    C3 = 0.0442
+    D1 = 0.36067
+    D2 = -0.59567
+    D3 = 0.25361
+    D4 = -2.78861
+    D5 = 2.56096
+    D6 = -0.77045
+    T3 = np.abs(tau_3)
+    
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+        # get the alpha for each set of L-moments, using the rational approximation corresponding to the L-skewness
+        T = pi * 3 * T3 * T3
+        alpha_low_skew = (1.0 + (C1 * T)) / (T * (1.0 + (T * (C2 + (T * C3)))))
+        T = 1.0 - T3
+        alpha_high_skew = T * (D1 + (T * (D2 + (T * D3)))) / (1.0 + (T * (D4 + (T * (D5 + (T * D6))))))
+        alpha = np.where(T3 < 0.333333333, alpha_low_skew, alpha_high_skew)
+        
+        alpha_root = np.sqrt(alpha)
+        beta = sqrt(pi) * lambda_2 * np.exp(scipy.special.gammaln(alpha) - scipy.special.gammaln(alpha + 0.5))
+        
+        # where the skewness is effectively zero the scale is simply related to 
+        # the second L-moment, and the sign of the third L-moment determines 
+        # the sign of the third Pearson Type III parameter
+        skewless = (T3 <= 1e-6)
+        scales = np.where(skewless, lambda_2 * sqrt(pi), beta * alpha_root)
+        skews = np.where(skewless, 0.0, np.where(tau_3 < 0, -2.0, 2.0) / alpha_root)
+        
+    # the first Pearson Type III parameter is the same as the first L-moment
+    locs = np.where(np.isnan(scales), np.NaN, lambda_1)
+        
+    return locs, scales, skews
+
+#-----------------------------------------------------------------------------------------------------------------------
 def _pearson3_fitting_values(values):
     """
     This function computes the probability of zero and Pearson Type III distribution parameters 
-    corresponding to an array of values.
+    corresponding to an array of values. The L-moments and parameters are computed for all calendar time steps 
+    (and cells) at once using array operations, rather than a calendar time step at a time.
     
     :param values: 2-D array of values, with each row representing a year containing either 12 values corresponding 
                    to the calendar months of that year, or 366 values corresponding to the days of the year 
                    (with Feb. 29th being an average of the Feb. 28th and Mar. 1st values for non-leap years)
                    and assuming that the first value of the array is January of the initial year for an input array 
-                   of monthly values or Jan. 1st of initial year for an input array daily values
-    :param data_start_year: the initial year of the input values array
-    :param calibration_start_year: the initial year to use for the calibration period 
-    :param calibration_end_year: the final year to use for the calibration period 
-    :return: a 2-D array of fitting values for the Pearson Type III distribution, with shape (4, 12) for monthly 
-             or (4, 366) for daily
+                   of monthly values or Jan. 1st of initial year for an input array daily values, or a 3-D array of 
+                   values with shape (years, 12|366, cells) for computing the fitting values of many cells at once
+    :return: an array of fitting values for the Pearson Type III distribution, with shape (4, 12) for monthly 
+             or (4, 366) for daily, or (4, 12|366, cells) for 3-D input
              returned_array[0] == probability of zero for each of the calendar time steps 
              returned_array[1] == the first Pearson Type III distribution parameter for each of the calendar time steps 
              returned_array[2] == the second Pearson Type III distribution parameter for each of the calendar time steps 
              returned_array[3] == the third Pearson Type III distribution parameter for each of the calendar time steps 
     """
     
-    # validate that the values array has shape: (years, 12) for monthly or (years, 366) for daily
-    if len(values.shape) != 2:
+    # validate that the values array has shape: (years, 12) for monthly or (years, 366) for daily, 
+    # or (years, 12, cells) for monthly or (years, 366, cells) for daily
+    if len(values.shape) not in (2, 3):
         message = 'Invalid shape of input data array: {0}'.format(values.shape)
         _logger.error(message)
         raise ValueError(message)
@@ -237,92 +400,73 @@ def _pearson3_fitting_values(values):
             _logger.error(message)
             raise ValueError(message)
 
-    # the values we'll compute and return
-    fitting_values = np.zeros((4, time_steps_per_year))
-
-    # compute the probability of zero and Pearson parameters for each calendar time step
-    #TODO vectorize the below loop? create a @numba.vectorize() ufunc for application over the second axis of the values
-    for time_step_index in range(time_steps_per_year):
-    
-        # get the values for the current calendar time step
-        time_step_values = values[:, time_step_index]
-
-        # count the number of zeros and valid (non-missing/non-NaN) values
-        number_of_zeros, number_of_non_missing = utils.count_zeros_and_non_missings(time_step_values)
+    values = np.asarray(values, dtype=np.float64)
 
-        # make sure we have at least four values that are both non-missing (i.e. non-NaN)
-        # and non-zero, otherwise use the entire period of record
-        if (number_of_non_missing - number_of_zeros) < 4:
-             
-            # we can't proceed, bail out using zeros
-            return fitting_values
-         
-        # calculate the probability of zero for the calendar time step
-        probability_of_zero = 0.0
-        if number_of_zeros > 0:
+    # count the number of zeros and valid (non-missing/non-NaN) values for each calendar time step
+    number_of_zeros = np.count_nonzero(values == 0.0, axis=0)
+    number_of_non_missing = np.count_nonzero(~np.isnan(values), axis=0)
 
-            probability_of_zero = number_of_zeros / number_of_non_missing
-            
-        # get the estimated L-moments, if we have more than three non-missing/non-zero values
-        if (number_of_non_missing - number_of_zeros) > 3:
-
-            # estimate the L-moments of the calibration values
-            lmoments = _estimate_lmoments(time_step_values)
-
-            # if we have valid L-moments then we can proceed, otherwise 
-            # the fitting values for the time step will be all zeros
-            if (lmoments[1] > 0.0) and (abs(lmoments[2]) < 1.0):
-                
-                # get the Pearson Type III parameters for the time step, based on the L-moments
-                pearson_parameters = _estimate_pearson3_parameters(lmoments)
-
-                fitting_values[0, time_step_index] = probability_of_zero
-                fitting_values[1, time_step_index] = pearson_parameters[0]
-                fitting_values[2, time_step_index] = pearson_parameters[1]
-                fitting_values[3, time_step_index] = pearson_parameters[2]
-
-#             else:
-#                 #FIXME/TODO there must be a better way to handle this, and/or is this as irrelevant 
-#                 #as swallowing the error here assumes? Do we get similar results using lmoments3 module?
-#                 #How does the comparable NCSU SPI code (Cumbie et al?) handle this?
-#                 _logger.warn('Due to invalid L-moments the Pearson fitting values for time step {0} are defaulting to zero'.format(time_step_index))
+    # calculate the probability of zero for each calendar time step
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probabilities_of_zero = np.where(number_of_zeros > 0, number_of_zeros / number_of_non_missing, 0.0)
+        
+    # estimate the L-moments of the calibration values and get the corresponding Pearson Type III parameters
+    lambda_1, lambda_2, tau_3 = _estimate_lmoments_grid(values)
+    locs, scales, skews = _estimate_pearson3_parameters_grid(lambda_1, lambda_2, tau_3)
+    
+    # we can only use the L-moments if we have at least four values that are both non-missing (i.e. non-NaN)
+    # and non-zero, and if they're valid, otherwise the fitting values for the time step will be all zeros, 
+    # as with the original loop over calendar time steps we bail out at the first time step with insufficient 
+    # values, leaving it and all the following time steps with zeros
+    insufficient = (number_of_non_missing - number_of_zeros) < 4
+    valid = ~np.logical_or.accumulate(insufficient, axis=0) & (lambda_2 > 0.0) & (np.abs(tau_3) < 1.0)
+    
+    # the values we'll compute and return
+    fitting_values = np.zeros((4,) + values.shape[1:])
+    fitting_values[0][valid] = probabilities_of_zero[valid]
+    fitting_values[1][valid] = locs[valid]
+    fitting_values[2][valid] = scales[valid]
+    fitting_values[3][valid] = skews[valid]
 
     return fitting_values
 
 #----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _pearson3cdf(value,
-                 pearson3_parameters):
+                 loc,
+                 scale,
+                 skew):
     '''
     Compute the probability that a random variable along the Pearson Type III distribution described by a set 
     of parameters will be less than or equal to a value.
     
-    :param value: 
-    :param pearson3_parameters:
-    :return 
+    :param value: value for which the cumulative probability will be computed
+    :param loc: first Pearson Type III parameter (location)
+    :param scale: second Pearson Type III parameter (scale)
+    :param skew: third Pearson Type III parameter (skew)
+    :return: the cumulative probability, or NaN if the value can't be fitted to the distribution
+    :rtype: float
     '''
 
     # it's only possible to make the calculation if the second Pearson parameter is above zero
-    if pearson3_parameters[1] <= 0.0:
+    if scale <= 0.0:
     
         #FIXME/TODO there must be a better way to handle this, and/or is this as irrelevant 
         #as swallowing the error here assumes? Do we get similar results using lmoments3 module?
         #How does the comparable NCSU SPI code (Cumbie et al?) handle this?
-#         _logger.debug("The second Pearson parameter is less than or equal to zero, invalid for the CDF calculation")
         return np.NaN
     
-    result = 0
-    skew = pearson3_parameters[2]
+    result = 0.0
     if abs(skew) <= 1e-6:
     
-        z = (value - pearson3_parameters[0]) / pearson3_parameters[1]
+        z = (value - loc) / scale
         return 0.5 + (0.5 * _error_function(z * sqrt(0.5)))
     
     alpha = 4.0 / (skew * skew)
-    x = ((2.0 * (value - pearson3_parameters[0])) / (pearson3_parameters[1] * skew)) + alpha
+    x = ((2.0 * (value - loc)) / (scale * skew)) + alpha
     if x > 0:
     
-        result = scipy.special.gammainc(alpha, x)
+        result = _incomplete_gamma(alpha, x)
         if skew < 0.0:
         
             result = 1.0 - result
@@ -330,7 +474,7 @@ def _pearson3cdf(value,
     else:
     
         # calculate the lowest possible value that will fit the distribution (i.e. Z = 0)
-        minimum_possible_value = pearson3_parameters[0] - ((alpha * pearson3_parameters[1] * skew) / 2.0)
+        minimum_possible_value = loc - ((alpha * scale * skew) / 2.0)
         if value <= minimum_possible_value:
         
             result = 0.0005  # minimum probability (why this arbitrary value? Trevor/Richard? related to the trace precipitation value?)
@@ -342,7 +486,192 @@ def _pearson3cdf(value,
     return result
 
 #----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
+def _incomplete_gamma(a,
+                      x):
+    """
+    Computes the regularized lower incomplete gamma function P(a, x), equivalent to scipy.special.gammainc() 
+    but compiled in nopython mode. A series expansion is used where x < a + 1 and a continued fraction 
+    (modified Lentz's method) is used otherwise, as described in Numerical Recipes, section 6.2. Both of these 
+    need on the order of sqrt(a) iterations where x is close to a, so for large shape parameters (i.e. nearly 
+    symmetric Pearson Type III distributions) Temme's uniform asymptotic expansion is used instead.
+    
+    :param a: shape parameter, must be positive
+    :param x: upper limit of integration, must be non-negative
+    :return: the regularized lower incomplete gamma function value
+    :rtype: float
+    """
+
+    if x <= 0.0:
+        return 0.0
+
+    if a > 10000.0:
+        return _incomplete_gamma_asymptotic(a, x)
+
+    # logarithm of the common factor x^a * e^(-x) / gamma(a)
+    log_factor = (a * math.log(x)) - x - lgamma(a)
+
+    if x < (a + 1.0):
+
+        # series representation, converges rapidly for x < a + 1
+        denominator = a
+        term = 1.0 / a
+        total = term
+        for _ in range(10000):
+            denominator += 1.0
+            term *= x / denominator
+            total += term
+            if abs(term) < (abs(total) * 1e-16):
+                break
+
+        return min(1.0, total * exp(log_factor))
+
+    else:
+
+        # continued fraction representation of the complement Q(a, x), converges rapidly for x >= a + 1
+        tiny = 1e-300
+        b = x + 1.0 - a
+        c = 1.0 / tiny
+        d = 1.0 / b
+        h = d
+        for i in range(1, 10000):
+            an = -i * (i - a)
+            b += 2.0
+            d = (an * d) + b
+            if abs(d) < tiny:
+                d = tiny
+            c = b + (an / c)
+            if abs(c) < tiny:
+                c = tiny
+            d = 1.0 / d
+            delta = d * c
+            h *= delta
+            if abs(delta - 1.0) < 1e-16:
+                break
+
+        return max(0.0, 1.0 - (exp(log_factor) * h))
+
+#----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
+def _incomplete_gamma_asymptotic(a,
+                                 x):
+    """
+    Computes the regularized lower incomplete gamma function P(a, x) for large values of a using the first 
+    three terms of Temme's uniform asymptotic expansion, accurate to double precision for a > 10000.
+    
+    :param a: shape parameter, must be large
+    :param x: upper limit of integration, must be positive
+    :return: the regularized lower incomplete gamma function value
+    :rtype: float
+    """
+
+    # compute log(1 + sigma) - sigma, using the Taylor series close to zero in order to avoid cancellation
+    sigma = (x - a) / a
+    if abs(sigma) < 0.1:
+        log1pmx = 0.0
+        power = -sigma
+        for k in range(2, 40):
+            power *= -sigma
+            term = power / k
+            log1pmx -= term
+            if abs(term) < (abs(log1pmx) * 1e-17):
+                break
+    else:
+        log1pmx = math.log1p(sigma) - sigma
+
+    # the variable eta of the expansion, with the sign of x - a
+    eta = sqrt(-2.0 * log1pmx)
+    if x < a:
+        eta = -eta
+
+    # Taylor series in eta of the first three coefficient functions of the expansion, the terms beyond these 
+    # are negligible where the exponential factor below is significant
+    c0 = -3.3333333333333333e-1 + eta * (8.3333333333333333e-2 + eta * (-1.4814814814814815e-2 + 
+         eta * (1.1574074074074074e-3 + eta * (3.527336860670194e-4 + eta * (-1.7875514403292181e-4 + 
+         eta * (3.9192631785224378e-5 + eta * (-2.1854485106799922e-6)))))))
+    c1 = -1.8518518518518519e-3 + eta * (-3.4722222222222222e-3 + eta * (2.6455026455026455e-3 + 
+         eta * (-9.9022633744855967e-4 + eta * (2.0576131687242798e-4 + eta * (-4.0187757201646091e-7)))))
+    c2 = 4.1335978835978836e-3 + eta * (-2.6813271604938272e-3 + eta * 7.7160493827160494e-4)
+    total = c0 + ((c1 + (c2 / a)) / a)
+
+    return (0.5 * math.erfc(-eta * sqrt(a / 2.0))) - \
+           (exp(-0.5 * a * eta * eta) * total / sqrt(2.0 * pi * a))
+
+#----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
+def _normal_ppf(probability):
+    """
+    Computes the quantile (inverse cumulative distribution) function of the standard normal distribution, 
+    equivalent to scipy.stats.norm.ppf() but compiled in nopython mode. Uses the rational approximation 
+    of P. J. Acklam followed by a single step of Halley's method, for full double precision.
+    
+    :param probability: probability value between 0.0 and 1.0, inclusive
+    :return: the value at which the standard normal cumulative distribution equals the probability, 
+             -inf for 0.0 and inf for 1.0, NaN for probabilities outside of [0.0, 1.0]
+    :rtype: float
+    """
+
+    if math.isnan(probability) or (probability < 0.0) or (probability > 1.0):
+        return np.NaN
+    elif probability == 0.0:
+        return -np.inf
+    elif probability == 1.0:
+        return np.inf
+
+    # coefficients of the rational approximations
+    a1 = -3.969683028665376e+01
+    a2 = 2.209460984245205e+02
+    a3 = -2.759285104469687e+02
+    a4 = 1.383577518672690e+02
+    a5 = -3.066479806614716e+01
+    a6 = 2.506628277459239e+00
+    b1 = -5.447609879822406e+01
+    b2 = 1.615858368580409e+02
+    b3 = -1.556989798598866e+02
+    b4 = 6.680131188771972e+01
+    b5 = -1.328068155288572e+01
+    c1 = -7.784894002430293e-03
+    c2 = -3.223964580411365e-01
+    c3 = -2.400758277161838e+00
+    c4 = -2.549732539343734e+00
+    c5 = 4.374664141464968e+00
+    c6 = 2.938163982698783e+00
+    d1 = 7.784695709041462e-03
+    d2 = 3.224671290700398e-01
+    d3 = 2.445134137142996e+00
+    d4 = 3.754408661907416e+00
+
+    # work with the lower half of the distribution, since 1 - p is exact for p >= 0.5 the upper half 
+    # then follows from the symmetry of the distribution without a loss of precision in the upper tail
+    lower_probability = min(probability, 1.0 - probability)
+
+    if lower_probability < 0.02425:
+
+        # rational approximation for the lower tail
+        q = sqrt(-2.0 * math.log(lower_probability))
+        x = (((((c1 * q + c2) * q + c3) * q + c4) * q + c5) * q + c6) / \
+            ((((d1 * q + d2) * q + d3) * q + d4) * q + 1.0)
+
+    else:
+
+        # rational approximation for the central region
+        q = lower_probability - 0.5
+        r = q * q
+        x = (((((a1 * r + a2) * r + a3) * r + a4) * r + a5) * r + a6) * q / \
+            (((((b1 * r + b2) * r + b3) * r + b4) * r + b5) * r + 1.0)
+
+    # refine the approximation using a step of Halley's rational method
+    error = (0.5 * math.erfc(-x / sqrt(2.0))) - lower_probability
+    u = error * sqrt(2.0 * pi) * exp((x * x) / 2.0)
+    x = x - (u / (1.0 + (x * u / 2.0)))
+
+    if probability > 0.5:
+        x = -x
+
+    return x
+
+#----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
 def _error_function(value):
     '''
     TODO
@@ -401,7 +730,11 @@ def _error_function(value):
 
 #-----------------------------------------------------------------------------------------------------------------------
 @numba.vectorize([numba.float32(numba.float32, numba.float32, numba.float32, numba.float32, numba.float32),
-                  numba.float64(numba.float64, numba.float64, numba.float64, numba.float64, numba.float64)])
+                  numba.float32(numba.float32, numba.float64, numba.float64, numba.float64, numba.float64),
+                  numba.float64(numba.float64, numba.float64, numba.float64, numba.float64, numba.float64)],
+                 nopython=True,
+                 cache=True,
+                 target=_PEARSON_FIT_TARGET)
 def _pearson_fit_ufunc(value_to_fit, 
                        pearson_param_1, 
                        pearson_param_2, 
@@ -409,7 +742,8 @@ def _pearson_fit_ufunc(value_to_fit,
                        probability_of_zero):
     """
     Universal function (ufunc) used to perform fitting of a value to a Pearson Type III distribution 
-    as described by the Pearson Type III parameters and probability of zero arguments.
+    as described by the Pearson Type III parameters and probability of zero arguments. A 32-bit float value 
+    with 64-bit float parameters is fitted using 64-bit floats, with the fitted value returned as a 32-bit float.
     
     :param value_to_fit: a value to fit within the Pearson Type III distribution described by the parameters
     :param pearson_param_1: first Pearson Type III parameter
@@ -443,53 +777,75 @@ def _pearson_fit_ufunc(value_to_fit,
         else:
         
             # calculate the CDF value corresponding to the value
-            pe3_cdf = _pearson3cdf(value_to_fit, [pearson_param_1, pearson_param_2, pearson_param_3])
+            pe3_cdf = _pearson3cdf(value_to_fit, pearson_param_1, pearson_param_2, pearson_param_3)
                            
         if not math.isnan(pe3_cdf):
         
             # calculate the probability value, clipped between 0 and 1
-            probability_value = np.clip((probability_of_zero + ((1.0 - probability_of_zero) * pe3_cdf)), 0.0, 1.0)
+            probability_value = min(1.0, max(0.0, probability_of_zero + ((1.0 - probability_of_zero) * pe3_cdf)))
 
             # the values we'll return are the values at which the probabilities of a normal distribution are 
             # less than or equal to the computed probabilities, as determined by the normal distribution's 
             # quantile (or inverse cumulative distribution) function  
-            fitted_value = scipy.stats.norm.ppf(probability_value)
+            fitted_value = _normal_ppf(probability_value)
 
     return fitted_value
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
-def transform_fitted_pearson(values,
-                             data_start_year,
-                             calibration_start_year,
-                             calibration_end_year,
+@numba.vectorize([numba.float32(numba.float32, numba.float32, numba.float32, numba.float32),
+                  numba.float32(numba.float32, numba.float64, numba.float64, numba.float64),
+                  numba.float64(numba.float64, numba.float64, numba.float64, numba.float64)],
+                 nopython=True,
+                 cache=True,
+                 target=_GAMMA_FIT_TARGET)
+def _gamma_fit_ufunc(value_to_fit, 
+                     alpha, 
+                     beta, 
+                     probability_of_zero):
+    """
+    Universal function (ufunc) used to perform fitting of a value to a gamma distribution as described by 
+    the shape (alpha) and scale (beta) parameters and the probability of zero, and to transform the fitted 
+    probability to the corresponding normalized sigma. This is equivalent to scipy.stats.gamma.cdf() followed 
+    by scipy.stats.norm.ppf(), but compiled in nopython mode without temporary arrays. A 32-bit float value 
+    with 64-bit float parameters is fitted using 64-bit floats, with the fitted value returned as a 32-bit float.
+    
+    :param value_to_fit: a value to fit within the gamma distribution described by the parameters
+    :param alpha: the gamma distribution's shape parameter
+    :param beta: the gamma distribution's scale parameter
+    :param probability_of_zero: probability that the value is zero
+    """
+    
+    fitted_value = np.NaN
+    
+    # only fit to the distribution if the value is valid/not missing and nonzero (zeros are treated as missing), 
+    # and if the distribution's parameters are valid
+    if (not math.isnan(value_to_fit)) and (value_to_fit != 0.0) and (alpha > 0.0) and (beta > 0.0):
+
+        # get the gamma cumulative distribution function value, which is zero for negative values
+        gamma_cdf = _incomplete_gamma(alpha, value_to_fit / beta)
+
+        # the values we'll return are the values at which the probabilities of a normal distribution are 
+        # less than or equal to the computed probabilities, as determined by the normal distribution's 
+        # quantile (or inverse cumulative distribution) function  
+        fitted_value = _normal_ppf(probability_of_zero + ((1.0 - probability_of_zero) * gamma_cdf))
+
+    return fitted_value
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _validate_fitting_values(values,
                              periodicity):
     '''
-    Fit values to a Pearson Type III distribution and transform the values to corresponding normalized sigmas. 
+    Validates an array of values to be fitted to a distribution, reshaping a 1-D array into a 2-D array 
+    with shape (years, 12) for monthly or (years, 366) for daily periodicity.
     
-    :param values: 2-D array of values, with each row representing a year containing
-                   twelve columns representing the respective calendar months, or 366 columns representing days 
-                   as if all years were leap years
-    :param data_start_year: the initial year of the input values array
-    :param calibration_start_year: the initial year to use for the calibration period 
-    :param calibration_end_year: the final year to use for the calibration period 
+    :param values: 1-D array of monthly or daily values, 2-D array of values with shape (years, 12|366), 
+                   or a 3-D array of values with shape (years, 12|366, cells) 
     :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
-                        'monthly' and 'daily'
-                        'monthly' indicates an array of monthly values, assumed to span full years, i.e. the first 
-                        value corresponds to January of the initial year and any missing final months of the final 
-                        year filled with NaN values, with size == # of years * 12
-                        'daily' indicates an array of full years of daily values with 366 days per year, as if each
-                        year were a leap year and any missing final months of the final year filled with NaN values, 
-                        with array size == (# years * 366)
-    :return: 2-D array of transformed/fitted values, corresponding in size and shape of the input array
+                        'monthly' and 'daily', required for 1-D input
+    :return: the validated values array, reshaped to 2-D if a 1-D array was provided
     :rtype: numpy.ndarray of floats
     '''
     
-    # if we're passed all missing values then we can't compute anything, return the same array of missing values
-    if (np.ma.is_masked(values) and values.mask.all()) or np.all(np.isnan(values)):
-        return values
-        
-    # validate (and possibly reshape) the input array
     if len(values.shape) == 1:
         
         if periodicity is None:    
@@ -510,13 +866,103 @@ def transform_fitted_pearson(values,
             _logger.error(message)
             raise ValueError(message)
         
-    elif (len(values.shape) != 2) or ((values.shape[1] != 12) and (values.shape[1] != 366)):
-      
-        # neither a 1-D nor a 2-D array with valid shape was passed in
+    elif (len(values.shape) not in (2, 3)) or ((values.shape[1] != 12) and (values.shape[1] != 366)):
+
+        # neither a 1-D, 2-D, nor 3-D array with valid shape was passed in
         message = 'Invalid input array with shape: {0}'.format(values.shape)
         _logger.error(message)   
         raise ValueError(message)
     
+    return values
+
+#-----------------------------------------------------------------------------------------------------------------------
+def transform_fitted_pearson(values,
+                             data_start_year,
+                             calibration_start_year,
+                             calibration_end_year,
+                             periodicity,
+                             fitting_params=None):
+    '''
+    Fit values to a Pearson Type III distribution and transform the values to corresponding normalized sigmas. 
+    
+    :param values: 2-D array of values, with each row representing a year containing
+                   twelve columns representing the respective calendar months, or 366 columns representing days 
+                   as if all years were leap years, or a 3-D array of values with shape (years, 12, cells) 
+                   or (years, 366, cells) for computing the values of many cells (time series) at once
+    :param data_start_year: the initial year of the input values array
+    :param calibration_start_year: the initial year to use for the calibration period 
+    :param calibration_end_year: the final year to use for the calibration period 
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily'
+                        'monthly' indicates an array of monthly values, assumed to span full years, i.e. the first 
+                        value corresponds to January of the initial year and any missing final months of the final 
+                        year filled with NaN values, with size == # of years * 12
+                        'daily' indicates an array of full years of daily values with 366 days per year, as if each
+                        year were a leap year and any missing final months of the final year filled with NaN values, 
+                        with array size == (# years * 366)
+    :param fitting_params: optional dictionary of previously computed fitting parameters, containing the keys
+                           'probabilities_of_zero', 'locs', 'scales', and 'skews', each an array with shape (12|366) 
+                           for 1-D or 2-D input or (12|366, cells) for 3-D input, such as returned by 
+                           pearson_parameters(), if provided then these are used for the transform in place 
+                           of fitting the calibration period values
+    :return: array of transformed/fitted values, corresponding in size and shape of the input array
+    :rtype: numpy.ndarray of floats
+    '''
+    
+    values = utils.nan_filled(values)
+
+    # if we're passed all missing values then we can't compute anything, return the same array of missing values
+    if np.all(np.isnan(values)):
+        return values
+        
+    # validate (and possibly reshape) the input array
+    values = _validate_fitting_values(values, periodicity)
+
+    # get the Pearson Type III fitting parameters, computing these from the calibration period if not provided
+    if fitting_params is None:
+        probability_of_zero, pearson_param_1, pearson_param_2, pearson_param_3 = \
+            pearson_parameters(values,
+                               data_start_year,
+                               calibration_start_year,
+                               calibration_end_year,
+                               periodicity)
+    else:
+        probability_of_zero = fitting_params['probabilities_of_zero']
+        pearson_param_1 = fitting_params['locs']     # first Pearson Type III parameter
+        pearson_param_2 = fitting_params['scales']   # second Pearson Type III parameter
+        pearson_param_3 = fitting_params['skews']    # third Pearson Type III parameter
+ 
+    # fit each value using the Pearson Type III fitting universal function in a broadcast fashion    
+    fitted_values = _pearson_fit_ufunc(values, pearson_param_1, pearson_param_2, pearson_param_3, probability_of_zero)
+                    
+    return fitted_values
+
+#-----------------------------------------------------------------------------------------------------------------------
+def pearson_parameters(values,
+                       data_start_year,
+                       calibration_start_year,
+                       calibration_end_year,
+                       periodicity):
+    '''
+    Computes the probability of zero and Pearson Type III distribution parameters for each calendar time step, 
+    as fitted to the values of the calibration period. These can be saved and later passed as the fitting_params 
+    argument of transform_fitted_pearson() in order to transform new values without refitting.
+    
+    :param values: 1-D array of monthly or daily values, 2-D array of values with shape (years, 12|366), 
+                   or a 3-D array of values with shape (years, 12|366, cells) 
+    :param data_start_year: the initial year of the input values array
+    :param calibration_start_year: the initial year to use for the calibration period 
+    :param calibration_end_year: the final year to use for the calibration period 
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily', required for 1-D input
+    :return: four arrays: probabilities of zero, locations, scales, and skews, each with shape (12|366) for 1-D 
+             or 2-D input or (12|366, cells) for 3-D input
+    :rtype: four numpy.ndarray objects of floats
+    '''
+    
+    # validate (and possibly reshape) the input array
+    values = _validate_fitting_values(values, periodicity)
+    
     # determine the end year of the values array
     data_end_year = data_start_year + values.shape[0]
     
@@ -534,34 +980,28 @@ def transform_fitted_pearson(values,
     calibration_end_index = (calibration_end_year - data_start_year) + 1
     
     # get the values for the current calendar time step that fall within the calibration years period
-    calibration_values = values[calibration_begin_index:calibration_end_index, :]
+    calibration_values = values[calibration_begin_index:calibration_end_index]
 
-    # compute the values we'll use to fit to the Pearson Type III distribution
+    # compute the values we'll use to fit to the Pearson Type III distribution, for 3-D input these are arrays 
+    # with shape (steps, cells) that broadcast against the (years, steps, cells) values array
     pearson_values = _pearson3_fitting_values(calibration_values)
     
-    pearson_param_1 = pearson_values[1]   # first Pearson Type III parameter
-    pearson_param_2 = pearson_values[2]   # second Pearson Type III parameter
-    pearson_param_3 = pearson_values[3]   # third Pearson Type III parameter
-    probability_of_zero = pearson_values[0]
- 
-    # fit each value using the Pearson Type III fitting universal function in a broadcast fashion    
-    fitted_values = _pearson_fit_ufunc(values, pearson_param_1, pearson_param_2, pearson_param_3, probability_of_zero)
-                    
-    return fitted_values
+    return pearson_values[0], pearson_values[1], pearson_values[2], pearson_values[3]
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def transform_fitted_gamma(values,
                            data_start_year,
                            calibration_start_year,
                            calibration_end_year,
-                           periodicity):
+                           periodicity,
+                           fitting_params=None):
     '''
     Fit values to a gamma distribution and transform the values to corresponding normalized sigmas. 
 
     :param values: 2-D array of values, with each row typically representing a year containing
                    twelve columns representing the respective calendar months, or 366 days per column
-                   as if all years were leap years
+                   as if all years were leap years, or a 3-D array of values with shape (years, 12, cells) 
+                   or (years, 366, cells) for computing the values of many cells (time series) at once
     :param data_start_year: the initial year of the input values array
     :param calibration_start_year: the initial year to use for the calibration period 
     :param calibration_end_year: the final year to use for the calibration period 
@@ -572,49 +1012,77 @@ def transform_fitted_gamma(values,
                              'daily': array of full years of daily values with 366 days per year, as if each year were 
                              a leap year and any missing final months of the final year filled with NaN values, 
                              with array size == (# years * 366)
-    :return: 2-D array of transformed/fitted values, corresponding in size and shape of the input array
+    :param fitting_params: optional dictionary of previously computed fitting parameters, containing the keys
+                           'probabilities_of_zero', 'alphas', and 'betas', each an array with shape (12|366) 
+                           for 1-D or 2-D input or (12|366, cells) for 3-D input, such as returned by 
+                           gamma_parameters(), if provided then these are used for the transform in place 
+                           of fitting the calibration period values
+    :return: array of transformed/fitted values, corresponding in size and shape of the input array
     :rtype: numpy.ndarray of floats
     '''
     
+    values = utils.nan_filled(values)
+
     # if we're passed all missing values then we can't compute anything, return the same array of missing values
-    if (np.ma.is_masked(values) and values.mask.all()) or np.all(np.isnan(values)):
+    if np.all(np.isnan(values)):
         return values
         
     # validate (and possibly reshape) the input array
-    if len(values.shape) == 1:
-        
-        if periodicity is None:    
-            message = '1-D input array requires a corresponding periodicity argument, none provided'
-            _logger.error(message)
-            raise ValueError(message)
+    values = _validate_fitting_values(values, periodicity)
+    
+    # get the gamma fitting parameters, computing these from the calibration period if not provided
+    if fitting_params is None:
+        probabilities_of_zero, alphas, betas = gamma_parameters(values,
+                                                                data_start_year,
+                                                                calibration_start_year,
+                                                                calibration_end_year,
+                                                                periodicity)
+    else:
+        probabilities_of_zero = fitting_params['probabilities_of_zero']
+        alphas = fitting_params['alphas']
+        betas = fitting_params['betas']
+    
+    # fit each value using the gamma fitting universal function in a broadcast fashion, into a single output 
+    # array of the floating point type of the values, with zeros and missing values resulting in NaNs 
+    fitted_values = np.empty(values.shape, dtype=utils.float_type(values))
+    _gamma_fit_ufunc(values, 
+                     np.asarray(alphas, dtype=np.float64), 
+                     np.asarray(betas, dtype=np.float64), 
+                     np.asarray(probabilities_of_zero, dtype=np.float64), 
+                     out=fitted_values)
 
-        elif periodicity == 'monthly': 
-            # we've been passed a 1-D array with shape (months), reshape it to 2-D with shape (years, 12)
-            values = utils.reshape_to_2d(values, 12)
-     
-        elif periodicity == 'daily':
-            # we've been passed a 1-D array with shape (days), reshape it to 2-D with shape (years, 366)
-            values = utils.reshape_to_2d(values, 366)
-            
-        else:
-            message = 'Unsupported periodicity argument: \'{0}\''.format(periodicity)
-            _logger.error(message)
-            raise ValueError(message)
+    return fitted_values
+
+#-----------------------------------------------------------------------------------------------------------------------
+def gamma_parameters(values,
+                     data_start_year,
+                     calibration_start_year,
+                     calibration_end_year,
+                     periodicity):
+    '''
+    Computes the probability of zero and gamma distribution parameters (alpha and beta) for each calendar time step, 
+    with the parameters fitted to the non-zero values of the calibration period. These can be saved and later passed 
+    as the fitting_params argument of transform_fitted_gamma() in order to transform new values without refitting.
     
-    elif (len(values.shape) != 2) or (values.shape[1] != 12 and values.shape[1] != 366):
-     
-        # neither a 1-D nor a 2-D array with valid shape was passed in
-        message = 'Invalid input array with shape: {0}'.format(values.shape)
-        _logger.error(message)   
-        raise ValueError(message)
+    :param values: 1-D array of monthly or daily values, 2-D array of values with shape (years, 12|366), 
+                   or a 3-D array of values with shape (years, 12|366, cells) 
+    :param data_start_year: the initial year of the input values array
+    :param calibration_start_year: the initial year to use for the calibration period 
+    :param calibration_end_year: the final year to use for the calibration period 
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily', required for 1-D input
+    :return: three arrays: probabilities of zero, alphas, and betas, each with shape (12|366) for 1-D 
+             or 2-D input or (12|366, cells) for 3-D input
+    :rtype: three numpy.ndarray objects of floats
+    '''
+    
+    # validate (and possibly reshape) the input array
+    values = _validate_fitting_values(values, periodicity)
     
     # find the percentage of zero values for each time step
     zeros = (values == 0).sum(axis=0)
     probabilities_of_zero = zeros / values.shape[0]
     
-    # replace zeros with NaNs
-    values[values == 0] = np.NaN
-    
     # determine the end year of the values array
     data_end_year = data_start_year + values.shape[0]
     
@@ -631,8 +1099,12 @@ def transform_fitted_gamma(values,
     calibration_begin_index = (calibration_start_year - data_start_year)
     calibration_end_index = (calibration_end_year - data_start_year) + 1
     
-    # get the values for the current calendar time step that fall within the calibration years period
-    calibration_values = values[calibration_begin_index:calibration_end_index, :]
+    # get the values for the current calendar time step that fall within the calibration years period, as 
+    # 64-bit floats since the difference of the log of the means and the mean of the logs is prone to cancellation
+    calibration_values = values[calibration_begin_index:calibration_end_index].astype(np.float64)
+
+    # replace zeros with NaNs, leaving the input array unmodified
+    calibration_values[calibration_values == 0] = np.NaN
 
     # compute the gamma distribution's shape and scale parameters, alpha and beta
     #TODO explain this better
@@ -644,16 +1116,7 @@ def transform_fitted_gamma(values,
     alphas = (1 + np.sqrt(1 + 4 * A / 3)) / (4 * A)
     betas = means / alphas
     
-    # find the gamma probability values using the gamma CDF
-    gamma_probabilities = scipy.stats.gamma.cdf(values, a=alphas, scale=betas)
-
-    #TODO explain this
-    # (normalize including the probability of zero, putting into the range [0..1]?)    
-    probabilities = probabilities_of_zero + ((1 - probabilities_of_zero) * gamma_probabilities)
-    
-    # the values we'll return are the values at which the probabilities of a normal distribution are less than or equal to
-    # the computed probabilities, as determined by the normal distribution's quantile (or inverse cumulative distribution) function  
-    return scipy.stats.norm.ppf(probabilities)
+    return probabilities_of_zero, alphas, betas
  
 # ############################################################################################################################################   
 # #-------------------------------------------------------------------------------------------------------------------------------------------
@@ -1,9 +1,15 @@
+'''
+Climate indices computed from time series of a single location or from grids of many locations.
+
+The Palmer and Thornthwaite modules are imported within the functions using these rather than at module level, 
+so that these are only loaded when used.
+'''
 import logging
-import numba
 import numpy as np
 from enum import Enum
+import warnings
 
-from climate_indices import compute, palmer, thornthwaite, utils
+from climate_indices import compute, utils
 
 #-------------------------------------------------------------------------------------------------------------------------------------------
 class Distribution(Enum):
@@ -14,10 +20,7 @@ class Distribution(Enum):
     gamma = 'gamma'
 
 #-------------------------------------------------------------------------------------------------------------------------------------------
-# set up a basic, global _logger
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    datefmt='%Y-%m-%d  %H:%M:%S')
+# module _logger, the configuration of logging handlers and levels is left to the application
 _logger = logging.getLogger(__name__)
 
 #-------------------------------------------------------------------------------------------------------------------------------------------
@@ -33,7 +36,8 @@ def spi(precips,
         data_start_year,
         calibration_year_initial,
         calibration_year_final,
-        periodicity):
+        periodicity,
+        fitting_params=None):
     '''
     Computes SPI (Standardized Precipitation Index).
     
@@ -53,21 +57,28 @@ def spi(precips,
                         'daily' indicates an array of full years of daily values with 366 days per year, as if each
                         year were a leap year and any missing final months of the final year filled with NaN values, 
                         with array size == (# years * 366)
+    :param fitting_params: optional dictionary of previously computed distribution fitting parameters, each an array
+                           with shape (12|366), as returned by compute.gamma_parameters() (keys 'probabilities_of_zero',
+                           'alphas', and 'betas') or compute.pearson_parameters() (keys 'probabilities_of_zero', 'locs',
+                           'scales', and 'skews'), if provided then the scaled values are transformed using these 
+                           parameters rather than fitting the values of the calibration period
     :return SPI values fitted to the gamma distribution at the specified time step scale, unitless
     :rtype: 1-D numpy.ndarray of floats of the same length as the input array of precipitation values
     '''
 
+    precips = utils.nan_filled(precips)
+
     # we expect to operate upon a 1-D array, so if we've been passed a 2-D array we flatten it, otherwise raise an error
     shape = precips.shape
     if len(shape) == 2:
-        precips = precips.flatten()
+        precips = precips.ravel()
     elif len(shape) != 1:
         message = 'Invalid shape of input array: {0} -- only 1-D and 2-D arrays are supported'.format(shape)
         _logger.error(message)
         raise ValueError(message)
         
     # if we're passed all missing values then we can't compute anything, return the same array of missing values
-    if (np.ma.is_masked(precips) and precips.mask.all()) or np.all(np.isnan(precips)):
+    if np.all(np.isnan(precips)):
         return precips
         
     # remember the original length of the array, in order to facilitate returning an array of the same size
@@ -96,7 +107,8 @@ def spi(precips,
                                                                    data_start_year,
                                                                    calibration_year_initial,
                                                                    calibration_year_final,
-                                                                   periodicity)
+                                                                   periodicity,
+                                                                   fitting_params)
     elif distribution is Distribution.pearson_type3:
         
         # fit the scaled values to a Pearson Type III distribution and transform to corresponding normalized sigmas 
@@ -104,15 +116,296 @@ def spi(precips,
                                                                      data_start_year,
                                                                      calibration_year_initial,
                                                                      calibration_year_final,
-                                                                     periodicity)
+                                                                     periodicity,
+                                                                     fitting_params)
         
     # clip values to within the valid range, reshape the array back to 1-D
     spi = np.clip(transformed_fitted_values, _FITTED_INDEX_VALID_MIN, _FITTED_INDEX_VALID_MAX).flatten()
     
-    # return the original size array 
+    # return the original size array
     return spi[0:original_length]
 
 #-------------------------------------------------------------------------------------------------------------------------------------------
+def spi_grid(precips,
+             scale,
+             distribution,
+             data_start_year,
+             calibration_year_initial,
+             calibration_year_final,
+             periodicity,
+             fitting_params=None):
+    '''
+    Computes SPI (Standardized Precipitation Index) for many time series at once, such as all the longitudes
+    of a latitude slice. The scaled sums, calibration statistics, and fitting/transform are computed
+    across all the time series with array operations rather than a time series at a time.
+
+    :param precips: 2-D numpy array of precipitation values, in any units, with shape (cells, time), first value
+                    of each time series assumed to correspond to January of the initial year if the periodicity
+                    is monthly, or January 1st of the initial year if daily
+    :param scale: number of time steps over which the values should be scaled before the index is computed
+    :param distribution: distribution type to be used for the internal fitting/transform computation
+    :param data_start_year: the initial year of the input precipitation dataset
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are
+                        'monthly' and 'daily', see spi() for details
+    :param fitting_params: optional dictionary of previously computed distribution fitting parameters, each an array
+                           with shape (cells, 12|366), as returned by spi_grid_fitting_params(), if provided then 
+                           the scaled values are transformed using these parameters rather than fitting the values 
+                           of the calibration period
+    :return SPI values fitted to the specified distribution at the specified time step scale, unitless
+    :rtype: 2-D numpy.ndarray of floats with the same shape as the input array of precipitation values
+    '''
+
+    if fitting_params is not None:
+        fitting_params = {distribution: fitting_params}
+
+    return spi_grid_distributions(precips,
+                                  scale,
+                                  [distribution],
+                                  data_start_year,
+                                  calibration_year_initial,
+                                  calibration_year_final,
+                                  periodicity,
+                                  fitting_params)[0]
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spi_grid_distributions(precips,
+                           scale,
+                           distributions,
+                           data_start_year,
+                           calibration_year_initial,
+                           calibration_year_final,
+                           periodicity,
+                           fitting_params=None):
+    '''
+    Computes SPI (Standardized Precipitation Index) for many time series at once, fitted to each of several 
+    distributions, for example both gamma and Pearson Type III. The precipitation values are validated, scaled, 
+    and reshaped only once, and the scaled values are shared by the fittings/transforms of all the distributions.
+
+    :param precips: 2-D numpy array of precipitation values, in any units, with shape (cells, time), 
+                    see spi_grid() for details
+    :param scale: number of time steps over which the values should be scaled before the index is computed
+    :param distributions: sequence of the distribution types to be used for the fitting/transform computations
+    :param data_start_year: the initial year of the input precipitation dataset
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are
+                        'monthly' and 'daily', see spi() for details
+    :param fitting_params: optional dictionary of distribution types to dictionaries of previously computed 
+                           distribution fitting parameters, as returned by spi_grid_fitting_params(), the scaled 
+                           values are fitted to the calibration period for distributions without fitting parameters
+    :return SPI values fitted to each of the distributions at the specified time step scale, unitless, 
+            in the order of the distributions argument
+    :rtype: tuple of 2-D numpy.ndarray of floats with the same shape as the input array of precipitation values
+    '''
+
+    _validate_distributions(distributions)
+
+    precips = utils.nan_filled(precips)
+
+    # get the scaled values with shape (years, 12|366, cells)
+    scaled_precips = _scaled_grid_values(precips, scale, periodicity)
+
+    # if we're passed all missing values then we can't compute anything, return the same array of missing values
+    if scaled_precips is None:
+        return tuple(precips for _ in distributions)
+
+    spis = []
+    for distribution in distributions:
+
+        # the fitting parameters are (cells, steps), the transforms expect (steps, cells)
+        params = None
+        if (fitting_params is not None) and (fitting_params.get(distribution) is not None):
+            params = {name: np.transpose(values) for (name, values) in fitting_params[distribution].items()}
+
+        # fit the scaled values to the distribution and transform to corresponding normalized sigmas
+        transformed_fitted_values = _transform_fitted(scaled_precips,
+                                                      distribution,
+                                                      data_start_year,
+                                                      calibration_year_initial,
+                                                      calibration_year_final,
+                                                      periodicity,
+                                                      params)
+
+        # clip values to within the valid range
+        spi = np.clip(transformed_fitted_values, _FITTED_INDEX_VALID_MIN, _FITTED_INDEX_VALID_MAX)
+
+        # reshape back to (cells, time), truncated to the original number of time steps
+        spis.append(utils.reshape_from_years_steps_cells(spi, precips.shape[1]))
+
+    return tuple(spis)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spi_grid_fitting_params(precips,
+                            scale,
+                            distribution,
+                            data_start_year,
+                            calibration_year_initial,
+                            calibration_year_final,
+                            periodicity):
+    '''
+    Computes the distribution fitting parameters used for SPI for many time series at once, fitted to the scaled 
+    values of the calibration period. The result can be stored and later passed to spi_grid() as its fitting_params 
+    argument, in order to compute SPI for updated precipitation without refitting the calibration period.
+
+    :param precips: 2-D numpy array of precipitation values, in any units, with shape (cells, time), 
+                    see spi_grid() for details
+    :param scale: number of time steps over which the values should be scaled before the parameters are computed
+    :param distribution: distribution type for which fitting parameters should be computed
+    :param data_start_year: the initial year of the input precipitation dataset
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are
+                        'monthly' and 'daily', see spi() for details
+    :return: dictionary of parameter names to arrays of fitting parameters with shape (cells, 12|366), for gamma 
+             the keys are 'probabilities_of_zero', 'alphas', and 'betas', and for Pearson Type III the keys are
+             'probabilities_of_zero', 'locs', 'scales', and 'skews'
+    :rtype: dictionary of strings to 2-D numpy.ndarray of floats
+    '''
+
+    precips = utils.nan_filled(precips)
+
+    # get the scaled values with shape (years, 12|366, cells)
+    scaled_precips = _scaled_grid_values(precips, scale, periodicity)
+
+    # if we're passed all missing values then we can't compute anything, use all missing parameters
+    if scaled_precips is None:
+        scaled_precips = utils.reshape_to_years_steps_cells(precips, 
+                                                            compute.Periodicity[periodicity].value)
+
+    if distribution is Distribution.gamma:
+
+        # fit the scaled values to a gamma distribution
+        names = ('probabilities_of_zero', 'alphas', 'betas')
+        params = compute.gamma_parameters(scaled_precips,
+                                          data_start_year,
+                                          calibration_year_initial,
+                                          calibration_year_final,
+                                          periodicity)
+    elif distribution is Distribution.pearson_type3:
+
+        # fit the scaled values to a Pearson Type III distribution
+        names = ('probabilities_of_zero', 'locs', 'scales', 'skews')
+        params = compute.pearson_parameters(scaled_precips,
+                                            data_start_year,
+                                            calibration_year_initial,
+                                            calibration_year_final,
+                                            periodicity)
+    else:
+        message = 'Unsupported distribution argument: {0}'.format(distribution)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # transpose the (steps, cells) arrays to (cells, steps), to match the orientation of the input array
+    return {name: np.transpose(values) for (name, values) in zip(names, params)}
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def _scaled_grid_values(precips,
+                        scale,
+                        periodicity):
+    '''
+    Validates and scales an array of time series, and reshapes the scaled values into the (years, steps, cells) 
+    orientation used for fitting all the time series at once.
+
+    :param precips: 2-D numpy array of precipitation values with shape (cells, time), missing values as NaNs
+    :param scale: number of time steps over which the values should be scaled
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are
+                        'monthly' and 'daily'
+    :return: array of scaled values with shape (years, 12|366, cells), or None if all input values are missing
+    :rtype: 3-D numpy.ndarray of floats
+    '''
+
+    # we expect to operate upon a 2-D array with shape (cells, time)
+    shape = precips.shape
+    if len(shape) != 2:
+        message = 'Invalid shape of input array: {0} -- only 2-D arrays are supported'.format(shape)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # get the number of time steps per year
+    if periodicity == 'monthly':
+        steps_per_year = 12
+    elif periodicity == 'daily':
+        steps_per_year = 366
+    else:
+        message = 'Invalid periodicity argument: {0}'.format(periodicity)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # if we're passed all missing values then we can't compute anything
+    if np.all(np.isnan(precips)):
+        return None
+
+    # get a sliding sums array for all time series, with each time step's value scaled by the number of time steps
+    scaled_precips = compute.sum_to_scale(precips, scale)
+
+    # reshape precipitation values to (years, 12, cells) for monthly, or to (years, 366, cells) for daily
+    return utils.reshape_to_years_steps_cells(scaled_precips, steps_per_year)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def _validate_distributions(distributions):
+    '''
+    Validates a sequence of distribution types, raising a ValueError if any of these is unsupported.
+
+    :param distributions: sequence of distribution types
+    '''
+
+    for distribution in distributions:
+        if distribution not in (Distribution.gamma, Distribution.pearson_type3):
+            message = 'Unsupported distribution argument: {0}'.format(distribution)
+            _logger.error(message)
+            raise ValueError(message)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def _transform_fitted(scaled_values,
+                      distribution,
+                      data_start_year,
+                      calibration_year_initial,
+                      calibration_year_final,
+                      periodicity,
+                      fitting_params):
+    '''
+    Fits scaled values to a distribution and transforms these to the corresponding normalized sigmas. The scaled 
+    values are left unmodified, so that these can be shared by the transforms for several distributions.
+
+    :param scaled_values: array of scaled values, as accepted by compute.transform_fitted_gamma() 
+                          and compute.transform_fitted_pearson()
+    :param distribution: distribution type to be used for the fitting/transform computation
+    :param data_start_year: the initial year of the scaled values
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the scaled values, 'monthly' or 'daily'
+    :param fitting_params: optional dictionary of previously computed distribution fitting parameters, or None
+    :return: array of transformed/fitted values
+    :rtype: numpy.ndarray of floats
+    '''
+
+    if distribution is Distribution.gamma:
+
+        # fit the scaled values to a gamma distribution and transform to corresponding normalized sigmas
+        return compute.transform_fitted_gamma(scaled_values,
+                                              data_start_year,
+                                              calibration_year_initial,
+                                              calibration_year_final,
+                                              periodicity,
+                                              fitting_params)
+
+    elif distribution is Distribution.pearson_type3:
+
+        # fit the scaled values to a Pearson Type III distribution and transform to corresponding normalized sigmas
+        return compute.transform_fitted_pearson(scaled_values,
+                                                data_start_year,
+                                                calibration_year_initial,
+                                                calibration_year_final,
+                                                periodicity,
+                                                fitting_params)
+
+    else:
+        message = 'Unsupported distribution argument: {0}'.format(distribution)
+        _logger.error(message)
+        raise ValueError(message)
+
 #@numba.jit
 def spei(scale,
          distribution,
@@ -123,7 +416,8 @@ def spei(scale,
          precips_mm,
          pet_mm=None,
          temps_celsius=None,
-         latitude_degrees=None):
+         latitude_degrees=None,
+         fitting_params=None):
     '''
     Compute SPEI fitted to the gamma distribution.
     
@@ -160,13 +454,75 @@ def spei(scale,
     :param latitude_degrees: the latitude of the location, in degrees north, must be unspecified or None if using 
                              an array of PET values as an input, and must be specified if using an array of temperatures 
                              as input, valid range is -90.0 to 90.0 (inclusive)
+    :param fitting_params: optional dictionary of previously computed distribution fitting parameters, 
+                           see spi() for details
     :return: an array of SPEI values
     :rtype: numpy.ndarray of type float, of the same size and shape as the input temperature and precipitation arrays
     '''
-                    
+
+    if fitting_params is not None:
+        fitting_params = {distribution: fitting_params}
+
+    return spei_distributions(scale,
+                              [distribution],
+                              periodicity,
+                              data_start_year,
+                              calibration_year_initial,
+                              calibration_year_final,
+                              precips_mm,
+                              pet_mm,
+                              temps_celsius,
+                              latitude_degrees,
+                              fitting_params)[0]
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spei_distributions(scale,
+                       distributions,
+                       periodicity,
+                       data_start_year,
+                       calibration_year_initial,
+                       calibration_year_final,
+                       precips_mm,
+                       pet_mm=None,
+                       temps_celsius=None,
+                       latitude_degrees=None,
+                       fitting_params=None):
+    '''
+    Computes SPEI fitted to each of several distributions, for example both gamma and Pearson Type III. 
+    The arguments are validated, and the PET and scaled (P - PET) values are computed, only once, with the scaled 
+    values shared by the fittings/transforms of all the distributions. See spei() for details of the arguments.
+
+    :param scale: the number of months over which the values should be scaled before computing the indicator
+    :param distributions: sequence of the distribution types to be used for the fitting/transform computations
+    :param periodicity: the periodicity of the time series represented by the input data, 'monthly' or 'daily'
+    :param data_start_year: the initial year of the input datasets (assumes that the two inputs cover the same period)
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param precips_mm: an array of monthly total precipitation values, in millimeters
+    :param pet_mm: an array of monthly PET values, in millimeters, must be unspecified or None if using an array 
+                   of temperature values as input
+    :param temps_celsius: an array of monthly average temperature values, in degrees Celsius, must be unspecified 
+                          or None if using an array of PET values as input
+    :param latitude_degrees: the latitude of the location, in degrees north, required if using an array 
+                             of temperatures as input
+    :param fitting_params: optional dictionary of distribution types to dictionaries of previously computed 
+                           distribution fitting parameters, see spi() for details, the scaled values are fitted 
+                           to the calibration period for distributions without fitting parameters
+    :return: arrays of SPEI values for each of the distributions, in the order of the distributions argument
+    :rtype: tuple of numpy.ndarray of type float, of the same size as the input temperature and precipitation arrays
+    '''
+
+    _validate_distributions(distributions)
+
+    precips_mm = utils.nan_filled(precips_mm)
+    if pet_mm is not None:
+        pet_mm = utils.nan_filled(pet_mm)
+    if temps_celsius is not None:
+        temps_celsius = utils.nan_filled(temps_celsius)
+
     # if we're passed all missing values then we can't compute anything, return the same array of missing values
-    if (np.ma.is_masked(precips_mm) and precips_mm.mask.all()) or np.all(np.isnan(precips_mm)):
-        return precips_mm
+    if np.all(np.isnan(precips_mm)):
+        return tuple(precips_mm for _ in distributions)
 
     # validate the function's argument combinations
     if temps_celsius is not None:
@@ -221,7 +577,8 @@ def spei(scale,
         raise ValueError(message)
 
     # subtract the PET from precipitation, adding an offset to ensure that all values are positive
-    p_minus_pet = (precips_mm.flatten() - pet_mm.flatten()) + 1000.0
+    p_minus_pet = precips_mm.ravel() - pet_mm.ravel()
+    p_minus_pet += 1000.0
         
     # remember the original length of the input array, in order to facilitate returning an array of the same size
     original_length = precips_mm.size
@@ -229,32 +586,148 @@ def spei(scale,
     # get a sliding sums array, with each element's value scaled by the specified number of time steps
     scaled_values = compute.sum_to_scale(p_minus_pet, scale)
 
-    if distribution is Distribution.gamma:
+    speis = []
+    for distribution in distributions:
 
-        # fit the scaled values to a gamma distribution and transform to corresponding normalized sigmas 
-        transformed_fitted_values = compute.transform_fitted_gamma(scaled_values,
-                                                                   data_start_year, 
-                                                                   calibration_year_initial,
-                                                                   calibration_year_final,
-                                                                   periodicity)
-    
-    elif distribution is Distribution.pearson_type3:
-    
-        # fit the scaled values to a Pearson Type III distribution and transform to corresponding normalized sigmas 
-        transformed_fitted_values = compute.transform_fitted_pearson(scaled_values, 
-                                                                     data_start_year,
-                                                                     calibration_year_initial,
-                                                                     calibration_year_final,
-                                                                     periodicity)
+        # fit the scaled values to the distribution and transform to corresponding normalized sigmas 
+        params = None if fitting_params is None else fitting_params.get(distribution)
+        transformed_fitted_values = _transform_fitted(scaled_values,
+                                                      distribution,
+                                                      data_start_year,
+                                                      calibration_year_initial,
+                                                      calibration_year_final,
+                                                      periodicity,
+                                                      params)
         
-    # clip values to within the valid range, reshape the array back to 1-D
-    spei = np.clip(transformed_fitted_values, _FITTED_INDEX_VALID_MIN, _FITTED_INDEX_VALID_MAX).flatten()
+        # clip values to within the valid range, reshape the array back to 1-D
+        spei = np.clip(transformed_fitted_values, _FITTED_INDEX_VALID_MIN, _FITTED_INDEX_VALID_MAX).flatten()
     
-    # return the original size array 
-    return spei[0:original_length]
+        # keep the original size array 
+        speis.append(spei[0:original_length])
+
+    return tuple(speis)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spei_grid(precips_mm,
+              pets_mm,
+              scale,
+              distribution,
+              data_start_year,
+              calibration_year_initial,
+              calibration_year_final,
+              periodicity,
+              fitting_params=None):
+    '''
+    Computes SPEI (Standardized Precipitation Evapotranspiration Index) for many time series at once, such as all 
+    the grid cells of a tile. The (P - PET) values are computed once for all the time series, and the scaled sums, 
+    calibration statistics, and fitting/transform are computed across all the time series with array operations 
+    rather than a time series at a time.
+
+    Time series with all precipitation or all PET values missing result in all missing (NaN) values.
+
+    :param precips_mm: 2-D numpy array of precipitation values, in millimeters, with shape (cells, time), 
+                       see spi_grid() for details
+    :param pets_mm: 2-D numpy array of PET values, in millimeters, with the same shape as the precipitation array
+    :param scale: number of time steps over which the values should be scaled before the index is computed
+    :param distribution: distribution type to be used for the internal fitting/transform computation
+    :param data_start_year: the initial year of the input precipitation and PET datasets
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are
+                        'monthly' and 'daily', see spi() for details
+    :param fitting_params: optional dictionary of previously computed distribution fitting parameters, each an array
+                           with shape (cells, 12|366), see spi_grid() for details
+    :return SPEI values fitted to the specified distribution at the specified time step scale, unitless
+    :rtype: 2-D numpy.ndarray of floats with the same shape as the input arrays of precipitation and PET values
+    '''
+
+    if fitting_params is not None:
+        fitting_params = {distribution: fitting_params}
+
+    return spei_grid_distributions(precips_mm,
+                                   pets_mm,
+                                   scale,
+                                   [distribution],
+                                   data_start_year,
+                                   calibration_year_initial,
+                                   calibration_year_final,
+                                   periodicity,
+                                   fitting_params)[0]
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spei_grid_distributions(precips_mm,
+                            pets_mm,
+                            scale,
+                            distributions,
+                            data_start_year,
+                            calibration_year_initial,
+                            calibration_year_final,
+                            periodicity,
+                            fitting_params=None):
+    '''
+    Computes SPEI for many time series at once, fitted to each of several distributions, for example both gamma 
+    and Pearson Type III. The (P - PET) values are computed, scaled, and reshaped only once, and the scaled values 
+    are shared by the fittings/transforms of all the distributions. See spei_grid() for details of the arguments.
+
+    :param precips_mm: 2-D numpy array of precipitation values, in millimeters, with shape (cells, time)
+    :param pets_mm: 2-D numpy array of PET values, in millimeters, with the same shape as the precipitation array
+    :param scale: number of time steps over which the values should be scaled before the index is computed
+    :param distributions: sequence of the distribution types to be used for the fitting/transform computations
+    :param data_start_year: the initial year of the input precipitation and PET datasets
+    :param calibration_year_initial: initial year of the calibration period
+    :param calibration_year_final: final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, 'monthly' or 'daily'
+    :param fitting_params: optional dictionary of distribution types to dictionaries of previously computed 
+                           distribution fitting parameters, see spi_grid_distributions() for details
+    :return SPEI values fitted to each of the distributions at the specified time step scale, unitless, 
+            in the order of the distributions argument
+    :rtype: tuple of 2-D numpy.ndarray of floats with the same shape as the input arrays
+    '''
+
+    # the differences are scaled, fitted, and transformed in the same way as precipitation is for SPI
+    return spi_grid_distributions(spei_grid_differences(precips_mm, pets_mm),
+                                  scale,
+                                  distributions,
+                                  data_start_year,
+                                  calibration_year_initial,
+                                  calibration_year_final,
+                                  periodicity,
+                                  fitting_params)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def spei_grid_differences(precips_mm,
+                          pets_mm):
+    '''
+    Computes the (P - PET) differences from which SPEI is computed, for many time series at once, with an offset 
+    added to ensure that all values are positive. SPEI is computed from these differences in the same way as SPI 
+    is computed from precipitation, so the differences can be passed to spi_grid_distributions() and 
+    spi_grid_fitting_params(), for example after these have been summed to several scales at once.
+
+    Time series with all precipitation or all PET values missing result in all missing (NaN) differences.
+
+    :param precips_mm: 2-D numpy array of precipitation values, in millimeters, with shape (cells, time)
+    :param pets_mm: 2-D numpy array of PET values, in millimeters, with the same shape as the precipitation array
+    :return: the offset (P - PET) differences, in millimeters
+    :rtype: 2-D numpy.ndarray of floats with the same shape as the input arrays
+    '''
+
+    precips_mm = utils.nan_filled(precips_mm)
+    pets_mm = utils.nan_filled(pets_mm)
+
+    # validate that the two input arrays are compatible
+    if (precips_mm.shape != pets_mm.shape) or (len(precips_mm.shape) != 2):
+        message = 'Incompatible precipitation and PET arrays: shapes {0} and {1}'.format(precips_mm.shape, 
+                                                                                         pets_mm.shape)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # subtract the PET from precipitation, adding an offset to ensure that all values are positive
+    p_minus_pet = precips_mm - pets_mm
+    p_minus_pet += 1000.0
+
+    return p_minus_pet
 
 #-------------------------------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def scpdsi(precip_time_series,
            pet_time_series,
            awc,
@@ -275,6 +748,8 @@ def scpdsi(precip_time_series,
     :return: four numpy arrays containing SCPDSI, PDSI, PHDI, and Z-Index values respectively 
     '''
     
+    from climate_indices import palmer
+
     return palmer.scpdsi(precip_time_series,
                          pet_time_series,
                          awc,
@@ -283,7 +758,37 @@ def scpdsi(precip_time_series,
                          calibration_end_year)
     
 #-------------------------------------------------------------------------------------------------------------------------------------------
-@numba.jit
+def scpdsi_grid(precips,
+                pets,
+                awcs,
+                data_start_year,
+                calibration_start_year,
+                calibration_end_year):
+    '''
+    Computes the self-calibrated Palmer Drought Severity Index (scPDSI), PDSI, PHDI, PMDI, and Palmer Z-Index 
+    for many locations at once, such as all the grid cells of a tile.
+    
+    :param precips: 2-D array of monthly precipitation values, in inches, with shape (cells, months)
+    :param pets: 2-D array of monthly PET values, in inches, with shape (cells, months)
+    :param awcs: 1-D array of available water capacities (soil constants), in inches, one per cell
+    :param data_start_year: initial year of the input precipitation and PET datasets, 
+                            both of which are assumed to start in January of this year
+    :param calibration_start_year: initial year of the calibration period 
+    :param calibration_end_year: final year of the calibration period 
+    :return: five numpy arrays with shape (cells, months) containing SCPDSI, PDSI, PHDI, PMDI, and Z-Index values 
+             respectively, with all missing values for the cells without valid inputs
+    '''
+    
+    from climate_indices import palmer
+
+    return palmer.scpdsi_grid(precips,
+                              pets,
+                              awcs,
+                              data_start_year,
+                              calibration_start_year,
+                              calibration_end_year)
+    
+#-------------------------------------------------------------------------------------------------------------------------------------------
 def pdsi(precip_time_series,
          pet_time_series,
          awc,
@@ -304,6 +809,8 @@ def pdsi(precip_time_series,
     :return: four numpy arrays containing PDSI, PHDI, PMDI, and Z-Index values respectively 
     '''
     
+    from climate_indices import palmer
+
     return palmer.pdsi(precip_time_series,
                        pet_time_series,
                        awc,
@@ -312,13 +819,13 @@ def pdsi(precip_time_series,
                        calibration_end_year)
     
 #-------------------------------------------------------------------------------------------------------------------------------------------
-@numba.jit     
 def percentage_of_normal(values, 
                          scale,
                          data_start_year,
                          calibration_start_year,
                          calibration_end_year,
-                         periodicity):
+                         periodicity,
+                         averages=None):
     '''
     This function finds the percent of normal values (average of each calendar month or day over a specified 
     calibration period of years) for a specified time steps scale. The normal precipitation for each calendar time step 
@@ -344,65 +851,192 @@ def percentage_of_normal(values,
                         'daily' indicates an array of full years of daily values with 366 days per year, as if each
                         year were a leap year and any missing final months of the final year filled with NaN values, 
                         with array size == (# years * 366)
+    :param averages: optional array of previously computed normal averages for each calendar time step, with 
+                     shape (12) for monthly or (366) for daily, as returned by percentage_of_normal_averages(), 
+                     if provided then these are used in place of computing the calibration period averages
     :return: percent of normal precipitation values corresponding to the scaled precipitation values array   
     :rtype: numpy.ndarray of type float
     '''
 
-    # if doing monthly then we'll use 12 periods, corresponding to calendar months, if daily assume years w/366 days
-    if periodicity == 'monthly':
-        periodicity = 12
-    elif periodicity == 'daily':
-        periodicity = 366
+    # compute as a grid of a single time series
+    if averages is not None:
+        averages = averages[np.newaxis]
+    return percentage_of_normal_grid(utils.nan_filled(values).reshape((1, -1)),
+                                     scale,
+                                     data_start_year,
+                                     calibration_start_year,
+                                     calibration_end_year,
+                                     periodicity,
+                                     averages)[0]
+    
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def percentage_of_normal_averages(values, 
+                                  scale,
+                                  data_start_year,
+                                  calibration_start_year,
+                                  calibration_end_year,
+                                  periodicity):
+    '''
+    Computes the normal (calibration period average) of the scaled values for each calendar time step, as used 
+    for percentage of normal. These can be saved and later passed as the averages argument of percentage_of_normal() 
+    in order to compute percentage of normal for new values without the calibration period values.
+    
+    :param values: 1-D numpy array of precipitation values, see percentage_of_normal() for details
+    :param scale: integer number of months over which the normal value is computed (eg 3-months, 6-months, etc.)
+    :param data_start_year: the initial year of the input monthly values array
+    :param calibration_start_year: the initial year of the calibration period
+    :param calibration_end_year: the final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily'
+    :return: the normal average of the scaled values for each calendar time step, with shape (12) for monthly 
+             or (366) for daily
+    :rtype: numpy.ndarray of type float
+    '''
+
+    # compute as a grid of a single time series
+    return percentage_of_normal_grid_averages(utils.nan_filled(values).reshape((1, -1)),
+                                              scale,
+                                              data_start_year,
+                                              calibration_start_year,
+                                              calibration_end_year,
+                                              periodicity)[0]
+    
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def percentage_of_normal_grid(precips, 
+                              scale,
+                              data_start_year,
+                              calibration_start_year,
+                              calibration_end_year,
+                              periodicity,
+                              averages=None):
+    '''
+    Computes percentage of normal for many time series at once, such as all the longitudes of a latitude slice. 
+    The scaled values are reshaped to (years, steps, cells), so that the normal averages of all the calendar time 
+    steps and cells and the percentages of normal of all the time steps are each computed with array operations.
+    
+    :param precips: 2-D numpy array of precipitation values, in any units, with shape (cells, time), 
+                    see percentage_of_normal() for details
+    :param scale: integer number of time steps over which the normal value is computed (eg 3-months, 6-months, etc.)
+    :param data_start_year: the initial year of the input precipitation values array
+    :param calibration_start_year: the initial year of the calibration period
+    :param calibration_end_year: the final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily', see percentage_of_normal() for details
+    :param averages: optional array of previously computed normal averages with shape (cells, 12|366), as returned 
+                     by percentage_of_normal_grid_averages(), if provided then these are used in place of computing 
+                     the calibration period averages
+    :return: percent of normal precipitation values corresponding to the scaled precipitation values
+    :rtype: 2-D numpy.ndarray of floats with the same shape as the input array of precipitation values
+    '''
+
+    precips = utils.nan_filled(precips)
+
+    # get the scaled values with shape (years, 12|366, cells)
+    scale_sums = _scaled_grid_values(precips, scale, periodicity)
+
+    # if we're passed all missing values then we can't compute anything, return the same array of missing values
+    if scale_sums is None:
+        return precips
+
+    # get the normal average of the scale sums for each calendar time step, unless these were provided, 
+    # with the (cells, steps) averages transposed to (steps, cells) in order to broadcast over the years
+    if averages is None:
+        averages = _calibration_averages(scale_sums,
+                                         data_start_year,
+                                         calibration_start_year,
+                                         calibration_end_year)
     else:
-        message = 'Invalid periodicity argument: \'{0}\''.format(periodicity)
-        _logger.error(message)
-        raise ValueError(message)
+        averages = np.transpose(averages)
     
-    # bypass processing if all values are masked    
-    if np.ma.is_masked(values) and values.mask.all():
-        return values
+    # divide each scaled value by the average of its calendar time step, using a NaN 
+    # divisor (and therefore getting a NaN percentage) where the average isn't positive
+    divisors = np.where(averages > 0.0, averages, np.NaN).astype(scale_sums.dtype)
+    percentages_of_normal = scale_sums / divisors
     
+    # reshape back to (cells, time), truncated to the original number of time steps
+    return utils.reshape_from_years_steps_cells(percentages_of_normal, precips.shape[1])
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def percentage_of_normal_grid_averages(precips, 
+                                       scale,
+                                       data_start_year,
+                                       calibration_start_year,
+                                       calibration_end_year,
+                                       periodicity):
+    '''
+    Computes the normal (calibration period average) of the scaled values for each calendar time step for many 
+    time series at once, as used for percentage of normal. The result can be stored and later passed to 
+    percentage_of_normal_grid() as its averages argument, in order to compute percentage of normal for updated 
+    precipitation without the calibration period values.
+    
+    :param precips: 2-D numpy array of precipitation values, in any units, with shape (cells, time), 
+                    see percentage_of_normal() for details
+    :param scale: integer number of time steps over which the normal value is computed (eg 3-months, 6-months, etc.)
+    :param data_start_year: the initial year of the input precipitation values array
+    :param calibration_start_year: the initial year of the calibration period
+    :param calibration_end_year: the final year of the calibration period
+    :param periodicity: the periodicity of the time series represented by the input data, valid/supported values are 
+                        'monthly' and 'daily'
+    :return: the normal average of the scaled values for each calendar time step, with shape (cells, 12|366)
+    :rtype: 2-D numpy.ndarray of floats
+    '''
+
+    precips = utils.nan_filled(precips)
+
+    # get the scaled values with shape (years, 12|366, cells)
+    scale_sums = _scaled_grid_values(precips, scale, periodicity)
+
+    # if we're passed all missing values then we can't compute anything, use all missing averages
+    if scale_sums is None:
+        return np.full((precips.shape[0], compute.Periodicity[periodicity].value), np.NaN)
+
+    # transpose the (steps, cells) averages to (cells, steps), to match the orientation of the input array
+    return np.transpose(_calibration_averages(scale_sums,
+                                              data_start_year,
+                                              calibration_start_year,
+                                              calibration_end_year))
+    
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def _calibration_averages(scale_sums, 
+                          data_start_year,
+                          calibration_start_year,
+                          calibration_end_year):
+    '''
+    Computes the average of the scaled values for each calendar time step over the calibration period.
+    
+    :param scale_sums: array of scaled values with shape (years, 12|366, cells)
+    :param data_start_year: the initial year of the input scaled values array
+    :param calibration_start_year: the initial year of the calibration period
+    :param calibration_end_year: the final year of the calibration period
+    :return: the average of the scaled values for each calendar time step, with shape (12|366, cells)
+    :rtype: 2-D numpy.ndarray of floats
+    '''
+
     # make sure we've been provided with sane calibration limits
     if data_start_year > calibration_start_year:
-        raise ValueError('Invalid start year arguments (data and/or calibration): calibration start year ' + \
-                         'is before the data start year')
-    elif ((calibration_end_year - calibration_start_year + 1) * 12) > values.size:
-        raise ValueError('Invalid calibration period specified: total calibration years exceeds the actual ' + \
-                         'number of years of data')
+        message = 'Invalid start year arguments (data and/or calibration): calibration start year ' + \
+                  'is before the data start year'
+        _logger.error(message)
+        raise ValueError(message)
+    elif (calibration_end_year - calibration_start_year + 1) > scale_sums.shape[0]:
+        message = 'Invalid calibration period specified: total calibration years exceeds the actual ' + \
+                  'number of years of data'
+        _logger.error(message)
+        raise ValueError(message)
         
-    # get an array containing a sliding sum on the specified time step scale -- i.e. if the scale is 3 then the first 
-    # two elements will be np.NaN, since we need 3 elements to get a sum, and then from the third element to the end 
-    # the values will equal the sum of the corresponding time step plus the values of the two previous time steps
-    scale_sums = compute.sum_to_scale(values, scale)
-    
-    # extract the timesteps over which we'll compute the normal average for each time step of the year
-    calibration_years = calibration_end_year - calibration_start_year + 1
-    calibration_start_index = (calibration_start_year - data_start_year) * periodicity
-    calibration_end_index = calibration_start_index + (calibration_years * periodicity)
+    # extract the years over which we'll compute the normal average for each time step of the year
+    calibration_start_index = calibration_start_year - data_start_year
+    calibration_end_index = calibration_end_year - data_start_year + 1
     calibration_period_sums = scale_sums[calibration_start_index:calibration_end_index]
     
-    # for each time step in the calibration period, get the average of the scale sum 
-    # for that calendar time step (i.e. average all January sums, then all February sums, etc.) 
-    averages = np.full((periodicity,), np.nan)
-    for i in range(periodicity):
-        averages[i] = np.nanmean(calibration_period_sums[i::periodicity])
-    
-    #TODO replace the below loop with a vectorized implementation
-    # for each time step of the scale_sums array find its corresponding
-    # percentage of the time steps scale average for its respective calendar time step
-    percentages_of_normal = np.full(scale_sums.shape, np.nan)
-    for i in range(scale_sums.size):
-
-        # make sure we don't have a zero divisor
-        divisor = averages[i % periodicity]
-        if divisor > 0.0:
-            
-            percentages_of_normal[i] = scale_sums[i] / divisor
-    
-    return percentages_of_normal
+    # for each calendar time step (and cell) get the average of the scale sums over the calibration years 
+    # (i.e. average all January sums, then all February sums, etc.), time steps without any valid sums 
+    # (such as the initial time steps at larger scales) have a NaN average
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(calibration_period_sums, axis=0)
     
 #-------------------------------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def pet(temperature_celsius,
         latitude_degrees,
         data_start_year):
@@ -418,29 +1052,44 @@ def pet(temperature_celsius,
     :rtype: 1-D numpy.ndarray of floats
     '''
     
+    temperature_celsius = utils.nan_filled(temperature_celsius)
+
     # make sure we're not dealing with all NaN values
-    if np.ma.isMaskedArray(temperature_celsius) and temperature_celsius.count() == 0:
+    if np.all(np.isnan(temperature_celsius)):
         
-        # we started with all NaNs for the temperature, so just return the same as PET
+        # we started with all NaNs for the temperature, so just return the same
         return temperature_celsius
-
-    else:
-        
-        # we were passed a vanilla Numpy array, look for indices where the value == NaN
-        nan_indices = np.isnan(temperature_celsius)
-        if np.all(nan_indices):
-        
-            # we started with all NaNs for the temperature, so just return the same
-            return temperature_celsius
         
     # make sure we're not dealing with a NaN or out-of-range latitude value
     if latitude_degrees is not None and not np.isnan(latitude_degrees) and \
         (latitude_degrees < 90.0) and (latitude_degrees > -90.0):
         
         # compute and return the PET values using Thornthwaite's equation
+        from climate_indices import thornthwaite
         return thornthwaite.potential_evapotranspiration(temperature_celsius, latitude_degrees, data_start_year)
         
     else:
         message = 'Invalid latitude value: {0} (must be in degrees north, between -90.0 and 90.0 inclusive)'.format(latitude_degrees)
         _logger.error(message)
         raise ValueError(message)
+
+#-------------------------------------------------------------------------------------------------------------------------------------------
+def pet_grid(temperatures_celsius,
+             latitudes_degrees,
+             data_start_year):
+    '''
+    This function computes potential evapotranspiration (PET) using Thornthwaite's equation for many locations at once, 
+    such as all the grid cells of a tile.
+    
+    :param temperatures_celsius: 2-D array of monthly average temperature values, in degrees Celsius, with shape (cells, months)
+    :param latitudes_degrees: 1-D array of the latitudes of the cells, in degrees north, each must be within range 
+                              [-90.0 ... 90.0] (inclusive), otherwise a ValueError is raised
+    :param data_start_year: the initial year of the input dataset
+    :return: an array of PET values with shape (cells, months), in millimeters/month, with all missing values 
+             for the cells with all missing temperatures
+    :rtype: 2-D numpy.ndarray of floats
+    '''
+    
+    from climate_indices import thornthwaite
+
+    return thornthwaite.potential_evapotranspiration_grid(temperatures_celsius, latitudes_degrees, data_start_year)
@@ -1,4 +1,3 @@
-import collections
 import logging
 import math
 import numba
@@ -8,10 +7,7 @@ import warnings
 from climate_indices import utils
 
 #-----------------------------------------------------------------------------------------------------------------------
-# set up a basic, global _logger
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    datefmt='%Y-%m-%d  %H:%M:%S')
+# module _logger, the configuration of logging handlers and levels is left to the application
 _logger = logging.getLogger(__name__)
 
 #-----------------------------------------------------------------------------------------------------------------------
@@ -23,335 +19,362 @@ _PDSI_MAX = 4.0
 warnings.simplefilter('ignore', Warning)
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _water_balance(AWC,
                    PET,
                    P):
     """
-    Performs a water balance accounting for a location which accounts for several monthly water balance variables, 
+    Performs a water balance accounting for a location which accounts for several monthly water balance variables,
     calculated based on precipitation, potential evapotranspiration, and available water capacity of the soil.
-     
+
     Input arrays are expected to be the same size, corresponding to the total number of months.
-    
-    :param AWC: available water capacity (total, including top/surface inch), in inches 
-    :param PET: potential evapotranspiration, in inches 
-    :param P: precipitation, in inches 
-    :return: seven numpy arrays with values for evapotranspiration, potential recharge, recharge, runoff, 
-             potential runoff, loss, and potential loss 
+
+    :param AWC: available water capacity (total, including top/surface inch), in inches
+    :param PET: potential evapotranspiration, in inches
+    :param P: precipitation, in inches
+    :return: seven numpy arrays with values for evapotranspiration, potential recharge, recharge, runoff,
+             potential runoff, loss, and potential loss
     """
-    
+
     # flatten timeseries to a 1-D array
-    PET = PET.flatten() 
-    P = P.flatten()
-    
-    total_months = PET.shape[0]
+    PET = np.asarray(PET, dtype=np.float64).flatten()
+    P = np.asarray(P, dtype=np.float64).flatten()
 
     # allocate arrays for the water balance values
-    ET = np.zeros((total_months,))
-    PR = np.zeros((total_months,))
-    R = np.zeros((total_months,))
-    Rs = np.zeros((total_months,))
-    Ru = np.zeros((total_months,))
-    RO = np.zeros((total_months,))
-    PRO = np.zeros((total_months,))
-    S = np.zeros((total_months,))
-    Ss = np.zeros((total_months,))
-    Su = np.zeros((total_months,))
-    L = np.zeros((total_months,))
-    Ls = np.zeros((total_months,))
-    Lu = np.zeros((total_months,))
-    PL = np.zeros((total_months,))
-    PLs = np.zeros((total_months,))
-    PLu = np.zeros((total_months,))
-    
-    # A is the difference between the soil moisture in the surface soil layer and the potential evapotranspiration.
-    A = np.zeros((total_months,))
-        
-    # B is the difference between the precipitation and potential evapotranspiration, i.e. the excess precipitation
-    B = np.zeros((total_months,))
+    ET, PR, R, RO, PRO, L, PL = np.zeros((7, PET.shape[0]))
 
-    # C is the amount of room (in inches) in the surface soil layer that can be recharged with precipitation
-    C = np.zeros((total_months,))
+    _water_balance_cell(float(AWC), PET, P, ET, PR, R, RO, PRO, L, PL)
+
+    return ET, PR, R, RO, PRO, L, PL
+
+#-----------------------------------------------------------------------------------------------------------------------
+@numba.njit(parallel=True, cache=True)
+def _water_balance_grid(AWC,
+                        PET,
+                        P):
+    """
+    Performs the water balance accounting of _water_balance() for many locations at once, such as all the grid cells
+    of a tile. The cells are divided among threads, with the two-layer soil model of each cell advanced
+    one month at a time, using the cell's own available water capacity.
+
+    :param AWC: 1-D array of available water capacities (total, including top/surface inch), in inches,
+                one per cell
+    :param PET: 2-D array of potential evapotranspiration, in inches, with shape (cells, months)
+    :param P: 2-D array of precipitation, in inches, with shape (cells, months)
+    :return: seven numpy arrays, each with shape (cells, months), with values for evapotranspiration,
+             potential recharge, recharge, runoff, potential runoff, loss, and potential loss
+    """
+
+    total_cells, total_months = PET.shape
+
+    # allocate arrays for the water balance values
+    ET = np.zeros((total_cells, total_months))
+    PR = np.zeros((total_cells, total_months))
+    R = np.zeros((total_cells, total_months))
+    RO = np.zeros((total_cells, total_months))
+    PRO = np.zeros((total_cells, total_months))
+    L = np.zeros((total_cells, total_months))
+    PL = np.zeros((total_cells, total_months))
+
+    for cell in numba.prange(total_cells):
+        _water_balance_cell(AWC[cell], PET[cell], P[cell],
+                            ET[cell], PR[cell], R[cell], RO[cell], PRO[cell], L[cell], PL[cell])
+
+    return ET, PR, R, RO, PRO, L, PL
+
+#-----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
+def _water_balance_cell(AWC,
+                        PET,
+                        P,
+                        ET,
+                        PR,
+                        R,
+                        RO,
+                        PRO,
+                        L,
+                        PL):
+    """
+    Performs the water balance accounting for a single location, writing the monthly water balance values
+    into preallocated arrays of the same size as the input arrays.
+
+    :param AWC: available water capacity (total, including top/surface inch), in inches
+    :param PET: 1-D array of potential evapotranspiration, in inches
+    :param P: 1-D array of precipitation, in inches
+    :param ET: output array of evapotranspiration
+    :param PR: output array of potential recharge
+    :param R: output array of recharge
+    :param RO: output array of runoff
+    :param PRO: output array of potential runoff
+    :param L: output array of loss
+    :param PL: output array of potential loss
+    """
 
-    # D is the amount of excess precipitation (in inches) that is left over after the surface soil layer is recharged
-    D = np.zeros((total_months,))
-    
-    # E is the amount of room (in inches) in the underlying soil layer that is available to be recharged with excess precipitation
-    E = np.zeros((total_months,))
-   
     # NOTE: SOIL MOISTURE STORAGE IS HANDLED BY DIVIDING THE SOIL INTO TWO
     # LAYERS AND ASSUMING THAT 1 INCH OF WATER CAN BE STORED IN THE SURFACE
     # LAYER. AWC IS THE COMBINED AVAILABLE MOISTURE CAPACITY IN BOTH SOIL
-    # LAYERS. THE UNDERLYING LAYER HAS AN AVAILABLE CAPACITY THAT DEPENDS 
-    # ON THE SOIL CHARACTERISTICS OF THE LOCATION. THE SOIL MOISTURE 
-    # STORAGE WITHIN THE SURFACE LAYER (UNDERLYING LAYER) IS THE AMOUNT OF 
-    # AVAILABLE MOISTURE STORED AT THE BEGINNING OF THE MONTH IN THE 
+    # LAYERS. THE UNDERLYING LAYER HAS AN AVAILABLE CAPACITY THAT DEPENDS
+    # ON THE SOIL CHARACTERISTICS OF THE LOCATION. THE SOIL MOISTURE
+    # STORAGE WITHIN THE SURFACE LAYER (UNDERLYING LAYER) IS THE AMOUNT OF
+    # AVAILABLE MOISTURE STORED AT THE BEGINNING OF THE MONTH IN THE
     # SURFACE (UNDERLYING) LAYER.
-    
+
     # Ss_AWC is the available moisture capacity in the surface soil layer; it is a constant across all locations.
-    Ss_AWC = 1 
-    
+    Ss_AWC = 1.0
+
     #!!!!!! VALIDATE !!!!!!!!!!!!!!!!!!!!!!!!!!
     #
     # proposed fix for locations where the AWC is less than 1.0 inch
     #
     if AWC < 1.0:
         Ss_AWC = AWC
-    #!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!    
-    
+    #!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
+
 
     # Su_AWC is the available moisture capacity in the underlying soil layer; it is a location-specific constant.
     Su_AWC = AWC - Ss_AWC
-    
+
     ## INITIAL CONDITIONS
-    
-    # NOTE: AS THE FIRST STEP IN THE CALCULATION OF THE PALMER DROUGHT 
-    # INDICES IS A WATER BALANCE, THE CALCULATION SHOULD BE INITIALIZED 
-    # DURING A MONTH AND YEAR IN WHICH THE SOIL MOISTURE STORAGE CAN BE 
+
+    # NOTE: AS THE FIRST STEP IN THE CALCULATION OF THE PALMER DROUGHT
+    # INDICES IS A WATER BALANCE, THE CALCULATION SHOULD BE INITIALIZED
+    # DURING A MONTH AND YEAR IN WHICH THE SOIL MOISTURE STORAGE CAN BE
     # ASSUMED TO BE FULL.
-    
-    # S0 = AWC is the initial combined soil moisture storage 
+
+    # S0 = AWC is the initial combined soil moisture storage
     # in both soil layers. Within the following water balance
     # calculation loop, S0 is the soil moisture storage in
     # both soil layers at the beginning of each month.
-    S0 = AWC 
-    
-    # Ss0 = 1 is the initial soil moisture storage in the surface 
+    S0 = AWC
+
+    # Ss0 = 1 is the initial soil moisture storage in the surface
     # soil layer. Within the following water balance calculation
-    # loop, Ss0 is the soil moisture storage in the surface soil 
+    # loop, Ss0 is the soil moisture storage in the surface soil
     # layer at the beginning of each month.
-    Ss0 = 1 
-    
+    Ss0 = 1.0
+
     #!!!!!! VALIDATE !!!!!!!!!!!!!!!!!!!!!!!!!!
     #
     # proposed fix for locations where the AWC is less than 1.0 inch
     #
     if AWC < 1.0:
         Ss0 = AWC
-    #!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!    
+    #!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 
-    # Su0 = Su_AWC is the initial soil moisture storage in 
-    # the underlying soil layer. Within the following 
+    # Su0 = Su_AWC is the initial soil moisture storage in
+    # the underlying soil layer. Within the following
     # water balance calculation loop, Su0 is the soil
-    # moisture storage in the underlying soil layer at the 
+    # moisture storage in the underlying soil layer at the
     # beginning of each month.
     Su0 = Su_AWC
-    
+
     ## CALCULATION OF THE WATER BALANCE
-    
-    # THE FIRST PART OF PALMER'S METHOD FOR CALCULATING THE PDSI INVOLVES 
-    # THE CALCULATION OF  A WATER BALANCE USING HISTORIC RECORDS OF 
+
+    # THE FIRST PART OF PALMER'S METHOD FOR CALCULATING THE PDSI INVOLVES
+    # THE CALCULATION OF  A WATER BALANCE USING HISTORIC RECORDS OF
     # PRECIPITATION AND TEMPERATURE AND THORNTHWAITE'S METHOD.
-    
+
     # k is the counter for each month of data on record
-    for k in range(total_months):
+    for k in range(PET.shape[0]):
 
         ## VARIABLE DEFINITIONS
-        
+
         # P is the historical, monthly precipitation for the location.
-        
+
         # Ss is the soil moisture storage in the surface layer at the end of the month.
-        
+
         # Su is the soil moisture storage in the underlying layer at the end of the month.
-        
-        # S is the combined soil moisture storage in the combined surface 
+
+        # S is the combined soil moisture storage in the combined surface
         # and underlying soil moisture storage layers at the end of the month.
-        
+
         # ET is the actual evapotranspiration from the combined surface and underlying soil moisture storage layers.
-        
+
         # Ls is the actual soil moisture loss from the surface soil moisture storage layer.
-        
+
         # Lu is the actual soil moisture loss from the underlying soil moisture storage layer.
-        
+
         # L is the actual soil moisture loss from the combined surface and underlying soil moisture storage layers.
-        
-        # PLs is the potential soil moisture loss from the surface soil moisture storage layer.
-        
-        # PLu is the potential soil moisture loss from the underlying soil moisture storage layer.
-        
+
         # PL is the potential soil moisture loss from the combined surface and underlying soil moisture storage layers.
-        
+
         # Rs is the actual recharge to the surface soil moisture storage layer.
-        
+
         # Ru is the actual recharge to the underlying soil moisture storage layer.
-        
+
         # R is the actual recharge to the combined surface and underlying soil moisture storage layers.
-        
-        # PR is the potential recharge to the combined surface and underlying 
+
+        # PR is the potential recharge to the combined surface and underlying
         # soil moisture storage layers at the beginning of the month.
         PR[k] = AWC - S0
-        
+
         # RO is the actual runoff from the combined surface and underlying soil moisture storage layers.
-        
+
         # PRO is the potential runoff. According to Alley (1984),
         # PRO = AWC - PR = Ss + Su; here Ss and Su refer to those values at
         # the beginning of the month: Ss0 and Su0.
         PRO[k] = AWC - PR[k]
-        
+
         # A is the difference between the soil moisture in the surface soil layer and the potential evapotranspiration.
-        A[k] = Ss0 - PET[k]
-        
+        A = Ss0 - PET[k]
+
         # B is the difference between the precipitation and potential
         # evapotranspiration - it is the excess precipitation.
-        B[k] = P[k] - PET[k]
-        
+        B = P[k] - PET[k]
+
         ## INTERNAL CALCULATIONS
 
-        # calculate potential loss values        
-        PL[k], PLs[k], PLu[k] = _water_balance_potential_loss(A[k], PLs[k], PLu[k], PET[k], Ss0, Su0, AWC)
-        
-        if B[k] >= 0:
-            # B >= 0 indicates that there is sufficient 
-            # precipitation during month k to satisfy the PET 
-            # requirement for month k - i.e., there is excess 
-            # precipitation. Therefore, there is no moisture loss 
+        # calculate potential loss values
+        PL[k] = _water_balance_potential_loss(A, PET[k], Ss0, Su0, AWC)
+
+        if B >= 0:
+            # B >= 0 indicates that there is sufficient
+            # precipitation during month k to satisfy the PET
+            # requirement for month k - i.e., there is excess
+            # precipitation. Therefore, there is no moisture loss
             # from either soil layer.
-            
+
             # C is the amount of room (in inches) in the
             # surface soil layer that can be recharged with
             # precipitation. Here 1 refers to the
-            # approximate number of inches of moisture 
+            # approximate number of inches of moisture
             # allocated to the surface soil layer.
-            C[k] = 1 - Ss0 
-            
-            if C[k] >= B[k]:
-                # C >= B indicates that there is AT LEAST enough room in the surface soil layer for recharge than there 
-                # is excess precipitation. Therefore, precipitation will recharge ONLY the surface soil layer, and there 
+            C = 1.0 - Ss0
+
+            if C >= B:
+                # C >= B indicates that there is AT LEAST enough room in the surface soil layer for recharge than there
+                # is excess precipitation. Therefore, precipitation will recharge ONLY the surface soil layer, and there
                 # is NO runoff and NO soil moisture loss from either soil layer.
-                Rs[k] = B[k]
-                Ls[k] = 0
-                Ss[k] = Ss0 + Rs[k]
-                Ru[k] = 0
-                Lu[k] = 0
-                Su[k] = Su0
-                RO[k] = 0
+                Rs = B
+                Ls = 0.0
+                Ss = Ss0 + Rs
+                Ru = 0.0
+                Lu = 0.0
+                Su = Su0
+                RO[k] = 0.0
 
             else:
-                # C < B indicates that there is more excess precipitation than there is room in the surface soil layer  
-                # for recharge. Therefore, the excess precipitation will recharge BOTH the surface soil layer and 
+                # C < B indicates that there is more excess precipitation than there is room in the surface soil layer
+                # for recharge. Therefore, the excess precipitation will recharge BOTH the surface soil layer and
                 # the underlying soil layer, and there is NO soil moisture loss from either soil layer.
-                Rs[k] = C[k]
-                Ls[k] = 0 
-                Ss[k] = 1   # the approximate number of inches of moisture allocated to the surface soil layer
-                D[k] = B[k] - Rs[k] # amount of excess precipitation (in inches) left over after the surface soil layer is recharged
-                E[k] = Su_AWC - Su0  # amount of room (in inches) in the underlying soil layer available to be recharged with excess precipitation
-                if E[k] > D[k]: 
-                    # E > D indicates that there is more room in the underlying soil layer than there is excess 
+                Rs = C
+                Ls = 0.0
+                Ss = 1.0   # the approximate number of inches of moisture allocated to the surface soil layer
+                D = B - Rs # amount of excess precipitation (in inches) left over after the surface soil layer is recharged
+                E = Su_AWC - Su0  # amount of room (in inches) in the underlying soil layer available to be recharged with excess precipitation
+                if E > D:
+                    # E > D indicates that there is more room in the underlying soil layer than there is excess
                     # precipitation available after recharge to the surface soil layer. Therefore, there is no runoff.
-                    Ru[k] = D[k]
-                    RO[k] = 0
-            
-                else: 
+                    Ru = D
+                    RO[k] = 0.0
+
+                else:
                     # E <= D indicates that there is AT MOST enough room in the underlying soil layer for the excess
-                    # precipitation available after recharge to the surface soil layer. In the case that there is enough 
+                    # precipitation available after recharge to the surface soil layer. In the case that there is enough
                     # room, there is no runoff. In the case that there is not enough room, runoff occurs.
-                    Ru[k] = E[k]
-                    RO[k] = D[k] - Ru[k]
+                    Ru = E
+                    RO[k] = D - Ru
 
                 # Since there is more excess precipitation than there is room in the surface soil layer for recharge,
-                # the soil moisture storage in the underlying soil layer at the end of the month is equal to the storage  
+                # the soil moisture storage in the underlying soil layer at the end of the month is equal to the storage
                 # at the beginning of the month plus any recharge to the underlying soil layer.
-                Lu[k] = 0
-                Su[k] = Su0 + Ru[k] 
+                Lu = 0.0
+                Su = Su0 + Ru
 
             # Since there is sufficient precipitation during month k to satisfy the PET
             # requirement for month k, the actual evapotranspiration is equal to PET.
-            ET[k] = PET[k] 
-            
-        else: 
+            ET[k] = PET[k]
+
+        else:
             # B < 0 indicates that there is not sufficient precipitation
             # during month k to satisfy the PET requirement for month k -
-            # i.e., there is NO excess precipitation. Therefore, soil 
-            # moisture loss occurs, and there is NO runoff and NO recharge 
+            # i.e., there is NO excess precipitation. Therefore, soil
+            # moisture loss occurs, and there is NO runoff and NO recharge
             # to either soil layer.
-            if Ss0 >= abs(B[k]):
-                # Ss0 >= abs(B) indicates that there is AT LEAST sufficient moisture in the surface soil layer at 
-                # the beginning of the month k to satisfy the PET requirement for month k. Therefore, soil moisture 
-                # loss occurs from ONLY the surface soil layer, and the soil moisture storage in the surface soil layer 
+            if Ss0 >= abs(B):
+                # Ss0 >= abs(B) indicates that there is AT LEAST sufficient moisture in the surface soil layer at
+                # the beginning of the month k to satisfy the PET requirement for month k. Therefore, soil moisture
+                # loss occurs from ONLY the surface soil layer, and the soil moisture storage in the surface soil layer
                 # at the end of the month is equal to the storage at the beginning of the month less any loss from
                 # the surface soil layer.
-                Ls[k] = abs(B[k])
-                Rs[k] = 0
-                Ss[k] = Ss0 - Ls[k]
-                Lu[k] = 0
-                Ru[k] = 0
-                Su[k] = Su0
-            else: 
-                # Ss0 < abs(B) indicates that there is NOT sufficient moisture in the surface soil layer at 
-                # the beginning of month k to satisfy the PET requirement for month k. Therefore, soil moisture loss 
-                # occurs from BOTH the surface and underlying soil layers, and Lu is calculated according to 
-                # the equation given in Alley (1984). The soil moisture storage in the underlying soil layer 
+                Ls = abs(B)
+                Rs = 0.0
+                Ss = Ss0 - Ls
+                Lu = 0.0
+                Ru = 0.0
+                Su = Su0
+            else:
+                # Ss0 < abs(B) indicates that there is NOT sufficient moisture in the surface soil layer at
+                # the beginning of month k to satisfy the PET requirement for month k. Therefore, soil moisture loss
+                # occurs from BOTH the surface and underlying soil layers, and Lu is calculated according to
+                # the equation given in Alley (1984). The soil moisture storage in the underlying soil layer
                 # at the end of the month is equal to the storage at the beginning of the month less the loss from
                 # the underlying soil layer.
-                Ls[k] = Ss0
-                Rs[k] = 0
-                Ss[k] = 0
-                Lu[k] = min(((abs(B[k]) - Ls[k]) * Su0) / AWC, Su0)
+                Ls = Ss0
+                Rs = 0.0
+                Ss = 0.0
+                Lu = min(((abs(B) - Ls) * Su0) / AWC, Su0)
                 #*
                 #
-                # Lu[k] = min((abs(B[k]) - Ls[k])*Su0/(AWC + 1),Su0);
+                # Lu = min((abs(B) - Ls)*Su0/(AWC + 1),Su0);
                 # NOTE: This equation above was used by the NCDC in their FORTRAN code (pdi.f)
-                # prior to 2013. See Jacobi et al. (2013) for a full explanation. 
+                # prior to 2013. See Jacobi et al. (2013) for a full explanation.
                 #
                 #*
-                Ru[k] = 0
-                Su[k] = Su0 - Lu[k]
+                Ru = 0.0
+                Su = Su0 - Lu
 
-            # Since there is NOT sufficient precipitation during month k to satisfy the PET requirement for month k, 
+            # Since there is NOT sufficient precipitation during month k to satisfy the PET requirement for month k,
             # the actual evapotranspiration is equal to precipitation plus any soil moisture loss from BOTH the surface
             # and underlying soil layers.
-            RO[k] = 0
-            ET[k] = P[k] + Ls[k] + Lu[k] 
-            
-        R[k] = Rs[k] + Ru[k]
-        L[k] = Ls[k] + Lu[k]
-        S[k] = Ss[k] + Su[k]
-        
+            RO[k] = 0.0
+            ET[k] = P[k] + Ls + Lu
+
+        R[k] = Rs + Ru
+        L[k] = Ls + Lu
+
         # S0, Ss0, and Su0 are reset to their end of the current month [k]
         # values - S, Ss, and Su0, respectively - such that they can be
-        # used as the beginning of the month values for the next month 
+        # used as the beginning of the month values for the next month
         # (k + 1).
-        S0 = S[k]
-        Ss0 = Ss[k]
-        Su0 = Su[k]
-        
-    return ET, PR, R, RO, PRO, L, PL 
-    
+        S0 = Ss + Su
+        Ss0 = Ss
+        Su0 = Su
+
 #-----------------------------------------------------------------------------------------------------------------------
-def _water_balance_potential_loss(A, PLs, PLu, PET, Ss0, Su0, AWC):
+@numba.njit(cache=True)
+def _water_balance_potential_loss(A, PET, Ss0, Su0, AWC):
 
-    # A >= 0 indicates that there is sufficient moisture in the surface soil layer to satisfy the PET 
+    # A >= 0 indicates that there is sufficient moisture in the surface soil layer to satisfy the PET
     # requirement for month k. Therefore, there is potential moisture loss from only the surface soil layer.
-    if A >= 0: 
-        PLs = PET         
-        PLu = 0
-        
-    else: 
-        # A < 0 indicates that there is not sufficient moisture in the surface soil layer to satisfy 
+    if A >= 0:
+        PLs = PET
+        PLu = 0.0
+
+    else:
+        # A < 0 indicates that there is not sufficient moisture in the surface soil layer to satisfy
         # the PET requirement for month k. Therefore, there is potential moisture loss from both the surface
         # and underlying soil layers. The equation for PLu is given in Alley (1984).
         PLs = Ss0
         PLu = ((PET - PLs) * Su0) / AWC
-        
-        # Su0 >= PLu indicates that there is sufficient moisture in the underlying soil layer to (along with 
+
+        # Su0 >= PLu indicates that there is sufficient moisture in the underlying soil layer to (along with
         # the moisture in the surface soil layer) satisfy the PET requirement for month k; therefore, PLu is
         # as calculated according to the equation given in Alley (1984).
-        if Su0 >= PLu: 
+        if Su0 >= PLu:
             PLu = ((PET - PLs) * Su0) / AWC
-        
+
         else:
-            # Su0 < PLu indicates that there is not sufficient moisture in the underlying soil layer to (along with  
-            # the moisture in the surface soil layer) satisfy the PET requirement for month k; therefore, PLu is 
+            # Su0 < PLu indicates that there is not sufficient moisture in the underlying soil layer to (along with
+            # the moisture in the surface soil layer) satisfy the PET requirement for month k; therefore, PLu is
             # equal to the moisture storage in the underlying soil layer at the beginning of the month.
             PLu = Su0
-    
-    PL = PLs + PLu
-    
-    return PL, PLs, PLu
+
+    return PLs + PLu
 
 #-----------------------------------------------------------------------------------------------------------------------
 @numba.vectorize([numba.f8(numba.f8,numba.f8),
-                  numba.f4(numba.f4,numba.f4)])
+                  numba.f4(numba.f4,numba.f4)],
+                 cache=True)
 def _cafec_coeff_ufunc(actual,
                        potential):
     """
@@ -391,6 +414,9 @@ def _cafec_coefficients(P,
     This function calculates CAFEC coefficients used for computing Palmer's Z index using inputs from 
     the water balance function.
     
+    The input arrays can also have shape (years, 12) or (years, 12, cells), the latter for computing the 
+    coefficients of many locations at once, in which case the coefficients have shape (12, cells).
+    
     :param P: 1-D numpy.ndarray of monthly precipitation observations, in inches, the number of array elements 
               (array size) should be a multiple of 12 (representing an ordinal number of full years)
     :param PET: 1-D numpy.ndarray of monthly potential evapotranspiration values, in inches, the number of array elements 
@@ -413,8 +439,8 @@ def _cafec_coefficients(P,
                             is assumed to correspond to January of this initial year
     :param calibration_start_year: initial year of the calibration period, should be >= data_start_year
     :param calibration_end_year: final year of the calibration period
-    :return 1-D numpy.ndarray of Z-Index values, with shape corresponding to the input arrays
-    :rtype: numpy.ndarray of floats
+    :return the CAFEC coefficients alpha, beta, gamma, and delta for each calendar month
+    :rtype: four numpy.ndarray objects of floats
     '''
     
     # get only the data from within the calibration period
@@ -457,37 +483,43 @@ def _cafec_coefficients(P,
         return alpha, beta, gamma, delta
 
 #-----------------------------------------------------------------------------------------------------------------------    
-@numba.jit
 def _calibrate_data(arrays,
                     data_start_year,
                     calibration_start_year,
                     calibration_end_year):
+    '''
+    Extracts the calibration period from water balance arrays.
+
+    :param arrays: list of arrays, each either a 1-D array of monthly values or an array of monthly values
+                   with shape (years, 12) or (years, 12, cells)
+    :param data_start_year: initial year of the input arrays
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :return: list of arrays of the calibration period values, with shape (years, 12) or (years, 12, cells)
+    :rtype: list of numpy.ndarray objects of floats
+    '''
 
     #!!!!!!!!!!!!!
-    # TODO make sure calibration years range is valid, i.e. within actual data years range 
-    
+    # TODO make sure calibration years range is valid, i.e. within actual data years range
+
     # determine the array (year axis) indices for the calibration period
-    total_data_years = int(arrays[0].shape[0] / 12)
-    data_end_year = data_start_year + total_data_years - 1
     calibration_start_year_index = calibration_start_year - data_start_year
-    calibration_end_year_index = calibration_end_year - data_start_year 
+    calibration_end_year_index = calibration_end_year - data_start_year
 
     # for each array pull out the calibration period
     calibration_arrays = []
     for data_array in arrays:
-        data_array = utils.reshape_to_2d(data_array, 12)
-    
-        # get calibration period arrays
-        if (calibration_start_year > data_start_year) or (calibration_end_year < data_end_year):
-            data_array = data_array[calibration_start_year_index:calibration_end_year_index + 1, :]
-        
-        # add to the list of calibrated arrays we'll return
-        calibration_arrays.append(data_array)
-        
+
+        # get the arrays of flat monthly values into (years, 12) orientation
+        if len(data_array.shape) == 1:
+            data_array = utils.reshape_to_2d(data_array, 12)
+
+        # add the calibration period array to the list of calibrated arrays we'll return
+        calibration_arrays.append(data_array[calibration_start_year_index:calibration_end_year_index + 1])
+
     return calibration_arrays
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _climatic_characteristic(alpha,
                              beta,
                              gamma,
@@ -504,9 +536,18 @@ def _climatic_characteristic(alpha,
                              data_start_year,
                              calibration_start_year,
                              calibration_end_year):
-    
-    total_calibration_years = calibration_end_year - calibration_start_year + 1
-    
+    '''
+    Computes the weighting factor K for each calendar month, which is used to adjust the moisture departures
+    for computing Palmer's Z index.
+
+    The water balance arrays are either 1-D arrays of monthly values, arrays with shape (years, 12), or arrays
+    with shape (years, 12, cells) for computing the weighting factors of many locations at once, in which case
+    the CAFEC coefficients have shape (12, cells).
+
+    :return: array of weighting factors, with shape (12) or (12, cells)
+    :rtype: numpy.ndarray of floats
+    '''
+
     # get only the data from within the calibration period
     calibrated_arrays = _calibrate_data([P, PET, ET, PR, R, PRO, RO, PL, L],
                                         data_start_year,
@@ -522,70 +563,54 @@ def _climatic_characteristic(alpha,
     PL = calibrated_arrays[7]
     L = calibrated_arrays[8]
 
-    # CALIBRATED CAFEC, K, AND d CALCULATION
-    # NOTE: 
-    # The Z index is calculated with a calibrated K (weighting factor) but a full record d (difference between actual 
-    # precipitation and CAFEC precipitation). CAFEC precipitation is calculated analogously to a simple water balance,
-    # where precipitation is equal to evaporation plus runoff (and ground water recharge) plus or minus any change 
-    # in soil moisture storage. 
-    d_hat = np.empty((total_calibration_years, 12)) 
-    for k in range(total_calibration_years):
-        for i in range(12):
-            # CAFEC_hat is calculated for month i of year k of the calibration period.
-            CAFEC_hat = (alpha[i] * PET[k, i]) + \
-                        (beta[i] * PR[k, i]) + \
-                        (gamma[i] * PRO[k, i]) - \
-                        (delta[i] * PL[k, i])
-                              
-            # Calculate d_hat, the difference between actual precipitation
-            # and CAFEC precipitation for month i of year k of the calibration period.
-            d_hat[k, i] = P[k, i] - CAFEC_hat
-    
-    # NOTE: D_hat, T_hat, K_hat, and z_hat are all calibrated
-    # variables - i.e., they are calculated only for the calibration period.
-    D_hat = np.empty((12,)) 
-    T_hat = np.empty((12,)) 
-    K_hat = np.empty((12,)) 
-    z_hat_m = np.empty((12,)) 
-    P_bar = np.nanmean(P, axis=0)
-    PET_bar = np.nanmean(PET, axis=0)
-    R_bar = np.nanmean(R, axis=0)
-    L_bar = np.nanmean(L, axis=0)
-    RO_bar = np.nanmean(RO, axis=0)
-            
-    for i in range(12):
-                    
-        # Calculate D_hat, the average of the absolute values of d_hat for month i.
-        D_hat[i] = np.nanmean(np.absolute(d_hat[:, i]))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
 
-        # Calculate T_hat, a measure of the ratio of "moisture demand" to "moisture supply" for month i
+        # CALIBRATED CAFEC, K, AND d CALCULATION
+        # NOTE:
+        # The Z index is calculated with a calibrated K (weighting factor) but a full record d (difference between actual
+        # precipitation and CAFEC precipitation). CAFEC precipitation is calculated analogously to a simple water balance,
+        # where precipitation is equal to evaporation plus runoff (and ground water recharge) plus or minus any change
+        # in soil moisture storage.
+        # CAFEC_hat is calculated for each month of each year of the calibration period, with
+        # the coefficients of each calendar month broadcast over the years axis.
+        CAFEC_hat = (alpha * PET) + (beta * PR) + (gamma * PRO) - (delta * PL)
+
+        # Calculate d_hat, the difference between actual precipitation
+        # and CAFEC precipitation for each month of the calibration period.
+        d_hat = P - CAFEC_hat
+
+        # NOTE: D_hat, T_hat, K_hat, and z_hat are all calibrated
+        # variables - i.e., they are calculated only for the calibration period.
+        P_bar = np.nanmean(P, axis=0)
+        PET_bar = np.nanmean(PET, axis=0)
+        R_bar = np.nanmean(R, axis=0)
+        L_bar = np.nanmean(L, axis=0)
+        RO_bar = np.nanmean(RO, axis=0)
+
+        # Calculate D_hat, the average of the absolute values of d_hat for each calendar month.
+        D_hat = np.nanmean(np.absolute(d_hat), axis=0)
+
+        # Calculate T_hat, a measure of the ratio of "moisture demand" to "moisture supply" for each calendar month
         #TODO if this value evaluates to a negative number less than -2.8 then the following equation for K_hat  pylint: disable=fixme
-        # will result in a math domain error -- is it valid here to limit this value to -2.8 or greater? 
-        T_hat[i] = (PET_bar[i] + R_bar[i] + RO_bar[i]) / (P_bar[i] + L_bar[i])
-        
-        # Calculate K_hat, the denominator of the K equation for month i.
+        # will result in a math domain error -- is it valid here to limit this value to -2.8 or greater?
+        T_hat = (PET_bar + R_bar + RO_bar) / (P_bar + L_bar)
+
+        # Calculate K_hat, the denominator of the K equation for each calendar month.
         # from figure 3, Palmer 1965
-        K_hat[i] = 1.5 * math.log10((T_hat[i] + 2.8) / D_hat[i]) + .50
-        
-        # Calculate z_hat, the numerator of the K equation for month i.
-        z_hat_m[i] = D_hat[i] * K_hat[i]
-    
-    # sum the monthly Z-hat values
-    z_hat = sum(z_hat_m)
-    
-    # Calculate the weighting factor, K, using the calibrated variables K_hat and z_hat. The purpose of
-    # the weighting factors is to adjust the  departures from normal precipitation d (calculated below), 
-    # such that they are comparable among different locations and for different months. The K tends to be
-    # large in arid regions and small in humid regions (cf. Alley, 1984; Journal of Climate and Applied 
-    # Meteorology, Vol. 23, No. 7, July 1984).
-    K = np.empty((12,)) 
-    for i in range(12):
-        K[i] = (17.67 * K_hat[i]) / z_hat
+        K_hat = 1.5 * np.log10((T_hat + 2.8) / D_hat) + .50
+
+        # Calculate z_hat, the numerator of the K equation, summed over the calendar months.
+        z_hat = np.sum(D_hat * K_hat, axis=0)
 
-    return K
+        # Calculate the weighting factor, K, using the calibrated variables K_hat and z_hat. The purpose of
+        # the weighting factors is to adjust the  departures from normal precipitation d (calculated below),
+        # such that they are comparable among different locations and for different months. The K tends to be
+        # large in arid regions and small in humid regions (cf. Alley, 1984; Journal of Climate and Applied
+        # Meteorology, Vol. 23, No. 7, July 1984).
+        return (17.67 * K_hat) / z_hat
 
 #-----------------------------------------------------------------------------------------------------------------------
-#@numba.jit  # not working yet, AssertionError: Failed at object (analyzing bytecode)
 def _z_index(P,
              PET,
              ET,
@@ -600,102 +625,94 @@ def _z_index(P,
              calibration_end_year):
     '''
     This function calculates Palmer's Z index using inputs from the water balance function.
-    
-    :param P: 1-D numpy.ndarray of monthly precipitation observations, in inches, the number of array elements 
-              (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param PET: 1-D numpy.ndarray of monthly potential evapotranspiration values, in inches, the number of array elements 
-                (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param ET: 1-D numpy.ndarray of monthly evapotranspiration values, in inches, the number of array elements 
-               (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param PR: 1-D numpy.ndarray of monthly potential recharge values, in inches, the number of array elements 
-               (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param R: 1-D numpy.ndarray of monthly recharge values, in inches, the number of array elements 
-              (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param RO: 1-D numpy.ndarray of monthly runoff values, in inches, the number of array elements 
-               (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param PRO: 1-D numpy.ndarray of monthly potential runoff values, in inches, the number of array elements 
-                (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param L: 1-D numpy.ndarray of monthly loss values, in inches, the number of array elements 
-              (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param PL: 1-D numpy.ndarray of monthly potential loss values, in inches, the number of array elements 
-               (array size) should be a multiple of 12 (representing an ordinal number of full years)
-    :param data_start_year: initial year of the input arrays, i.e. the first element of each of the input arrays 
+
+    The inputs are either 1-D arrays of monthly values for a single location, or 2-D arrays with shape
+    (cells, months) for computing the Z index of many locations at once, such as all the cells of a tile.
+
+    :param P: array of monthly precipitation observations, in inches, the number of months
+              should be a multiple of 12 (representing an ordinal number of full years)
+    :param PET: array of monthly potential evapotranspiration values, in inches, the number of months
+                should be a multiple of 12 (representing an ordinal number of full years)
+    :param ET: array of monthly evapotranspiration values, in inches, the number of months
+               should be a multiple of 12 (representing an ordinal number of full years)
+    :param PR: array of monthly potential recharge values, in inches, the number of months
+               should be a multiple of 12 (representing an ordinal number of full years)
+    :param R: array of monthly recharge values, in inches, the number of months
+              should be a multiple of 12 (representing an ordinal number of full years)
+    :param RO: array of monthly runoff values, in inches, the number of months
+               should be a multiple of 12 (representing an ordinal number of full years)
+    :param PRO: array of monthly potential runoff values, in inches, the number of months
+                should be a multiple of 12 (representing an ordinal number of full years)
+    :param L: array of monthly loss values, in inches, the number of months
+              should be a multiple of 12 (representing an ordinal number of full years)
+    :param PL: array of monthly potential loss values, in inches, the number of months
+               should be a multiple of 12 (representing an ordinal number of full years)
+    :param data_start_year: initial year of the input arrays, i.e. the first element of each of the input arrays
                             is assumed to correspond to January of this initial year
     :param calibration_start_year: initial year of the calibration period, should be >= data_start_year
     :param calibration_end_year: final year of the calibration period
-    :return 1-D numpy.ndarray of Z-Index values, with shape corresponding to the input arrays
+    :return Z-Index values, as a 1-D array for 1-D inputs or with shape (cells, months) for 2-D inputs
     :rtype: numpy.ndarray of floats
     '''
-    
-    # the potential (PET, ET, PR, PL) and actual (R, RO, S, L, P) water balance arrays are reshaped as 2-D arrays  
-    # (matrices) such that the rows of each matrix represent years and the columns represent calendar months
-#     arrays_to_reshape = [PET, ET, PR, PL, R, RO, RO, PRO, L, P]
-#     for ary in arrays_to_reshape:
-#         ary = utils.reshape_to_years_months(ary)
-    PET = utils.reshape_to_2d(PET, 12)
-    ET = utils.reshape_to_2d(ET, 12)
-    PR = utils.reshape_to_2d(PR, 12)
-    PL = utils.reshape_to_2d(PL, 12)
-    R = utils.reshape_to_2d(R, 12)
-    RO = utils.reshape_to_2d(RO, 12)
-    PRO = utils.reshape_to_2d(PRO, 12)
-    L = utils.reshape_to_2d(L, 12)
-    P = utils.reshape_to_2d(P, 12)
+
+    # the potential (PET, ET, PR, PL) and actual (R, RO, S, L, P) water balance arrays are reshaped such that
+    # the first axis represents years and the second represents calendar months, i.e. (years, 12) for a single
+    # location or (years, 12, cells) for many locations
+    original_shape = P.shape
+    arrays = [P, PET, ET, PR, R, RO, PRO, L, PL]
+    if len(original_shape) == 2:
+        arrays = [utils.reshape_to_years_steps_cells(values, 12) for values in arrays]
+    else:
+        arrays = [utils.reshape_to_2d(values, 12) for values in arrays]
+    P, PET, ET, PR, R, RO, PRO, L, PL = arrays
 
     # get the CAFEC coefficients
-    alpha, beta, gamma, delta = _cafec_coefficients(P, 
-                                                    PET, 
+    alpha, beta, gamma, delta = _cafec_coefficients(P,
+                                                    PET,
                                                     ET,
                                                     PR,
                                                     R,
                                                     RO,
                                                     PRO,
-                                                    L, 
-                                                    PL, 
-                                                    data_start_year, 
-                                                    calibration_start_year, 
+                                                    L,
+                                                    PL,
+                                                    data_start_year,
+                                                    calibration_start_year,
                                                     calibration_end_year)
-    # get the weighting factor K        
-    K = _climatic_characteristic(alpha, 
-                                 beta, 
-                                 gamma, 
-                                 delta, 
-                                 P, 
-                                 ET, 
-                                 PET, 
-                                 R, 
-                                 PR, 
-                                 RO, 
-                                 PRO, 
-                                 L, 
-                                 PL, 
+    # get the weighting factor K
+    K = _climatic_characteristic(alpha,
+                                 beta,
+                                 gamma,
+                                 delta,
+                                 P,
+                                 ET,
+                                 PET,
+                                 R,
+                                 PR,
+                                 RO,
+                                 PRO,
+                                 L,
+                                 PL,
                                  data_start_year,
                                  calibration_start_year,
                                  calibration_end_year)
-    
-    # loop over the full period of record and compute the CAFEC precipitation, and use this to determine the moisture departure
-    # FULL RECORD CAFEC AND d CALCULATION
-    z = np.empty((P.shape[0], 12))
-    for n in range(P.shape[0]):
-        for i in range(12):
-            
-            # calculate the CAFEC precipitation
-            CAFEC = (alpha[i] * PET[n, i]) + \
-                    (beta[i] * PR[n, i]) + \
-                    (gamma[i] * PRO[n, i]) - \
-                    (delta[i] * PL[n, i])
-            
-            # Calculate d_hat, difference between actual precipitation and CAFEC precipitation
-            departure = P[n, i] - CAFEC
-            
-            # Calculate the Z-index (moisture anomaly index)
-            z[n, i] = K[i] * departure
 
-    # return the Z-Index values as a 1-D array
-    return z.flatten()
+    # compute the CAFEC precipitation over the full period of record, and use this to determine the moisture departure
+    # FULL RECORD CAFEC AND d CALCULATION, with the coefficients of each calendar month broadcast over the years axis
+    CAFEC = (alpha * PET) + (beta * PR) + (gamma * PRO) - (delta * PL)
+
+    # Calculate the departure, the difference between actual precipitation and CAFEC precipitation,
+    # and from this the Z-index (moisture anomaly index)
+    z = K * (P - CAFEC)
+
+    # return the Z-Index values in the orientation of the inputs
+    if len(original_shape) == 2:
+        return utils.reshape_from_years_steps_cells(z, original_shape[1])
+    else:
+        return z.flatten()
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _compute_X(Z, k, PPe, X1, X2, PX1, PX2, PX3, X, BT):
 
     # This function calculates PX1 and PX2 and calls the backtracking loop.
@@ -751,7 +768,7 @@ def _compute_X(Z, k, PPe, X1, X2, PX1, PX2, PX3, X, BT):
     return PX1, PX2, PX3, X, BT
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _backtrack(k, 
                PPe, 
                PX1, 
@@ -822,7 +839,7 @@ def _backtrack(k,
     return X, BT
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _between_0s(k, Z, X3, PX1, PX2, PX3, PPe, BT, X):
 
     # This function is called when non-zero, non-one hundred PPe values occur
@@ -846,14 +863,14 @@ def _between_0s(k, Z, X3, PX1, PX2, PX3, PPe, BT, X):
     
     # In order to set all values of X between the two instances of PPe = 0, the
     # first instance of PPe = 0 must be found. This "for" loop counts back 
-    # through previous PPe values to find the first instance where PPe = 0.
+    # through previous PPe values to find the first instance where PPe = 0,
+    # with the first month used when there's no such previous month.
+    r = 0
     for count1 in range(k, 0, -1):
         if PPe[count1] == 0:
             r = count1
             break
 
-    #FIXME r could be undefined at this point if the above loop never enters the PPe[count1] == 0 condition
-
     # Backtrack from the current month where PPe = 0 to the last month where PPe = 0.
     for count in range(k, r - 1, -1):
         # Set X = PX3, where the BT array indicates it for the month
@@ -867,7 +884,7 @@ def _between_0s(k, Z, X3, PX1, PX2, PX3, PPe, BT, X):
     return PV, PX1, PX2, PX3, PPe, X, BT
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _dry_spell_abatement(k, Z, V, Pe, PPe, PX1, PX2, PX3, X1, X2, X3, X, BT):
 
     # In the case of an established drought, Palmer (1965) notes that a value of Z = -0.15 will maintain an
@@ -903,7 +920,7 @@ def _dry_spell_abatement(k, Z, V, Pe, PPe, PX1, PX2, PX3, X1, X2, X3, X, BT):
     return PV, PPe, PX1, PX2, PX3, X, BT
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _wet_spell_abatement(k, Z, V, Pe, PPe, PX1, PX2, PX3, X1, X2, X3, X, BT):
 
     # In the case of an established wet spell, Palmer (1965) notes that a value of Z = +0.15 will maintain an 
@@ -939,7 +956,7 @@ def _wet_spell_abatement(k, Z, V, Pe, PPe, PX1, PX2, PX3, X1, X2, X3, X, BT):
 
 #-----------------------------------------------------------------------------------------------------------------------
 # comparable to the case() subroutine in original NCDC pdi.f 
-@numba.jit
+@numba.njit(cache=True)
 def _pmdi(probability,
           X1, 
           X2, 
@@ -971,6 +988,7 @@ def _pmdi(probability,
     return _pmdi
 
 #------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
 def _find_previous_nonzero(backtrack,
                            k_index):
     """
@@ -989,6 +1007,7 @@ def _find_previous_nonzero(backtrack,
     return index
 
 #------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
 def _assign_X_backtracking(X, 
                            backtrack, 
                            preliminary_X1, 
@@ -1016,7 +1035,7 @@ def _assign_X_backtracking(X,
                 X[i] = preliminary_X1[i]
 
 #------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _assign_X(k,
               number_of_months,
               BT,
@@ -1067,8 +1086,55 @@ def _assign_X(k,
             X[k] = PX2[k]
 
 #------------------------------------------------------------------------------------------------------------------
-#@numba.jit
 def _pdsi_from_zindex(Z):
+    '''
+    Computes the PDSI, PHDI, and PMDI for a location from its Z-Index values.
+
+    :param Z: 1-D array of monthly Z-Index values
+    :return: three 1-D arrays, respectively containing PDSI, PHDI, and PMDI values
+    :rtype: three numpy.ndarray objects of floats
+    '''
+
+    Z = np.asarray(Z, dtype=np.float64)
+
+    # allocate the arrays which will be populated by the compiled recursion
+    PDSI = np.zeros(Z.shape)
+    PHDI = np.zeros(Z.shape)
+    PMDI = np.zeros(Z.shape)
+    _pdsi_from_zindex_cell(Z, PDSI, PHDI, PMDI)
+
+    return PDSI, PHDI, PMDI
+
+#------------------------------------------------------------------------------------------------------------------
+@numba.njit(parallel=True, cache=True)
+def _pdsi_from_zindex_grid(Z):
+    '''
+    Computes the PDSI, PHDI, and PMDI for many locations at once, with the locations divided among threads.
+
+    :param Z: 2-D array of monthly Z-Index values, with shape (cells, months)
+    :return: three 2-D arrays with shape (cells, months), respectively containing PDSI, PHDI, and PMDI values
+    :rtype: three numpy.ndarray objects of floats
+    '''
+
+    PDSI = np.zeros(Z.shape)
+    PHDI = np.zeros(Z.shape)
+    PMDI = np.zeros(Z.shape)
+    for cell in numba.prange(Z.shape[0]):
+        _pdsi_from_zindex_cell(Z[cell], PDSI[cell], PHDI[cell], PMDI[cell])
+
+    return PDSI, PHDI, PMDI
+
+#------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
+def _pdsi_from_zindex_cell(Z, PDSI, PHDI, PMDI):
+    '''
+    Performs the PDSI recursion, including backtracking, over the Z-Index values of a location.
+    
+    :param Z: 1-D array of monthly Z-Index values
+    :param PDSI: 1-D array to be filled with the computed PDSI values, the same size as Z
+    :param PHDI: 1-D array to be filled with the computed PHDI values, the same size as Z
+    :param PMDI: 1-D array to be filled with the computed PMDI values, the same size as Z
+    '''
 
     ## INITIALIZE PDSI AND PHDI CALCULATIONS
     
@@ -1095,8 +1161,10 @@ def _pdsi_from_zindex(Z):
     PX3 = np.zeros((number_of_months,))
     PPe = np.zeros((number_of_months,))
     X = np.zeros((number_of_months,))
-    PMDI = np.zeros((number_of_months,))
     
+    # PV is the preliminary V value and is used in operational calculations.
+    PV = 0.0
+
     # loop over all months in the dataset, calculating PDSI and PHDI for each
     for k in range(number_of_months):
         
@@ -1105,7 +1173,7 @@ def _pdsi_from_zindex(Z):
             if abs(X3) <= 0.5:   # drought or wet spell ends
                 
                 # PV is the preliminary V value and is used in operational calculations.
-                PV = 0 
+                PV = 0.0
                 
                 # PPe is the preliminary Pe value and is used in operational calculations.
                 PPe[k] = 0 
@@ -1172,10 +1240,6 @@ def _pdsi_from_zindex(Z):
         # assign X for cases where PX3 and BT equal 0
         _assign_X(k, number_of_months, BT, PX1, PX2, PX3, X)
         
-        # round values to four decimal places
-        for values in [X1, X2, X3, Pe, V, X, PX1, PX2, PX3, PPe]:
-            values = np.around(values, decimals=4)
-        
     ## ASSIGN PDSI VALUES
     # NOTE: 
     # In Palmer's effort to create a meteorological drought index (PDSI),
@@ -1186,7 +1250,7 @@ def _pdsi_from_zindex(Z):
     # ended the first month when the probability becomes greater than 0%
     # and then continues to remain greater than 0% until it reaches 100% 
     # (cf. Palmer, 1965; US Weather Bureau Research Paper 45).
-    PDSI = X
+    PDSI[:] = X
     
     ## ASSIGN PHDI VALUES
     # NOTE:
@@ -1205,29 +1269,17 @@ def _pdsi_from_zindex(Z):
 #         else:
 #             PHDI[s] = possible_phdi
     
-    # Palmer Hydrological Drought Index
-    # use universal function to select PHDI from either the PX3 or X arrays
-    PHDI = _phdi_select_ufunc(PX3, X)
-    
-    # return the computed variables
-    return PDSI, PHDI, PMDI
-
-#-----------------------------------------------------------------------------------------------------------------------
-@numba.vectorize([numba.f8(numba.f8,numba.f8)])
-def _phdi_select_ufunc(px3, x):
-    
-    if px3 == 0:
-        # For calculation and program advancement purposes, the PX3 term is sometimes set equal to 0. 
-        # In such instances, the PHDI is set equal to X (the PDSI), which accurately reflects the X3 value.
-        phdi = x
-    else:
-        phdi = px3
-
-    
-    return phdi
+    # Palmer Hydrological Drought Index, selected from either the PX3 or X arrays
+    for k in range(number_of_months):
+        if PX3[k] == 0:
+            # For calculation and program advancement purposes, the PX3 term is sometimes set equal to 0. 
+            # In such instances, the PHDI is set equal to X (the PDSI), which accurately reflects the X3 value.
+            PHDI[k] = X[k]
+        else:
+            PHDI[k] = PX3[k]
 
 #-----------------------------------------------------------------------------------------------------------------------
-#@numba.jit  # not working yet
+@numba.njit(cache=True, error_model='numpy')
 def _compute_scpdsi(established_index_values,
                     sczindex_values,
                     scpdsi_values,
@@ -1255,9 +1307,11 @@ def _compute_scpdsi(established_index_values,
     :param calibration_complete
     :param tolerance
      '''
-    # empty all X lists
-    wet_index_deque = collections.deque([])
-    dry_index_deque = collections.deque([])
+    # the wet and dry index values kept for possible backtracking, as stacks with the most recently added values 
+    # at the top, both stacks always hold the same number of values
+    wet_index_stack = np.empty(established_index_values.size)
+    dry_index_stack = np.empty(established_index_values.size)
+    stack_size = 0
 
     # Initializes the book keeping indices used in finding the PDSI
     V = 0.0
@@ -1271,11 +1325,11 @@ def _compute_scpdsi(established_index_values,
     
         # These variables represent the values for  corresponding variables for the current period.
         # They are kept separate because many calculations depend on last period's values.  
-        new_X = 0
-        new_X1 = 0
-        new_X2 = 0
-        new_X3 = 0
-        previous_established_index_X3 = 0
+        new_X = 0.0
+        new_X1 = 0.0
+        new_X2 = 0.0
+        new_X3 = 0.0
+        previous_established_index_X3 = 0.0
 
 #         # ZE is the Z value needed to end an established spell
 #         ZE
@@ -1313,24 +1367,25 @@ def _compute_scpdsi(established_index_values,
             # If EstablishedIndex is 0 then there is no reason to calculate Q or ZE, V and Prob are reset to 0;
             if previous_established_index_X3 == 0:
             
-                new_X3 = 0
-                new_V = 0
-                new_probability = 0
-                new_X, new_X1, new_X2, new_X3 = _choose_X(pdsi_values,
-                                                          established_index_values,
-                                                          wet_index_values,
-                                                          dry_index_values,
-                                                          sczindex_values,
-                                                          wet_index_deque,
-                                                          dry_index_deque,
-                                                          wet_M,
-                                                          wet_B,
-                                                          dry_M,
-                                                          dry_B,
-                                                          new_X, 
-                                                          new_X3, 
-                                                          period, 
-                                                          previous_key)
+                new_X3 = 0.0
+                new_V = 0.0
+                new_probability = 0.0
+                new_X, new_X1, new_X2, new_X3, stack_size = _choose_X(pdsi_values,
+                                                                      established_index_values,
+                                                                      wet_index_values,
+                                                                      dry_index_values,
+                                                                      sczindex_values,
+                                                                      wet_index_stack,
+                                                                      dry_index_stack,
+                                                                      stack_size,
+                                                                      wet_M,
+                                                                      wet_B,
+                                                                      dry_M,
+                                                                      dry_B,
+                                                                      new_X, 
+                                                                      new_X3, 
+                                                                      period, 
+                                                                      previous_key)
 
             # Otherwise all calculations are needed.
             else:
@@ -1339,44 +1394,44 @@ def _compute_scpdsi(established_index_values,
                 # ZE is the Z value needed to end an established spell
                 ZE = (m + b) * (wd * 0.5 - c * previous_established_index_X3)
                 Q = ZE + V
-                new_V = sczindex_values[period] - wd * (m * 0.5) + wd * min(wd * V + tolerance, 0)
+                new_V = sczindex_values[period] - wd * (m * 0.5) + wd * min(wd * V + tolerance, 0.0)
 
                 if (wd * new_V) > 0:
                 
-                    new_V = 0
-                    new_probability = 0
-                    new_X1 = 0
-                    new_X2 = 0
+                    new_V = 0.0
+                    new_probability = 0.0
+                    new_X1 = 0.0
+                    new_X2 = 0.0
                     new_X = new_X3
 
-                    wet_index_deque.clear()
-                    dry_index_deque.clear()
+                    stack_size = 0
                 
                 else:
 
                     new_probability = (new_V / Q) * 100
                     if new_probability >= (100 - tolerance):
 
-                        new_X3 = 0
-                        new_V = 0
-                        new_probability = 100
+                        new_X3 = 0.0
+                        new_V = 0.0
+                        new_probability = 100.0
 
                     # xValues should be a list of doubles
-                    new_X, new_X1, new_X2, new_X3 = _choose_X(pdsi_values,
-                                                              established_index_values,
-                                                              wet_index_values,
-                                                              dry_index_values,
-                                                              sczindex_values,
-                                                              wet_index_deque,
-                                                              dry_index_deque,
-                                                              wet_M,
-                                                              wet_B,
-                                                              dry_M,
-                                                              dry_B,
-                                                              new_X, 
-                                                              new_X3, 
-                                                              period, 
-                                                              previous_key)
+                    new_X, new_X1, new_X2, new_X3, stack_size = _choose_X(pdsi_values,
+                                                                          established_index_values,
+                                                                          wet_index_values,
+                                                                          dry_index_values,
+                                                                          sczindex_values,
+                                                                          wet_index_stack,
+                                                                          dry_index_stack,
+                                                                          stack_size,
+                                                                          wet_M,
+                                                                          wet_B,
+                                                                          dry_M,
+                                                                          dry_B,
+                                                                          new_X, 
+                                                                          new_X3, 
+                                                                          period, 
+                                                                          previous_key)
 
             wet_index_values[period] = new_X1
             dry_index_values[period] = new_X2
@@ -1409,14 +1464,15 @@ def _compute_scpdsi(established_index_values,
     return pdsi_values, scpdsi_values, wet_index_values, dry_index_values, established_index_values
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True, error_model='numpy')
 def _choose_X(pdsi_values,
               established_index_values,
               wet_index_values,
               dry_index_values,
               sczindex_values,
-              wet_index_deque,
-              dry_index_deque,
+              wet_index_stack,
+              dry_index_stack,
+              stack_size,
               wet_M,
               wet_B,
               dry_M,
@@ -1426,9 +1482,15 @@ def _choose_X(pdsi_values,
               month_index, 
               previous_key,
               tolerance=0.0):
+    '''
+    Chooses the X value for a month, either pushing the wet and dry index values onto the stacks kept for possible 
+    backtracking or backtracking over (and emptying) the stacks.
+
+    :return: the new X, X1, X2, and X3 values, and the number of values on the stacks
+    '''
 
-    previous_wet_index_X1 = 0
-    previous_dry_index_X2 = 0
+    previous_wet_index_X1 = 0.0
+    previous_dry_index_X2 = 0.0
 
     if (previous_key >= 0) and not np.isnan(established_index_values[previous_key]):
     
@@ -1453,11 +1515,13 @@ def _choose_X(pdsi_values,
     if (new_X1 >= 0.5) and (new_X3 == 0):
     
         _backtrack_self_calibrated(pdsi_values,
-                                   wet_index_deque,
-                                   dry_index_deque,
+                                   wet_index_stack,
+                                   dry_index_stack,
+                                   stack_size,
                                    tolerance,
                                    new_X1,
                                    month_index)
+        stack_size = 0
         new_X = new_X1
         new_X3 = new_X1
         new_X1 = 0.0
@@ -1473,11 +1537,13 @@ def _choose_X(pdsi_values,
         if (new_X2 <= -0.5) and (new_X3 == 0):
         
             _backtrack_self_calibrated(pdsi_values,
-                                       wet_index_deque,
-                                       dry_index_deque,
+                                       wet_index_stack,
+                                       dry_index_stack,
+                                       stack_size,
                                        tolerance,
                                        new_X2,
                                        month_index)
+            stack_size = 0
             new_X = new_X2
             new_X3 = new_X2
             new_X2 = 0.0
@@ -1487,50 +1553,61 @@ def _choose_X(pdsi_values,
             if new_X1 == 0:
             
                 _backtrack_self_calibrated(pdsi_values,
-                                           wet_index_deque,
-                                           dry_index_deque,
+                                           wet_index_stack,
+                                           dry_index_stack,
+                                           stack_size,
                                            tolerance,
                                            new_X2,
                                            month_index)
+                stack_size = 0
                 new_X = new_X2
             
             elif new_X2 == 0:
             
                 _backtrack_self_calibrated(pdsi_values,
-                                           wet_index_deque,
-                                           dry_index_deque,
+                                           wet_index_stack,
+                                           dry_index_stack,
+                                           stack_size,
                                            tolerance,
                                            new_X1,
                                            month_index)
+                stack_size = 0
                 new_X = new_X1
             
             else:
             
-                wet_index_deque.appendleft(new_X1)
-                dry_index_deque.appendleft(new_X2)
+                wet_index_stack[stack_size] = new_X1
+                dry_index_stack[stack_size] = new_X2
+                stack_size += 1
                 new_X = new_X3
         
         else:
         
-            # store wet index and dry index in their linked lists for possible use later
-            wet_index_deque.appendleft(new_X1)
-            dry_index_deque.appendleft(new_X2)
+            # store wet index and dry index on their stacks for possible use later
+            wet_index_stack[stack_size] = new_X1
+            dry_index_stack[stack_size] = new_X2
+            stack_size += 1
             new_X = new_X3
     
-    return new_X, new_X1, new_X2, new_X3
+    return new_X, new_X1, new_X2, new_X3, stack_size
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True)
 def _backtrack_self_calibrated(pdsi_values,
-                               wet_index_deque,
-                               dry_index_deque,
+                               wet_index_stack,
+                               dry_index_stack,
+                               stack_size,
                                tolerance,
                                new_X, 
                                month_index):
     '''
+    Backtracks over the wet and dry index values on the stacks, from the top of the stacks down, after which 
+    the caller should consider the stacks empty.
+
     :param pdsi_values
-    :param wet_index_deque
-    :param dry_index_deque
+    :param wet_index_stack
+    :param dry_index_stack
+    :param stack_size: the number of values on the stacks
     :param tolerance
     :param new_X
     :param month_index
@@ -1538,17 +1615,17 @@ def _backtrack_self_calibrated(pdsi_values,
     
     num1 = new_X
 
-    while wet_index_deque and dry_index_deque:
+    for i in range(stack_size - 1, -1, -1):
     
         if num1 > 0:
         
-            num1 = wet_index_deque.popleft()
-            num2 = dry_index_deque.popleft()
+            num1 = wet_index_stack[i]
+            num2 = dry_index_stack[i]
         
         else:
         
-            num1 = dry_index_deque.popleft()
-            num2 = wet_index_deque.popleft()
+            num1 = dry_index_stack[i]
+            num2 = wet_index_stack[i]
 
         if ((-1.0 * tolerance) <= num1) and (num1 <= tolerance):
         
@@ -1557,6 +1634,7 @@ def _backtrack_self_calibrated(pdsi_values,
         pdsi_values[month_index] = num1
 
 #-----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
 def _highest_reasonable_value(summed_values):
 
     # Determine the highest reasonable value that isn't due to a freak anomaly in the data. 
@@ -1565,154 +1643,74 @@ def _highest_reasonable_value(summed_values):
     #   2) 25% lower than the 2nd percentile
     reasonable_percentile_index = int(len(summed_values) * 0.98)
 
-    # sort the list of sums into ascending order and get the sum_value value referenced by the safe percentile index
-    summed_values = sorted(summed_values)
-    sum_at_reasonable_percentile = summed_values[reasonable_percentile_index]
+    # get the sum value at the safe percentile index, as it would be found in the sorted sums, by partial sorting
+    sum_at_reasonable_percentile = np.partition(summed_values, reasonable_percentile_index)[reasonable_percentile_index]
 
-    # find the highest reasonable value out of the summed values
+    # find the highest reasonable value out of the positive summed values
     highest_reasonable_value = 0.0
     reasonable_tolerance_ratio = 1.25
-    while summed_values:
+    for sum_value in summed_values:
 
-        sum_value = summed_values.pop()
-        if sum_value > 0:
+        if (sum_value > highest_reasonable_value) and (sum_at_reasonable_percentile != 0.0) and \
+                ((sum_value / sum_at_reasonable_percentile) < reasonable_tolerance_ratio):
 
-            if (sum_value / sum_at_reasonable_percentile) < reasonable_tolerance_ratio:
-            
-                if sum_value > highest_reasonable_value:
-                
-                    highest_reasonable_value = sum_value
+            highest_reasonable_value = sum_value
     
     return highest_reasonable_value
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
-def _z_sum(interval, 
-           wet_or_dry,
-           sczindex_values,
-           periods_per_year,
-           calibration_start_year,
-           calibration_end_year,
-           input_start_year):
+@numba.njit(cache=True)
+def _z_sums(month_scales,
+            wet_or_dry,
+            sczindex_values,
+            periods_per_year,
+            calibration_start_year,
+            calibration_end_year,
+            input_start_year):
+    '''
+    Finds the largest sums of consecutive Z-Index values over the calibration period for each of a number of
+    month scales, i.e. the sums for the wettest or driest spells of each length. The rolling sums of all scales
+    are computed from a single array of cumulative sums.
+
+    :param month_scales: array of the numbers of consecutive months to sum
+    :param wet_or_dry: find the sums for either wet or dry spells, should be either 'WET' or 'DRY'
+    :param sczindex_values: 1-D array of Z-Index values
+    :param periods_per_year: number of time steps per year
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :param input_start_year: initial year of the Z-Index values
+    :return: array of the highest reasonable (wet) or lowest (dry) sum for each month scale
+    :rtype: numpy.ndarray of floats
+    '''
 
-    z = 0.0
-    z_temporary = collections.deque()
-    values_to_sum = collections.deque()
-    summed_values = collections.deque()
+    # get the Z-index values of the calibration period, skipping missing values, which can result from
+    # empty months in the final year of the data set, so that the sums span any missing months
+    calibration_start_index = max(0, (calibration_start_year - input_start_year) * periods_per_year)
+    calibration_end_index = max(0, (calibration_end_year - input_start_year + 1) * periods_per_year)
+    calibration_values = sczindex_values[calibration_start_index:calibration_end_index]
+    calibration_values = calibration_values[~np.isnan(calibration_values)]
 
-    # TODO verify that the below isn't mis-aligning the data by not filling in missing elements with a fill value   pylint: disable=fixme
-    #      which can be ignored in following loops that may still rely upon an original shape of the data matrix,
-    #      instead this should only be pulling off the final (missing) months of the final year where values do not exist
-    # get only non-NaN Z-index values
-    for sczindex in sczindex_values:
-    
-        # we need to skip Z-index values from the list if they don't exist, this can result from empty months in the final year of the data set
-        if not np.isnan(sczindex):
-        
-            z_temporary.append(sczindex)
-            
-    calibration_period_initial_index = (calibration_start_year - input_start_year) * periods_per_year
-    i = 0
-    while (i < calibration_period_initial_index) and z_temporary:
-        
-        # remove periods before the start of the calibration interval
-        z_temporary.pop()
-        i += 1
+    # cumulative sums, with a leading zero, from which we get the sum of any number of consecutive values
+    cumulative_sums = np.zeros((calibration_values.size + 1,))
+    cumulative_sums[1:] = np.cumsum(calibration_values)
 
-    remaining_calibration_periods = (calibration_end_year - calibration_start_year + 1) * periods_per_year
+    z_sums = np.zeros((month_scales.size,))
+    for i in range(month_scales.size):
 
-    # get the first interval length of values from the end of the calibration period working backwards, creating the first sum of interval periods
-    sum_value = 0.0
-    for i in range(interval):
-    
-        if not z_temporary:
-           
-            i = interval
-            
-        else:
+        # the sums over each interval of consecutive values, or the sum of all values if there are fewer values
+        interval = min(month_scales[i], calibration_values.size)
+        summed_values = cumulative_sums[interval:] - cumulative_sums[:cumulative_sums.size - interval]
 
-            # pull a value off the end of the list
-            z = z_temporary.pop()
-            remaining_calibration_periods -= 1
-           
-#----------------
-            # TODO/CONFIRM the below conditional is unnecessary since all values of Z_temporary 
-            #              array should be non-NaN (only non-Nan sczindex values were added)  
-#             if not np.isnan(z):
-#             
-#                 # add to the sum
-#                 sum_value += z
-#                 
-#                 # add to the array of values we've used for the initial sum
-#                 values_to_sum.appendleft(z)
-#             
-#             else:
-# 
-#                 # reduce the loop counter so we don't skip a calibration interval period
-#                 i -= 1
-#----------------
-    
-            # add to the sum
-            sum_value += z
-                
-            # add to the array of values we've used for the initial sum
-            values_to_sum.appendleft(z)
-            
-    # if we're dealing with wet conditions then we want to be using positive numbers, and if dry conditions  
-    # then we need to be using negative numbers, so we introduce a sign variable to help with this 
-    if 'WET' == wet_or_dry:
-     
-        largest_sum = _highest_reasonable_value(values_to_sum)
-
-    else:   # DRY
-            
-        sign = -1
-    
-        # for each remaining Z value, recalculate the sum of Z values
-        largest_sum = sum_value
-        summed_values.appendleft(sum_value)
-        while z_temporary and (remaining_calibration_periods > 0):
-        
-            # take the next Z-index value off the end of the list 
-            z = z_temporary.pop()
-    
-            # reduce by one period for each removal
-            remaining_calibration_periods -= 1
-        
-            # TODO confirm that the below NaN check is not required, since all values within z_temporary
-            #      should be non-Nan, since only non-Nan sczindex values were added to that array
-    #         if not np.isnan(z):
-    # 
-    #             # come up with a new Z sum for this new group of Z values to sum
-    #             
-    #             # remove the last value from both the sum_value and the values to sum array
-    #             sum_value -= values_to_sum.pop()
-    #             
-    #             # add to the Z sum, update the bookkeeping lists
-    #             sum_value += z
-    #             values_to_sum.append(z)
-    #             summed_values.append(sum_value)
-    #          
-    
-            # come up with a new Z sum for this new group of Z values to sum
-                
-            # remove the last value from both the sum_value and the values to sum array
-            sum_value -= values_to_sum.pop()
-                
-            # add to the Z sum, update the bookkeeping lists
-            sum_value += z
-            values_to_sum.append(z)
-            summed_values.append(sum_value)
-             
-            # update the largest sum value
-            if (sign * sum_value) > (sign * largest_sum):
-    
-                largest_sum = sum_value
+        # wet conditions use the highest reasonable (positive) sum, dry conditions use the lowest (negative) sum
+        if 'WET' == wet_or_dry:
+            z_sums[i] = _highest_reasonable_value(summed_values)
+        else:
+            z_sums[i] = np.min(summed_values)
             
-    return largest_sum
+    return z_sums
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(cache=True, error_model='numpy')
 def _least_squares(x, 
                    y, 
                    n, 
@@ -1784,7 +1782,7 @@ def _least_squares(x,
     return leastSquaresSlope, leastSquaresIntercept
 
 #-----------------------------------------------------------------------------------------------------------------------
-#@numba.jit    # not working yet
+@numba.njit(cache=True)
 def _duration_factors(zindex_values,
                       calibration_start_year,
                       calibration_end_year,
@@ -1814,18 +1812,15 @@ def _duration_factors(zindex_values,
     :return: slope, intercept
     :rtype: two float values 
     '''
-    month_scales = [3, 6, 9, 12, 18, 24, 30, 36, 42, 48]
+    month_scales = np.array([3, 6, 9, 12, 18, 24, 30, 36, 42, 48])
     
-    z_sums = np.zeros((len(month_scales),))
-    for i, scale_months in enumerate(month_scales):
-
-        z_sums[i] = _z_sum(scale_months,
-                           wet_or_dry, 
-                           zindex_values,
-                           12, 
-                           calibration_start_year, 
-                           calibration_end_year, 
-                           data_start_year)
+    z_sums = _z_sums(month_scales,
+                     wet_or_dry, 
+                     zindex_values,
+                     12, 
+                     calibration_start_year, 
+                     calibration_end_year, 
+                     data_start_year)
     
     slope, intercept = _least_squares(month_scales, z_sums, len(month_scales), wet_or_dry)
     
@@ -1843,37 +1838,92 @@ def _duration_factors(zindex_values,
     return slope, intercept
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
-def _pdsi_at_percentile(pdsi_values,
-                        percentile):
+def _pdsi_at_percentiles(pdsi_values,
+                         percentiles):
+    '''
+    Finds the PDSI values at a number of percentiles, i.e. the values which would be found at the corresponding 
+    positions of the sorted values. All the percentiles are selected by a single partial sort of the values.
+
+    :param pdsi_values: array of PDSI values, either 1-D for a single location or with shape (cells, months)
+    :param percentiles: sequence of percentiles, as fractions in the range [0.0, 1.0)
+    :return: array of the PDSI values at the percentiles, with shape (percentiles) or (percentiles, cells)
+    :rtype: numpy.ndarray of floats
+    '''
+
+    # the positions of the percentile values within the sorted values of each location
+    indices = [int(pdsi_values.shape[-1] * percentile) for percentile in percentiles]
 
-    pdsi_sorted = sorted(pdsi_values)
-    return pdsi_sorted[int(len(pdsi_values) * percentile)]
+    # only the values at the percentile positions end up in sorted position, with missing values sorted to the end
+    percentile_values = np.partition(pdsi_values, indices, axis=-1)[..., indices]
+    
+    return np.ascontiguousarray(np.moveaxis(percentile_values, -1, 0))
     
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@numba.njit(parallel=True, cache=True)
+def _self_calibrate_grid(pdsi_values,
+                         sczindex_values,
+                         calibration_start_year,
+                         calibration_end_year,
+                         input_start_year,
+                         pdsi_extremes):
+    '''
+    Performs the self-calibration of _self_calibrate() for many locations at once, with the locations divided 
+    among threads.
+
+    :param pdsi_values: 2-D array of monthly PDSI values, with shape (cells, months), these are modified in place
+    :param sczindex_values: 2-D array of monthly Z-Index values, with shape (cells, months), 
+                            these are adjusted in place
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :param input_start_year: initial year of the PDSI and Z-Index values
+    :param pdsi_extremes: array of the PDSI values at the 2nd and 98th percentiles with shape (2, cells), 
+                          as computed by _pdsi_at_percentiles()
+    '''
+
+    for cell in numba.prange(sczindex_values.shape[0]):
+        _self_calibrate(pdsi_values[cell],
+                        sczindex_values[cell],
+                        calibration_start_year,
+                        calibration_end_year,
+                        input_start_year,
+                        pdsi_extremes[:, cell])
+
+#-----------------------------------------------------------------------------------------------------------------------
+@numba.njit(cache=True)
 def _self_calibrate(pdsi_values,
                     sczindex_values,
                     calibration_start_year,
                     calibration_end_year,
-                    input_start_year):
+                    input_start_year,
+                    pdsi_extremes):
+    '''
+    Performs the self-calibration of a location's Z-Index values, as described by Wells et al (2004).
+
+    :param pdsi_values: 1-D array of monthly PDSI values
+    :param sczindex_values: 1-D array of monthly Z-Index values, these are adjusted in place
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :param input_start_year: initial year of the PDSI and Z-Index values
+    :param pdsi_extremes: array of the PDSI values at the 2nd and 98th percentiles, 
+                          as computed by _pdsi_at_percentiles()
+    :return: three 1-D arrays, respectively containing self-calibrated Z-Index, PDSI, and scPDSI values
+    '''
     
     # remove periods before the end of the interval
     # calibrate using upper and lower 2% of values within the user-defined calibration interval
     # this is explained in equations (14) and (15) of Wells et al
-    dry_extreme = _pdsi_at_percentile(pdsi_values, 0.02)
+    dry_extreme = pdsi_extremes[0]
+    wet_extreme = pdsi_extremes[1]
     if dry_extreme == 0.0:
         dry_ratio = 1.0
     else:
         dry_ratio = _PDSI_MIN / dry_extreme
-    wet_extreme = _pdsi_at_percentile(pdsi_values, 0.98)
     if wet_extreme == 0.0:
         wet_ratio = 1.0
     else:
         wet_ratio = _PDSI_MAX / wet_extreme
         
     # adjust the self-calibrated Z-index values, using either the wet or dry ratio
-    #TODO replace the below loop with a vectorized equivalent
     for time_step, sczindex in enumerate(sczindex_values):
     
         if not np.isnan(sczindex):
@@ -1932,20 +1982,20 @@ def scpdsi(precip_time_series,      # pragma: no cover
            calibration_start_year,
            calibration_end_year):
     '''
-    This function computes the Palmer Drought Severity Index (PDSI), Palmer Hydrological Drought Index (PHDI), 
+    This function computes the Palmer Drought Severity Index (PDSI), Palmer Hydrological Drought Index (PHDI),
     Modified Palmer Drought Index (PMDI), and Palmer Z-Index.
-    
+
     Some of the original code for self-calibrated Palmer comes from Goddard (co-author with Wells on 2004 scPDSI paper)
     and is found here: https://github.com/cszang/pdsi
-    
+
     :param precip_time_series: time series of monthly precipitation values, in inches
     :param pet_time_series: time series of monthly PET values, in inches
     :param awc: available water capacity (soil constant), in inches
-    :param data_start_year: initial year of the input precipitation and PET datasets, 
+    :param data_start_year: initial year of the input precipitation and PET datasets,
                             both of which are assumed to start in January of this year
-    :param calibration_start_year: initial year of the calibration period 
-    :param calibration_end_year: final year of the calibration period 
-    :return: five numpy arrays, respectively containing SCPDSI, PDSI, PHDI, PMDI, and Z-Index values  
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :return: five numpy arrays, respectively containing SCPDSI, PDSI, PHDI, PMDI, and Z-Index values
     '''
 
     try:
@@ -1954,25 +2004,15 @@ def scpdsi(precip_time_series,      # pragma: no cover
             message = 'Precipitation and PET time series do not match, unequal number or months'
             _logger.error(message)
             raise ValueError(message)
-                    
+
+        # work with flat time series, since 2-D Z-Index inputs are taken as (cells, months) rather than (years, 12)
+        precip_time_series = precip_time_series.flatten()
+        pet_time_series = pet_time_series.flatten()
+
         # perform water balance accounting
         ET, PR, R, RO, PRO, L, PL = _water_balance(awc, pet_time_series, precip_time_series)
-        
-        # if we have input time series (precipitation and PET) with an incomplete 
-        # final year then we pad all the time series arrays with NaN values
-        pad_months = (12 - (precip_time_series.size % 12)) % 12
-        if pad_months > 0:            
-            precip_time_series = np.pad(precip_time_series, (0, pad_months), 'constant', constant_values=(np.nan))
-            pet_time_series = np.pad(pet_time_series, (0, pad_months), 'constant', constant_values=(np.nan))
-            ET = np.pad(ET, (0, pad_months), 'constant', constant_values=(np.nan))
-            PR = np.pad(PR, (0, pad_months), 'constant', constant_values=(np.nan))
-            R = np.pad(R, (0, pad_months), 'constant', constant_values=(np.nan))
-            RO = np.pad(RO, (0, pad_months), 'constant', constant_values=(np.nan))
-            PRO = np.pad(PRO, (0, pad_months), 'constant', constant_values=(np.nan))
-            L = np.pad(L, (0, pad_months), 'constant', constant_values=(np.nan))
-            PL = np.pad(PL, (0, pad_months), 'constant', constant_values=(np.nan))
-                
-        # compute Z-index values
+
+        # compute Z-index values, trimming off the months which pad an incomplete final year
         zindex = _z_index(precip_time_series, 
                           pet_time_series, 
                           ET, 
@@ -1984,42 +2024,155 @@ def scpdsi(precip_time_series,      # pragma: no cover
                           PL, 
                           data_start_year, 
                           calibration_start_year, 
+                          calibration_end_year)[0:precip_time_series.size]
+
+        return _scpdsi_from_zindex(zindex,
+                                   data_start_year,
+                                   calibration_start_year,
+                                   calibration_end_year)
+
+    except:
+        # catch all exceptions, log rudimentary error information
+        _logger.error('Failed to complete', exc_info=True)
+        raise
+
+#-----------------------------------------------------------------------------------------------------------------------
+def scpdsi_grid(precips,
+                pets,
+                awcs,
+                data_start_year,
+                calibration_start_year,
+                calibration_end_year):
+    '''
+    Computes the self-calibrated Palmer Drought Severity Index (scPDSI), PDSI, PHDI, PMDI, and Palmer Z-Index
+    for many locations at once, such as all the grid cells of a tile. The water balance accounting
+    and the PDSI recursion are performed for all locations in a single call, with the locations divided among threads.
+
+    Locations without valid inputs, i.e. with all precipitation or all PET values missing or a missing
+    available water capacity, result in all missing (NaN) values.
+
+    :param precips: 2-D array of monthly precipitation values, in inches, with shape (cells, months)
+    :param pets: 2-D array of monthly PET values, in inches, with shape (cells, months)
+    :param awcs: 1-D array of available water capacities (soil constants), in inches, one per cell
+    :param data_start_year: initial year of the input precipitation and PET datasets,
+                            both of which are assumed to start in January of this year
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :return: five numpy arrays with shape (cells, months), respectively containing SCPDSI, PDSI, PHDI, PMDI,
+             and Z-Index values
+    :rtype: five 2-D numpy.ndarray objects of floats
+    '''
+
+    try:
+        # make sure we have matching precipitation and PET time series
+        if (precips.shape != pets.shape) or (len(precips.shape) != 2) or (awcs.size != precips.shape[0]):
+            message = 'Incompatible precipitation, PET, and AWC arrays: shapes {0}, {1}, and {2}'.format(precips.shape,
+                                                                                                       pets.shape,
+                                                                                                       awcs.shape)
+            _logger.error(message)
+            raise ValueError(message)
+
+        precips = utils.nan_filled(precips, np.float64)
+        pets = utils.nan_filled(pets, np.float64)
+        awcs = utils.nan_filled(awcs, np.float64)
+
+        # allocate the arrays of Palmer values, with all missing values for cells we can't compute
+        palmer_values = np.full((5,) + precips.shape, np.NaN)
+
+        # find the cells with valid inputs
+        valid_cells = np.nonzero(~np.all(np.isnan(precips), axis=1) &
+                                 ~np.all(np.isnan(pets), axis=1) &
+                                 ~np.isnan(awcs))[0]
+        if valid_cells.size == 0:
+            return tuple(palmer_values)
+
+        # perform water balance accounting for all valid cells at once
+        precips = np.ascontiguousarray(precips[valid_cells])
+        pets = np.ascontiguousarray(pets[valid_cells])
+        ET, PR, R, RO, PRO, L, PL = _water_balance_grid(awcs[valid_cells], pets, precips)
+
+        # compute Z-index values for all valid cells at once
+        zindex = _z_index(precips, 
+                          pets, 
+                          ET, 
+                          PR, 
+                          R, 
+                          RO, 
+                          PRO, 
+                          L, 
+                          PL, 
+                          data_start_year, 
+                          calibration_start_year, 
                           calibration_end_year)
-        
-        # trim off the padded months from the Z-index array
-        if pad_months > 0:
-            zindex = zindex[0:-pad_months]
-            ET = ET[0:-pad_months]
-            PR = PR[0:-pad_months]
-            R = R[0:-pad_months]
-            RO = RO[0:-pad_months]
-            PRO = PRO[0:-pad_months]
-            L = L[0:-pad_months]
-            PL = PL[0:-pad_months]
-            
-        # compute PDSI and other associated variables
-        PDSI, PHDI, PMDI = _pdsi_from_zindex(zindex)
 
-        # keep a copy of the originally computed PDSI for return
-        final_PDSI = np.array(PDSI)
-        
-        # perform self-calibration        
-        zindex, PDSI, SCPDSI = _self_calibrate(PDSI, 
-                                               zindex,
-                                               calibration_start_year,
-                                               calibration_end_year,
-                                               data_start_year)
-
-        # recompute PDSI and other associated variables
-        SCPDSI, PHDI, PMDI = _pdsi_from_zindex(zindex)
-        
-        return [SCPDSI, final_PDSI, PHDI, PMDI, zindex]
+        # the compiled computations below take the Z-Index values of each cell as a contiguous time series
+        zindex = np.ascontiguousarray(zindex)
+
+        # compute PDSI and other associated variables for all valid cells at once
+        PDSI = _pdsi_from_zindex_grid(zindex)[0]
+
+        # keep the originally computed PDSI for return
+        palmer_values[1, valid_cells] = PDSI
+
+        # get the PDSI extremes used for self-calibration of all valid cells at once
+        pdsi_extremes = _pdsi_at_percentiles(PDSI, (0.02, 0.98))
+
+        # perform self-calibration for all valid cells at once, this updates the Z-Index values in place
+        _self_calibrate_grid(PDSI,
+                             zindex,
+                             calibration_start_year,
+                             calibration_end_year,
+                             data_start_year,
+                             pdsi_extremes)
+
+        # recompute PDSI and other associated variables from the self-calibrated Z-Index values
+        SCPDSI, PHDI, PMDI = _pdsi_from_zindex_grid(zindex)
+        palmer_values[0, valid_cells] = SCPDSI
+        palmer_values[2, valid_cells] = PHDI
+        palmer_values[3, valid_cells] = PMDI
+        palmer_values[4, valid_cells] = zindex
+
+        return tuple(palmer_values)
 
     except:
         # catch all exceptions, log rudimentary error information
         _logger.error('Failed to complete', exc_info=True)
         raise
 
+#-----------------------------------------------------------------------------------------------------------------------
+def _scpdsi_from_zindex(zindex,
+                        data_start_year,
+                        calibration_start_year,
+                        calibration_end_year):
+    '''
+    Computes the self-calibrated PDSI, PDSI, PHDI, PMDI, and Palmer Z-Index for a location from its Z-Index values.
+
+    :param zindex: time series of monthly Z-Index values, as computed by _z_index()
+    :param data_start_year: initial year of the Z-Index time series
+    :param calibration_start_year: initial year of the calibration period
+    :param calibration_end_year: final year of the calibration period
+    :return: five numpy arrays, respectively containing SCPDSI, PDSI, PHDI, PMDI, and Z-Index values
+    '''
+
+    # compute PDSI and other associated variables
+    PDSI, PHDI, PMDI = _pdsi_from_zindex(zindex)
+
+    # keep a copy of the originally computed PDSI for return
+    final_PDSI = np.array(PDSI)
+
+    # perform self-calibration
+    zindex, PDSI, SCPDSI = _self_calibrate(PDSI,
+                                           zindex,
+                                           calibration_start_year,
+                                           calibration_end_year,
+                                           data_start_year,
+                                           _pdsi_at_percentiles(PDSI, (0.02, 0.98)))
+
+    # recompute PDSI and other associated variables
+    SCPDSI, PHDI, PMDI = _pdsi_from_zindex(zindex)
+
+    return [SCPDSI, final_PDSI, PHDI, PMDI, zindex]
+
 #-----------------------------------------------------------------------------------------------------------------------
 def pdsi(precip_time_series,          # pragma: no cover
          pet_time_series,
@@ -2047,6 +2200,10 @@ def pdsi(precip_time_series,          # pragma: no cover
             _logger.error(message)
             raise ValueError(message)
                     
+        # work with flat time series, since 2-D Z-Index inputs are taken as (cells, months) rather than (years, 12)
+        precip_time_series = precip_time_series.flatten()
+        pet_time_series = pet_time_series.flatten()
+
         # perform water balance accounting
         ET, PR, R, RO, PRO, L, PL = _water_balance(awc, pet_time_series, precip_time_series)
         
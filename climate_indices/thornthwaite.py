@@ -21,18 +21,16 @@ ISBN 97-8-146656-3780
 '''
 
 import calendar
+import functools
 import logging
 import math
-import numba
 import numpy as np
+import warnings
 
 from climate_indices import utils
 
 #-----------------------------------------------------------------------------------------------------------------------
-# set up a basic, global _logger
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    datefmt='%Y-%m-%d  %H:%M:%S')
+# module _logger, the configuration of logging handlers and levels is left to the application
 _logger = logging.getLogger(__name__)
 
 #-----------------------------------------------------------------------------------------------------------------------
@@ -54,7 +52,6 @@ _SOLAR_DECLINATION_RADIANS_MIN = np.deg2rad(-23.45)
 _SOLAR_DECLINATION_RADIANS_MAX = np.deg2rad(23.45)
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _sunset_hour_angle(latitude_radians,
                        solar_declination_radians):
     '''
@@ -62,67 +59,67 @@ def _sunset_hour_angle(latitude_radians,
 
     Based on FAO equation 25 in Allen et al (1998).
 
-    :param latitude_radians: latitude in radians
-    :param solar_declination_radians: angle of solar declination in radians
+    :param latitude_radians: latitude in radians, a float or an array of floats
+    :param solar_declination_radians: angle of solar declination in radians, a float or an array of floats
     :return: sunset hour angle in radians
-    :rtype: float
+    :rtype: float, or numpy.ndarray of floats if either argument is an array
     '''
     
     # validate the latitude argument
-    if not _LATITUDE_RADIANS_MIN <= latitude_radians <= _LATITUDE_RADIANS_MAX:
+    if not np.all((_LATITUDE_RADIANS_MIN <= latitude_radians) & (latitude_radians <= _LATITUDE_RADIANS_MAX)):
         raise ValueError('latitude outside valid range [{0!r} to {1!r}]: {2!r}'
                          .format(_LATITUDE_RADIANS_MIN, _LATITUDE_RADIANS_MAX, latitude_radians))
 
     # validate the solar declination angle argument, which can vary between -23.45 and +23.45 degrees
     # see Goswami (2015) p.40, and http://www.itacanet.org/the-sun-as-a-source-of-energy/part-1-solar-astronomy/
-    if not _SOLAR_DECLINATION_RADIANS_MIN <= solar_declination_radians <= _SOLAR_DECLINATION_RADIANS_MAX:
+    if not np.all((_SOLAR_DECLINATION_RADIANS_MIN <= solar_declination_radians) & 
+                  (solar_declination_radians <= _SOLAR_DECLINATION_RADIANS_MAX)):
         raise ValueError('solar declination angle outside valid range [{0!r} to {1!r}]: {2!r}'
                          .format(_SOLAR_DECLINATION_RADIANS_MIN, _SOLAR_DECLINATION_RADIANS_MAX, solar_declination_radians))
 
     # calculate the cosine of the sunset hour angle (*Ws* in FAO 25) from latitude and solar declination
-    cos_sunset_hour_angle = -math.tan(latitude_radians) * math.tan(solar_declination_radians)
+    cos_sunset_hour_angle = -np.tan(latitude_radians) * np.tan(solar_declination_radians)
     
     # If the sunset hour angle is >= 1 there is no sunset, i.e. 24 hours of daylight
     # If the sunset hour angle is <= 1 there is no sunrise, i.e. 24 hours of darkness
     # See http://www.itacanet.org/the-sun-as-a-source-of-energy/part-3-calculating-solar-angles/
     # Domain of acos is -1 <= x <= 1 radians (this is not mentioned in FAO-56!)
-    return math.acos(min(max(cos_sunset_hour_angle, -1.0), 1.0))
+    return np.arccos(np.clip(cos_sunset_hour_angle, -1.0, 1.0))
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _solar_declination(day_of_year):
     '''
     Calculate the angle of solar declination from day of the year.
 
     Based on FAO equation 24 in Allen et al (1998).
 
-    :param day_of_year: day of year integer between 1 and 365 (or 366, in the case of a leap year)
+    :param day_of_year: day of year integer between 1 and 365 (or 366, in the case of a leap year), 
+                        or an array of such integers
     :return: solar declination [radians]
-    :rtype: float
+    :rtype: float, or numpy.ndarray of floats if the argument is an array
     :raise ValueError: if the day of year value is not within the range [1-366] 
     '''
-    if not 1 <= day_of_year <= 366:
+    if not np.all((1 <= day_of_year) & (day_of_year <= 366)):
         raise ValueError('Day of the year must be in the range [1-366]: {0!r}'.format(day_of_year))
 
-    return 0.409 * math.sin(((2.0 * math.pi / 365.0) * day_of_year - 1.39))
+    return 0.409 * np.sin(((2.0 * math.pi / 365.0) * day_of_year - 1.39))
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _daylight_hours(sunset_hour_angle_radians):
     '''
     Calculate daylight hours from a sunset hour angle.
 
     Based on FAO equation 34 in Allen et al (1998).
 
-    :param sunset_hour_angle_radians: sunset hour angle, in radians
+    :param sunset_hour_angle_radians: sunset hour angle, in radians, a float or an array of floats
     :return: number of daylight hours corresponding to the sunset hour angle
-    :rtype: float
+    :rtype: float, or numpy.ndarray of floats if the argument is an array
     :raise ValueError: if the sunset hour angle is not within valid range
     '''
     
     # validate the sunset hour angle argument, which has a valid range of 0 to pi radians (180 degrees), inclusive
     # see http://mypages.iit.edu/~maslanka/SolarGeo.pdf
-    if not 0.0 <= sunset_hour_angle_radians <= math.pi:
+    if not np.all((0.0 <= sunset_hour_angle_radians) & (sunset_hour_angle_radians <= math.pi)):
         raise ValueError('sunset hour angle outside valid range [{0!r} to {1!r}]: {2!r}'
                          .format(0.0, math.pi, sunset_hour_angle_radians))
     
@@ -130,10 +127,13 @@ def _daylight_hours(sunset_hour_angle_radians):
     return (24.0 / math.pi) * sunset_hour_angle_radians
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def _monthly_mean_daylight_hours(latitude_radians, 
                                  leap=False):
     '''
+    Computes the mean daily daylight hours of each calendar month, with the solar geometry of all days of the year
+    computed at once by passing arrays of days through _solar_declination(), _sunset_hour_angle(), and 
+    _daylight_hours().
+
     :param latitude_radians: latitude in radians
     :param leap: whether or not values should be computed specific to leap years
     :return: the mean daily daylight hours for each calendar month of a year
@@ -145,29 +145,67 @@ def _monthly_mean_daylight_hours(latitude_radians,
         month_days = _MONTH_DAYS_NONLEAP
     else:
         month_days = _MONTH_DAYS_LEAP
-        
-    # allocate an array of daylight hours for each of the 12 months of the year
-    monthly_mean_dlh = np.zeros((12,))
-    
-    # keep a count of the day of the year
-    day_of_year = 1
-    
-    # loop over each calendar month to calculate the daylight hours for the month
-    for i, days_in_month in enumerate(month_days):
-        cumulative_daylight_hours = 0.0   # cumulative daylight hours for the month
-        for _ in range(1, days_in_month + 1):
-            daily_solar_declination = _solar_declination(day_of_year)
-            daily_sunset_hour_angle = _sunset_hour_angle(latitude_radians, daily_solar_declination)
-            cumulative_daylight_hours += _daylight_hours(daily_sunset_hour_angle)
-            day_of_year += 1
-        
-        # calculate the mean daylight hours of the month
-        monthly_mean_dlh[i] = cumulative_daylight_hours / days_in_month
-        
-    return monthly_mean_dlh
+
+    # daylight hours for each day of the year
+    days_of_year = np.arange(1, np.sum(month_days) + 1)
+    daylight_hours = _daylight_hours(_sunset_hour_angle(latitude_radians, _solar_declination(days_of_year)))
+
+    # calculate the mean daylight hours of each month from the daily values
+    month_start_days = np.concatenate(([0], np.cumsum(month_days)[:-1]))
+    return np.add.reduceat(daylight_hours, month_start_days) / month_days
+
+#-----------------------------------------------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _daylight_hours_for_latitude(latitude_degrees):
+    '''
+    Computes the mean daily daylight hours of each calendar month for non-leap and leap years at a latitude.
+    The results are memoized, so the solar geometry for a latitude is only computed once per process.
+
+    :param latitude_degrees: latitude in degrees north, as a float
+    :return: read-only array of mean daylight hours, with the non-leap year months in the first row 
+             and the leap year months in the second row
+    :rtype: numpy.ndarray of floats, 2-D with shape: (2, 12)
+    '''
+
+    latitude_radians = math.radians(latitude_degrees)
+    daylight_hours = np.array([_monthly_mean_daylight_hours(latitude_radians, False),
+                               _monthly_mean_daylight_hours(latitude_radians, True)])
+
+    # the array is shared by all callers, so guard against modification
+    daylight_hours.flags.writeable = False
+
+    return daylight_hours
+
+#-----------------------------------------------------------------------------------------------------------------------
+def daylight_hours_table(latitudes_degrees):
+    '''
+    Gets the mean daily daylight hours of each calendar month for non-leap and leap years at one or more latitudes,
+    i.e. a lookup table indexed by (latitude, leap, month). The values for each unique latitude are computed once
+    per process and then reused, so building the table ahead of time (for example before starting worker processes) 
+    makes the PET computations for all locations sharing a latitude lookups rather than solar geometry computations.
+
+    :param latitudes_degrees: latitude or array of latitudes, in degrees north (-90..90)
+    :return: array of mean daylight hours, with shape (2, 12) for a single latitude or (latitudes, 2, 12) 
+             for an array of latitudes, where the leap index is 0 for non-leap years and 1 for leap years
+    :rtype: numpy.ndarray of floats
+    :raise ValueError: if a latitude is outside the valid range
+    :raise TypeError: if the latitude is None
+    '''
+
+    # make sure we don't silently treat a missing latitude as NaN
+    if latitudes_degrees is None:
+        raise TypeError('latitude must be a number or an array of numbers, not None')
+
+    latitudes_degrees = np.asarray(latitudes_degrees, dtype=np.float64)
+
+    # look up (or compute and memoize) the daylight hours of each unique latitude
+    unique_latitudes, latitude_indices = np.unique(latitudes_degrees, return_inverse=True)
+    unique_daylight_hours = np.array([_daylight_hours_for_latitude(float(latitude)) 
+                                      for latitude in unique_latitudes])
+
+    return unique_daylight_hours[latitude_indices].reshape(latitudes_degrees.shape + (2, 12))
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def potential_evapotranspiration(monthly_temps_celsius, 
                                  latitude_degrees, 
                                  data_start_year):
@@ -207,43 +245,76 @@ def potential_evapotranspiration(monthly_temps_celsius,
     # validate the input data array
     monthly_temps_celsius = utils.reshape_to_2d(monthly_temps_celsius, 12)
 
-    # at this point we assume that our dataset array has shape (years, 12) where 
-    # each row is a year with 12 columns of monthly values (Jan, Feb, ..., Dec)
-    
-    # convert the latitude from degrees to radians
-    latitude_radians = math.radians(latitude_degrees)
-    
-    # adjust negative temperature values to zero, since negative values aren't allowed (no evaporation below freezing)
-    #TODO this sometimes throws a RuntimeWarning for invalid value, perhaps as a result of a NaN,
-    # somehow use masking and/or NaN precheck to eliminate the cause of this warning
-    monthly_temps_celsius[monthly_temps_celsius < 0] = 0.0
-    
-    # mean the monthly temperature values over the month axis, giving us 12 monthly means for the period of record
-    mean_monthly_temps = np.nanmean(monthly_temps_celsius, axis=0)    
-    
-    # calculate the heat index (I)
-    I = np.sum(np.power(mean_monthly_temps / 5.0, 1.514))
+    # compute PET as for a single cell of a grid
+    pet = potential_evapotranspiration_grid(monthly_temps_celsius.reshape(1, -1), 
+                                            np.array([float(latitude_degrees)]), 
+                                            data_start_year)
 
-    # calculate the a coefficient
-    a = (6.75e-07 * I ** 3) - (7.71e-05 * I ** 2) + (1.792e-02 * I) + 0.49239
+    # reshape the dataset from (1, months) into (months), and truncate to the original length
+    return pet.reshape(-1)[0:original_length]
 
-    # get mean daylight hours for both normal and leap years 
-    mean_daylight_hours_nonleap = np.array(_monthly_mean_daylight_hours(latitude_radians, False))
-    mean_daylight_hours_leap = np.array(_monthly_mean_daylight_hours(latitude_radians, True))
+#-----------------------------------------------------------------------------------------------------------------------
+def potential_evapotranspiration_grid(monthly_temps_celsius, 
+                                      latitudes_degrees, 
+                                      data_start_year):
+    '''
+    Compute monthly potential evapotranspiration (PET) using the Thornthwaite (1948) method for many locations 
+    at once, such as all the grid cells of a tile. The heat index, the exponent *a*, the month lengths, and the 
+    daylight hours of all locations and years are computed as arrays and broadcast together, so the PET of all 
+    locations is computed in a single pass. See potential_evapotranspiration() for a description of the equation.
+
+    :param monthly_temps_celsius: 2-D array of mean daily air temperatures in degrees Celsius, with shape 
+                                  (cells, months), with each cell's time series starting at January of the initial year
+    :param latitudes_degrees: 1-D array of the latitudes of the cells, in degrees north (-90..90)
+    :param data_start_year: year corresponding to the start of the dataset  
+    :return: estimated potential evapotranspiration, in millimeters/month, with shape (cells, months)
+    :rtype: 2-D numpy.ndarray of floats
+    :raise ValueError: if the arrays of temperatures and latitudes have incompatible shapes, 
+                       or if a latitude is outside the valid range
+    '''
+
+    # work with missing values as NaNs
+    monthly_temps_celsius = utils.nan_filled(monthly_temps_celsius, np.float64)
+    latitudes_degrees = utils.nan_filled(latitudes_degrees, np.float64)
+    if (len(monthly_temps_celsius.shape) != 2) or (np.shape(latitudes_degrees) != monthly_temps_celsius.shape[0:1]):
+        message = 'Incompatible temperature and latitude arrays: shapes {0} and {1}'.format(monthly_temps_celsius.shape,
+                                                                                           np.shape(latitudes_degrees))
+        _logger.error(message)
+        raise ValueError(message)
+
+    original_length = monthly_temps_celsius.shape[1]
+
+    # reshape the temperatures to (years, 12, cells), so that each calendar month's values are along the years axis, 
+    # and adjust negative temperature values to zero, since negative values aren't allowed (no evaporation below 
+    # freezing), in a new array since the reshaped temperatures can share the caller's array
+    monthly_temps_celsius = np.maximum(utils.reshape_to_years_steps_cells(monthly_temps_celsius, 12), 0.0)
     
-    # allocate the PET array we'll fill
-    pet = np.full(monthly_temps_celsius.shape, np.NaN)
-    for year in range(monthly_temps_celsius.shape[0]):
+    # get the mean daylight hours for both normal and leap years of each cell, with shape (cells, 2, 12)
+    daylight_hours = daylight_hours_table(latitudes_degrees)
+
+    with warnings.catch_warnings():
         
-        if calendar.isleap(data_start_year + year):
-            month_days = _MONTH_DAYS_LEAP
-            mean_daylight_hours = mean_daylight_hours_leap
-        else:
-            month_days = _MONTH_DAYS_NONLEAP
-            mean_daylight_hours = mean_daylight_hours_nonleap
+        # cells with all missing values result in missing PET values, ignore the warnings these produce
+        warnings.simplefilter("ignore", category=RuntimeWarning)
 
+        # mean the monthly temperature values over the years axis, giving us 12 monthly means for each cell
+        mean_monthly_temps = np.nanmean(monthly_temps_celsius, axis=0)    
+    
+        # calculate the heat index (I) of each cell
+        I = np.sum(np.power(mean_monthly_temps / 5.0, 1.514), axis=0)
+    
+        # calculate the a coefficient of each cell
+        a = (6.75e-07 * I ** 3) - (7.71e-05 * I ** 2) + (1.792e-02 * I) + 0.49239
+    
+        # get the month lengths and mean daylight hours of each year, based on whether or not it's a leap year, 
+        # the daylight hours with shape (years, 12, cells) and month lengths with shape (years, 12, 1)
+        leap_years = np.array([int(calendar.isleap(data_start_year + year)) 
+                               for year in range(monthly_temps_celsius.shape[0])], dtype=np.intp)
+        mean_daylight_hours = np.moveaxis(daylight_hours[:, leap_years, :], 0, -1)
+        month_days = np.array([_MONTH_DAYS_NONLEAP, _MONTH_DAYS_LEAP])[leap_years, :, np.newaxis]
+    
         # calculate the Thornthwaite equation
-        pet[year, :] = 16 * (mean_daylight_hours / 12.0) * (month_days / 30.0) * ((10.0 * monthly_temps_celsius[year, :] / I) ** a)
+        pet = 16 * (mean_daylight_hours / 12.0) * (month_days / 30.0) * ((10.0 * monthly_temps_celsius / I) ** a)
     
-    # reshape the dataset from (years, 12) into (months), i.e. convert from 2-D to 1-D, and truncate to the original length
-    return pet.reshape(-1)[0:original_length]
+    # reshape the PET values from (years, 12, cells) into (cells, months), and truncate to the original length
+    return utils.reshape_from_years_steps_cells(pet, original_length)
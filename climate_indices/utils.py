@@ -1,14 +1,11 @@
 import calendar
 from datetime import datetime
+import functools
 import logging
-import numba
 import numpy as np
 
 #-----------------------------------------------------------------------------------------------------------------------
-# set up a basic, global _logger
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s %(levelname)s %(message)s',
-                    datefmt='%Y-%m-%d  %H:%M:%S')
+# module _logger, the configuration of logging handlers and levels is left to the application
 _logger = logging.getLogger(__name__)
 
 #-----------------------------------------------------------------------------------------------------------------------
@@ -115,7 +112,53 @@ def compute_days(initial_year,
     return days
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+def float_type(values):
+    '''
+    Gets the floating point type used for computing with an array of values, which is 32-bit floats for 
+    an array of 32-bit floats and otherwise 64-bit floats. Computations preserve 32-bit floats in order to 
+    halve the memory of their results and temporaries, with only numerically sensitive reductions (such as 
+    long cumulative sums, or sums of logarithms when fitting) promoted to 64-bit floats.
+
+    :param values: numpy array of values
+    :return: the floating point type, either numpy.float32 or numpy.float64
+    :rtype: numpy.dtype
+    '''
+
+    if np.asarray(values).dtype == np.float32:
+        return np.dtype(np.float32)
+    else:
+        return np.dtype(np.float64)
+
+#-----------------------------------------------------------------------------------------------------------------------
+def nan_filled(values,
+               dtype=None):
+    '''
+    Gets an array of values, such as a masked array read from NetCDF, as a C-contiguous array of floats with 
+    missing (masked) values as NaNs. This is the single conversion of input arrays made before computing, so that 
+    the computations work on plain arrays rather than on masked arrays. The values are not copied if these are 
+    already a C-contiguous array of the floating point type without masked elements, otherwise a single copy is made.
+
+    :param values: array or masked array of values
+    :param dtype: the floating point type of the returned array, by default the type given by float_type()
+    :return: the values as an array of floats, with masked elements as NaNs
+    :rtype: numpy.ndarray of floats
+    '''
+
+    data = np.ma.getdata(values)
+    if dtype is None:
+        dtype = float_type(data)
+
+    # without masked elements we can use the underlying data, converted only if necessary
+    mask = np.ma.getmask(values)
+    if (mask is np.ma.nomask) or not mask.any():
+        return np.require(data, dtype=dtype, requirements='C')
+
+    # otherwise copy the data and fill the masked elements with NaNs
+    filled = np.array(data, dtype=dtype, order='C')
+    filled[mask] = np.NaN
+    return filled
+
+#-----------------------------------------------------------------------------------------------------------------------
 def reshape_to_2d(values,
                   second_axis_length):
     '''
@@ -146,7 +189,7 @@ def reshape_to_2d(values,
     final_year_months = shape[0] % second_axis_length
     if final_year_months > 0:
         pad_months = second_axis_length - final_year_months
-        pad_values = np.full((pad_months,), np.NaN)
+        pad_values = np.full((pad_months,), np.NaN, dtype=float_type(values))
         values = np.append(values, pad_values)
         
     # we should have an ordinal number of years now (ordinally divisible by second_axis_length)
@@ -154,9 +197,65 @@ def reshape_to_2d(values,
     
     # reshape from (months) to (years, 12) in order to have one year of months per row
     return np.reshape(values, (increments, second_axis_length))
-            
+
+#-----------------------------------------------------------------------------------------------------------------------
+def reshape_to_years_steps_cells(values,
+                                 steps_per_year):
+    '''
+    Reshapes a 2-D array of time series values with shape (cells, time) into a 3-D array with shape
+    (years, steps_per_year, cells), padding the end of the time axis with NaNs to complete the final year if necessary.
+
+    :param values: a 2-D numpy.ndarray of values with shape (cells, time), with each row being the time series
+                   for a single cell (for example a longitude within a latitude slice)
+    :param steps_per_year: the number of time steps per year, typically 12 for monthly or 366 for daily
+    :return: the original values reshaped to (years, steps_per_year, cells)
+    :rtype: 3-D numpy.ndarray of floats
+    '''
+
+    # make sure that we've been passed in a 2-D array of values
+    shape = values.shape
+    if len(shape) != 2:
+        message = 'Values array has an invalid shape (not 2-D): {0}'.format(shape)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # pad the end of the time axis in order to have an ordinal number of years, if necessary
+    final_year_steps = shape[1] % steps_per_year
+    if final_year_steps > 0:
+        pad_steps = steps_per_year - final_year_steps
+        values = np.pad(values, [(0, 0), (0, pad_steps)], mode='constant', constant_values=np.NaN)
+
+    # reshape from (cells, time) to (cells, years, steps), then move the cells axis to the end so that
+    # reductions over the years (axis 0) produce arrays of per-step values with shape (steps, cells)
+    years = values.shape[1] // steps_per_year
+    values = np.reshape(values, (shape[0], years, steps_per_year))
+    return np.ascontiguousarray(np.moveaxis(values, 0, -1))
+
+#-----------------------------------------------------------------------------------------------------------------------
+def reshape_from_years_steps_cells(values,
+                                   original_length):
+    '''
+    Reshapes a 3-D array of values with shape (years, steps, cells) back into a 2-D array with shape (cells, time),
+    truncating the time axis to the original length (i.e. removing any padding of the final year).
+
+    :param values: a 3-D numpy.ndarray of values with shape (years, steps, cells)
+    :param original_length: the number of time steps of the original (cells, time) array
+    :return: the original values reshaped to (cells, original_length)
+    :rtype: 2-D numpy.ndarray of floats
+    '''
+
+    # make sure that we've been passed in a 3-D array of values
+    shape = values.shape
+    if len(shape) != 3:
+        message = 'Values array has an invalid shape (not 3-D): {0}'.format(shape)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # move the cells axis to the front and flatten the years and steps into a single time axis
+    values = np.reshape(np.moveaxis(values, -1, 0), (shape[2], shape[0] * shape[1]))
+    return values[:, 0:original_length]
+
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def reshape_to_divs_years_months(monthly_values):
     '''
     :param monthly_values: an 2-D numpy.ndarray of monthly values, assumed to start at January of 
@@ -210,7 +309,60 @@ def reshape_to_divs_years_months(monthly_values):
     return np.reshape(monthly_values, (shape[0], total_years, 12))
             
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
+@functools.lru_cache(maxsize=None)
+def _calendar_index_maps(year_start,
+                         total_years):
+    '''
+    Computes the index maps between daily values of the Gregorian calendar (with only actual leap years represented 
+    as 366 day years) and daily values represented as full 366 day years, as if each year is a leap year. The index 
+    maps are memoized, so they're only computed once per start year and number of years.
+
+    :param year_start: the initial year of the daily values
+    :param total_years: the total number of years of the daily values
+    :return: four read-only 1-D arrays of indices: 1) the Gregorian day of each day of the 366 day years, 2) the 
+             days of the 366 day years which are the faux Feb. 29th of a non-leap year, 3) the Gregorian Feb. 28th 
+             day of each of these non-leap years, and 4) the days of the 366 day years which are actual days
+    :rtype: four numpy.ndarray objects of ints
+    :raise ValueError: if the years are outside the range of supported years
+    :raise TypeError: if the start year or the number of years is not an integer
+    '''
+
+    # the years are validated as arguments to range(), which raises a TypeError unless these are integers
+    years = range(year_start, year_start + total_years)
+    if (year_start < datetime.min.year) or (total_years < 0):
+        message = 'Invalid years: start year {0}, total years {1}'.format(year_start, total_years)
+        _logger.error(message)
+        raise ValueError(message)
+
+    # the first Gregorian day of each year
+    leap_years = np.array([calendar.isleap(year) for year in years], dtype=bool)
+    year_days = np.where(leap_years, 366, 365)
+    year_start_days = np.cumsum(year_days) - year_days
+
+    # the Gregorian day of each day of the 366 day years, for non-leap years the days after the faux Feb. 29th
+    # are shifted back by a day, the faux Feb. 29th itself is mapped to March 1st and computed separately
+    days_366 = np.arange(366)
+    day_offsets = np.where(~leap_years[:, np.newaxis] & (days_366 >= 60), days_366 - 1, days_366)
+    gregorian_days = (year_start_days[:, np.newaxis] + day_offsets).flatten()
+
+    # the faux Feb. 29th days of the 366 day years, and the corresponding Feb. 28th days of the Gregorian calendar
+    non_leap_years = np.flatnonzero(~leap_years)
+    faux_feb29_days = (non_leap_years * 366) + 59
+    feb28_days = year_start_days[non_leap_years] + 58
+
+    # the actual (i.e. not faux Feb. 29th) days of the 366 day years
+    actual_days = np.ones((total_years * 366,), dtype=bool)
+    actual_days[faux_feb29_days] = False
+    actual_days = np.flatnonzero(actual_days)
+
+    # the index maps are shared by all callers, so guard against modification
+    index_maps = (gregorian_days, faux_feb29_days, feb28_days, actual_days)
+    for index_map in index_maps:
+        index_map.flags.writeable = False
+
+    return index_maps
+
+#-----------------------------------------------------------------------------------------------------------------------
 def transform_to_366day(original,
                         year_start,
                         total_years):
@@ -226,58 +378,45 @@ def transform_to_366day(original,
     that corresponds to Feb. 29th in the non-leap year having a value that's an average of the Feb 28th 
     and Mar. 1st values.  
     
-    :param original: 1-D array of daily values
+    Many time series can be transformed at once by providing a 2-D array with shape (cells, days), in which 
+    case the transform is applied to all the cells as a single gather using a precomputed index map.
+    
+    :param original: 1-D array of daily values, or 2-D array of daily values with shape (cells, days)
     :param year_start: the year corresponding to the initial year of the input array, used to determine
                        whether or not each increment of daily values represents an actual leap year
     :param total_years: the total number of years represented by the input array
-    :return: 1-D array of values with size (total_years * 366) 
+    :return: array of values with size (total_years * 366) along the final (days) axis
     '''
-    # original time series is assumed to be a one-dimensional array of floats corresponding to a number of full years
-    
+
     # validate the arguments
-    if len(original.shape) > 1:
-        message = 'Invalid input array: only 1-D arrays are supported'
+    if len(original.shape) not in (1, 2):
+        message = 'Invalid input array: only 1-D and 2-D arrays are supported'
         _logger.error(message)
         raise ValueError(message)
 
-    # allocate the new array for 366 daily values per year, including a faux Feb 29 for non-leap years
-    all_leap = np.full((total_years * 366,), np.NaN)
-    
-    # index of the first day of the year within the original and all_leap arrays
-    original_index = 0
-    all_leap_index = 0
+    # get the index maps between the Gregorian days and the days of the 366 day years
+    gregorian_days, faux_feb29_days, feb28_days, _ = _calendar_index_maps(year_start, total_years)
     
-    # loop over each year
-    for year in range(year_start, year_start + total_years):
-        
-        if calendar.isleap(year):
-            
-            # write the next 366 days from the original time series into the all_leap array
-            all_leap[all_leap_index : all_leap_index + 366] = original[original_index : original_index + 366]
-
-            # increment the "start day of the current year" index for the original so the next iteration jumps ahead a full year
-            original_index += 366
-            
-        else:
+    # make sure we have enough days for the years
+    days_actual = gregorian_days[-1] + 1 if gregorian_days.size > 0 else 0
+    if original.shape[-1] < days_actual:
+        message = 'Invalid input array: {0} days found, at least {1} days expected'.format(original.shape[-1], 
+                                                                                          days_actual)
+        _logger.error(message)
+        raise ValueError(message)
 
-            # write the first 59 days (Jan 1 through Feb 28) from the original time series into the all_leap array
-            all_leap[all_leap_index : all_leap_index + 59] = original[original_index : original_index + 59]
+    # missing values are represented as NaNs in the transformed array
+    original = nan_filled(original)
 
-            # average the Feb 28th and March 1st values as the faux Feb 29th value
-            all_leap[all_leap_index + 59] = (original[original_index + 58] + original[original_index + 59]) / 2
-            
-            # write the remaining days of the year (Mar 1 through Dec 31) from the original into the all_leap array
-            all_leap[all_leap_index + 60: all_leap_index + 366] = original[original_index + 59: original_index + 365]
+    # gather the daily values into the 366 day years
+    all_leap = original[..., gregorian_days]
 
-            # increment the "start day of the current year" index for the original so the next iteration jumps ahead a full year             
-            original_index += 365
-
-        all_leap_index += 366
+    # average the Feb 28th and March 1st values as the faux Feb 29th value of the non-leap years
+    all_leap[..., faux_feb29_days] = (original[..., feb28_days] + original[..., feb28_days + 1]) / 2
 
     return all_leap
 
 #-----------------------------------------------------------------------------------------------------------------------
-@numba.jit
 def transform_to_gregorian(original,
                            year_start):
     '''
@@ -296,61 +435,31 @@ def transform_to_gregorian(original,
     resulting/transformed array will contain 730 elements (365 days for both non-leap years), with the 
     elements that corresponded to Feb. 29th removed.
     
-    :param original: 1-D array of daily values, total size should be a multiple of 366
+    Many time series can be transformed at once by providing a 2-D array with shape (cells, days), in which 
+    case the transform is applied to all the cells as a single gather using a precomputed index map.
+    
+    :param original: 1-D array of daily values, or 2-D array of daily values with shape (cells, days), 
+                     the number of days should be a multiple of 366
     :param year_start: the year corresponding to the initial year (first 366 values) of the input array, 
                        used to determine whether or not each 366 increment of daily values represents 
                        an actual leap year
     '''
-    # original time series is assumed to be a one-dimensional array of floats corresponding to a number of full years,
-    # with each year containing 366 days, as if each year is a leap year
-    
+
     # validate the arguments
-    if len(original.shape) > 1:
-        message = 'Invalid input array: only 1-D arrays are supported'
+    if len(original.shape) not in (1, 2):
+        message = 'Invalid input array: only 1-D and 2-D arrays are supported'
         _logger.error(message)
         raise ValueError(message)
-    if original.size % 366 != 0:
-        message = 'Invalid input array: only 1-D arrays containing multiples of 366 days are supported'
+    if original.shape[-1] % 366 != 0:
+        message = 'Invalid input array: only arrays containing multiples of 366 days are supported'
         _logger.error(message)
         raise ValueError(message)
             
-    # find the total number of actual days between the start and end year
-    total_years = int(original.size / 366)
-    year_end = year_start + total_years - 1
-    days_actual = (datetime(year_end, 12, 31) - datetime(year_start, 1, 1)).days + 1
-    
-    # allocate the new array we'll write daily values into, including a faux Feb 29 for non-leap years
-    gregorian = np.full((days_actual,), np.NaN)
-    
-    # index of the first day of the year within the original and gregorian arrays
-    original_index = 0
-    gregorian_index = 0
-    
-    # loop over each year
-    for year in range(year_start, year_start + total_years):
-        
-        if calendar.isleap(year):
-            
-            # write the next 366 days from the original time series into the gregorian array
-            gregorian[gregorian_index : gregorian_index + 366] = original[original_index : original_index + 366]
-
-            # increment the "start day of the current year" index for the original so the next iteration jumps ahead a full year
-            gregorian_index += 366
-            
-        else:
-
-            # write the first 59 days (Jan 1 through Feb 28) from the original time series into the gregorian array
-            gregorian[gregorian_index : gregorian_index + 59] = original[original_index : original_index + 59]
-
-            # write the remaining days of the year (Mar 1 through Dec 31) from the original into the gregorian array
-            gregorian[gregorian_index + 59: gregorian_index + 365] = original[original_index + 60: original_index + 366]
-
-            # increment the "start day of the current year" index for the original so the next iteration jumps ahead a full year             
-            gregorian_index += 365
-
-        original_index += 366
+    # get the days of the 366 day years which are actual days, i.e. not a faux Feb. 29th of a non-leap year
+    actual_days = _calendar_index_maps(year_start, original.shape[-1] // 366)[3]
 
-    return gregorian
+    # gather the actual days, with missing values represented as NaNs
+    return nan_filled(original)[..., actual_days]
 
 #-----------------------------------------------------------------------------------------------------------------------
 def count_zeros_and_non_missings(values):
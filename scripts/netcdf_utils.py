@@ -206,7 +206,8 @@ def initialize_netcdf_single_variable_grid(file_path,              # pragma: no
                                            valid_min,
                                            valid_max,
                                            variable_units=None,
-                                           fill_value=np.float32(np.NaN)):
+                                           fill_value=np.float32(np.NaN),
+                                           chunk_shape=(1, None)):
     '''
     This function is used to initialize and return a netCDF4.Dataset object, containing a single data variable having 
     dimensions (lat, lon, time). The input data values array is assumed to be a 3-D array with indices corresponding to 
@@ -223,6 +224,8 @@ def initialize_netcdf_single_variable_grid(file_path,              # pragma: no
     :param valid_max: the maximum value to which the data variable of the resulting Dataset(s) will be clipped
     :param variable_units: string specifying the units of the variable 
     :param fill_value: the fill value to use for main data variable of the resulting Dataset
+    :param chunk_shape: the (lat, lon) chunk sizes of the data variable, with each chunk containing all time steps, 
+                        a None chunk size indicates the full size of the corresponding dimension
     '''
 
     with netCDF4.Dataset(template_netcdf, 'r') as template_dataset:
@@ -247,8 +250,9 @@ def initialize_netcdf_single_variable_grid(file_path,              # pragma: no
         # we'll be writing rather than perfectly reflecting the template
         #dataset.setncatts(template_dataset.__dict__)
         
-        # create the time, x, and y dimensions
-        dataset.createDimension('time', time_size)
+        # create the time, x, and y dimensions, with an unlimited time dimension 
+        # so that later time steps can be appended to the dataset
+        dataset.createDimension('time', None)
         dataset.createDimension('lat', lat_size)
         dataset.createDimension('lon', lon_size)
     
@@ -262,11 +266,14 @@ def initialize_netcdf_single_variable_grid(file_path,              # pragma: no
         time_variable = dataset.createVariable('time', time_dtype, ('time',))
         y_variable = dataset.createVariable('lat', lat_dtype, ('lat',))
         x_variable = dataset.createVariable('lon', lon_dtype, ('lon',))
+        # the data variable is chunked to match how the variable is written, by default as latitude slices
+        chunk_lat, chunk_lon = chunk_shape
         data_variable = dataset.createVariable(variable_name,
                                                data_dtype,
                                                ('lat', 'lon', 'time'),
                                                fill_value=fill_value, 
-                                               zlib=False)
+                                               zlib=False,
+                                               chunksizes=(chunk_lat or lat_size, chunk_lon or lon_size, time_size))
     
         # set the variables' attributes
         time_variable.setncatts(template_dataset.variables['time'].__dict__)
@@ -279,6 +286,99 @@ def initialize_netcdf_single_variable_grid(file_path,              # pragma: no
         y_variable[:] = template_dataset.variables['lat'][:]
         x_variable[:] = template_dataset.variables['lon'][:]
 
+        # close the dataset explicitly rather than leaving it for garbage collection, otherwise it can remain
+        # open in this process while worker processes (forked from this process) open the file for writing
+        dataset.close()
+
+#-----------------------------------------------------------------------------------------------------------------------
+def append_netcdf_times(file_path,              # pragma: no cover
+                        template_netcdf):
+    '''
+    Appends the time values of a template NetCDF which are beyond those of an existing NetCDF (such as one created 
+    by initialize_netcdf_single_variable_grid()) to the existing NetCDF's unlimited time dimension. The data variable 
+    is extended accordingly, with the appended time steps initially containing fill values.
+    
+    :param file_path: the file path/name of an existing NetCDF with an unlimited time dimension
+    :param template_netcdf: a NetCDF file containing the full range of time values, with the initial time 
+                            values matching to those of the existing NetCDF
+    :return: the number of time steps in the existing NetCDF before the new time values were appended
+    :rtype: int
+    '''
+
+    with netCDF4.Dataset(template_netcdf, 'r') as template_dataset, \
+         netCDF4.Dataset(file_path, 'a') as dataset:
+        
+        # make sure that we can append to the time dimension
+        if not dataset.dimensions['time'].isunlimited():
+            message = "Unable to append to the NetCDF '{file}', time dimension is not unlimited".format(file=file_path)
+            _logger.error(message)
+            raise ValueError(message)
+        
+        # make sure that the existing times match with the initial times of the template
+        template_times = template_dataset.variables['time'][:]
+        time_variable = dataset.variables['time']
+        existing_size = time_variable.size
+        if (existing_size > template_times.size) or \
+           not np.array_equal(time_variable[:], template_times[:existing_size]):
+            message = "Time values of the NetCDF '{file}' do not match the initial ".format(file=file_path) + \
+                      "time values of '{template}'".format(template=template_netcdf)
+            _logger.error(message)
+            raise ValueError(message)
+
+        # append the new time values
+        time_variable[existing_size:] = template_times[existing_size:]
+        
+    return existing_size
+
+#-----------------------------------------------------------------------------------------------------------------------
+def initialize_netcdf_fitting_params(file_path,              # pragma: no cover
+                                     template_netcdf,
+                                     variable_names,
+                                     steps_per_year,
+                                     description,
+                                     fill_value=np.float32(np.NaN)):
+    '''
+    This function is used to initialize a NetCDF file for storing distribution fitting parameters, containing a data 
+    variable for each parameter with dimensions (lat, lon, calendar_step), where the calendar step dimension has size 
+    12 for monthly or 366 for daily parameters. The latitude and longitude values are copied from the template NetCDF.
+    
+    :param file_path: the file path/name of the NetCDF file that will be created by this function
+    :param template_netcdf: an existing NetCDF file which will be used as a template for the coordinate variables
+    :param variable_names: the names of the parameter variables that will be created within the NetCDF
+    :param steps_per_year: the number of calendar time steps per year, 12 for monthly or 366 for daily
+    :param description: description of the parameters, used as the NetCDF's global description attribute
+    :param fill_value: the fill value to use for the parameter variables
+    '''
+
+    with netCDF4.Dataset(template_netcdf, 'r') as template_dataset:
+ 
+        # open the dataset as a NetCDF in write mode
+        dataset = netCDF4.Dataset(file_path, 'w')
+        dataset.description = description
+        
+        # create the calendar step, x, and y dimensions
+        dataset.createDimension('lat', template_dataset.variables['lat'].size)
+        dataset.createDimension('lon', template_dataset.variables['lon'].size)
+        dataset.createDimension('calendar_step', steps_per_year)
+    
+        # create the coordinate variables, copying the attributes and values from the template
+        for coordinate_name in ['lat', 'lon']:
+            template_variable = template_dataset.variables[coordinate_name]
+            coordinate_variable = dataset.createVariable(coordinate_name, 
+                                                         find_netcdf_datatype(template_variable), 
+                                                         (coordinate_name,))
+            coordinate_variable.setncatts(template_variable.__dict__)
+            coordinate_variable[:] = template_variable[:]
+            
+        # create the parameter variables
+        for variable_name in variable_names:
+            dataset.createVariable(variable_name,
+                                   find_netcdf_datatype(fill_value),
+                                   ('lat', 'lon', 'calendar_step'),
+                                   fill_value=fill_value)
+
+        dataset.close()
+
 #-----------------------------------------------------------------------------------------------------------------------
 def initialize_dataset_climdivs(file_path,            # pragma: no cover
                                 template_dataset,
@@ -7,7 +7,8 @@ import netcdf_utils
 import numpy as np
 import scipy.constants
 
-from climate_indices import indices
+import climate_indices
+from climate_indices import indices, thornthwaite
 
 #-----------------------------------------------------------------------------------------------------------------------
 # set up a basic, global logger which will write to the console as standard error
@@ -326,6 +327,11 @@ class DivisionsProcessor(object):
     #-------------------------------------------------------------------------------------------------------------------
     def run(self):
         
+        # compile the numba kernels before the worker processes are started, so that the workers get the compiled 
+        # kernels from this process or from the on-disk cache rather than each compiling them again (kernels with 
+        # parallel loops are compiled in a separate process, so that this process remains safe to fork)
+        climate_indices.warmup()
+
         # initialize the output NetCDF that will contain the computed indices
         with netCDF4.Dataset(self.divisions_file) as input_dataset:
             
@@ -336,6 +342,13 @@ class DivisionsProcessor(object):
             # get the number of divisions in the input dataset(s)
             divisions_count = input_dataset.variables['division'].size
         
+            # build the daylight hours lookup table used for PET for all valid division latitudes in this process
+            # before the worker processes are started, so that the workers inherit it rather than each recomputing it
+            latitudes = np.ma.filled(input_dataset.variables['lat'][:], np.NaN).astype(np.float64)
+            with np.errstate(invalid='ignore'):
+                latitudes = latitudes[(latitudes < 90.0) & (latitudes > -90.0)]
+            thornthwaite.daylight_hours_table(latitudes)
+
         #--------------------------------------------------------------------------------------------------------------
         # Create PET and Palmer index NetCDF files, computed from input temperature, precipitation, and soil constant.
         # Compute SPI, SPEI, and PNP at all specified month scales.
@@ -5,9 +5,12 @@ import math
 import multiprocessing
 import netCDF4
 import netcdf_utils
+import numba
 import numpy as np
+import os
 
-from climate_indices import indices, utils
+import climate_indices
+from climate_indices import compute, indices, utils
 
 #-----------------------------------------------------------------------------------------------------------------------
 # static constants
@@ -17,6 +20,14 @@ _POSSIBLE_MM_UNITS = ['millimeters', 'millimeter', 'mm']
 _POSSIBLE_INCH_UNITS = ['inches', 'inch']
 _MM_TO_INCHES_FACTOR = 0.0393701
 
+# names of the calibration parameters stored for each index, SPI and SPEI fitting parameters as returned by 
+# indices.spi_grid_fitting_params() and PNP averages as returned by indices.percentage_of_normal_averages()
+_STORED_PARAM_NAMES = {'spi_gamma': ['probabilities_of_zero', 'alphas', 'betas'],
+                       'spi_pearson': ['probabilities_of_zero', 'locs', 'scales', 'skews'],
+                       'spei_gamma': ['probabilities_of_zero', 'alphas', 'betas'],
+                       'spei_pearson': ['probabilities_of_zero', 'locs', 'scales', 'skews'],
+                       'pnp': ['averages']}
+
 #-----------------------------------------------------------------------------------------------------------------------
 # set up a basic, global _logger which will write to the console as standard error
 logging.basicConfig(level=logging.INFO,
@@ -25,23 +36,304 @@ logging.basicConfig(level=logging.INFO,
 _logger = logging.getLogger(__name__)
 
 #-----------------------------------------------------------------------------------------------------------------------
-# multiprocessing locks we'll use to synchronize I/O writes to NetCDF files, one per each output file
-pet_lock = multiprocessing.Lock()
-pdsi_lock = multiprocessing.Lock()
-phdi_lock = multiprocessing.Lock()
-pmdi_lock = multiprocessing.Lock()
-zindex_lock = multiprocessing.Lock()
-scpdsi_lock = multiprocessing.Lock()
-spi_gamma_lock = multiprocessing.Lock()
-spi_pearson_lock = multiprocessing.Lock()
-spei_gamma_lock = multiprocessing.Lock()
-spei_pearson_lock = multiprocessing.Lock()
-pnp_lock = multiprocessing.Lock()
+# queue used by the worker processes to send computed tiles to the single writer process, 
+# assigned within each worker process by the process pool initializer
+_output_queue = None
+
+# number of tiles written by the writer process between syncs of the output NetCDF files
+_SYNC_INTERVAL = 100
+
+# minimum number of grid cells per tile, tiles aligned to smaller input chunks are widened to whole 
+# multiples of the chunks so that the overhead of reading and sending a tile doesn't dominate its computation
+_MIN_TILE_CELLS = 64
+
+# minimum number of tiles per worker process, tiles aligned to larger input chunks are split 
+# so that there are enough tiles to balance the work across the worker processes
+_MIN_TILES_PER_WORKER = 4
+
+# approximate number of time steps sampled when determining which grid cells contain valid values
+_MASK_SAMPLE_STEPS = 12
 
 # ignore runtime warnings
 import warnings
 warnings.simplefilter('ignore', Warning)
 
+#-----------------------------------------------------------------------------------------------------------------------
+def _init_worker(output_queue):             # pragma: no cover
+    '''
+    Initializer for the worker processes of a process pool, assigns the queue used to send results to the writer, 
+    and limits the numba kernels of the worker to a single thread.
+
+    :param output_queue: the queue from which the writer process reads the arrays to be written
+    '''
+
+    global _output_queue
+    _output_queue = output_queue
+
+    # the cores are split by running one worker process per core, so the parallel loops of the numba kernels 
+    # run on a single thread within each worker, rather than every worker starting a thread per core
+    numba.set_num_threads(1)
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _tile_shape(netcdf_file,                # pragma: no cover
+                variable_name,
+                number_of_workers):
+    '''
+    Determines the (lat, lon) shape of the tiles into which a grid is split for processing, aligned to the 
+    chunking of a NetCDF variable with (lat, lon, time) dimensions. Tiles are widened by whole chunks if the chunks 
+    are small, and split if the chunks are so large that there'd be too few tiles to keep the worker processes busy. 
+    Tiles are split by whole chunks, and only split within a chunk if a single chunk is already too large, in which 
+    case the tile sizes divide the chunk sizes so that no tile straddles a chunk boundary. A contiguous (unchunked) 
+    variable is treated as if it was chunked by latitude slice.
+
+    :param netcdf_file: the NetCDF file containing the variable
+    :param variable_name: the name of the variable, assumed to have (lat, lon, time) dimensions
+    :param number_of_workers: the number of worker processes which will process the tiles
+    :return: the number of latitudes and longitudes of the tiles
+    :rtype: tuple of two integers
+    '''
+
+    with netCDF4.Dataset(netcdf_file) as dataset:
+        
+        variable = dataset[variable_name]
+        lat_size, lon_size = variable.shape[:2]
+        chunking = variable.chunking()
+
+    if chunking == 'contiguous':
+        chunk_lat, chunk_lon = 1, lon_size
+    else:
+        chunk_lat, chunk_lon = chunking[:2]
+
+    # widen small tiles by whole chunks, first along longitude and then along latitude
+    tile_lat, tile_lon = chunk_lat, chunk_lon
+    while (tile_lat * tile_lon < _MIN_TILE_CELLS) and (tile_lon < lon_size):
+        tile_lon = min(tile_lon + chunk_lon, lon_size)
+    while (tile_lat * tile_lon < _MIN_TILE_CELLS) and (tile_lat < lat_size):
+        tile_lat = min(tile_lat + chunk_lat, lat_size)
+
+    def tiles_count():
+        return math.ceil(lat_size / tile_lat) * math.ceil(lon_size / tile_lon)
+    minimum_tiles = number_of_workers * _MIN_TILES_PER_WORKER
+
+    # split large tiles until there are enough to go around the worker processes, by halving 
+    # the number of whole chunks per tile, first along latitude and then along longitude
+    lat_chunks = math.ceil(tile_lat / chunk_lat)
+    while (tiles_count() < minimum_tiles) and (lat_chunks > 1):
+        lat_chunks = math.ceil(lat_chunks / 2)
+        tile_lat = min(lat_chunks * chunk_lat, lat_size)
+    lon_chunks = math.ceil(tile_lon / chunk_lon)
+    while (tiles_count() < minimum_tiles) and (lon_chunks > 1):
+        lon_chunks = math.ceil(lon_chunks / 2)
+        tile_lon = min(lon_chunks * chunk_lon, lon_size)
+
+    # if there are still too few tiles then a single chunk is too large, so split within the chunk, 
+    # dividing the tile size by its smallest factor so that the tile size still divides the chunk size
+    def smallest_factor(size):
+        return next(factor for factor in range(2, size + 1) if size % factor == 0)
+    while (tiles_count() < minimum_tiles) and (tile_lat > 1):
+        tile_lat //= smallest_factor(tile_lat)
+    while (tiles_count() < minimum_tiles) and (tile_lon > 1):
+        tile_lon //= smallest_factor(tile_lon)
+
+    return tile_lat, tile_lon
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _grid_tiles(netcdf_file,                # pragma: no cover
+                variable_name,
+                tile_shape):
+    '''
+    Splits the grid of a NetCDF variable with (lat, lon, time) dimensions into tiles of the specified shape, 
+    skipping tiles without any valid (unmasked) values. The tiles are ordered by decreasing number of valid grid 
+    cells, so that when these are processed by a pool of worker processes the most expensive tiles are started 
+    first and the cheapest tiles fill in at the end, rather than leaving workers idle while the last few 
+    expensive tiles are computed. 
+    
+    Valid grid cells are determined from a sample of time steps spread over the full period of record, 
+    in order to avoid reading the entire variable.
+
+    :param netcdf_file: the NetCDF file containing the variable
+    :param variable_name: the name of the variable, assumed to have (lat, lon, time) dimensions
+    :param tile_shape: the number of latitudes and longitudes of the tiles, as returned by _tile_shape()
+    :return: the tiles, each a tuple of latitude and longitude slices
+    :rtype: list of tuples of two slice objects
+    '''
+
+    with netCDF4.Dataset(netcdf_file) as dataset:
+        
+        # read a sample of time steps and find the grid cells having a valid value at any of these
+        variable = dataset[variable_name]
+        lat_size, lon_size, time_size = variable.shape
+        sample_step = max(1, time_size // _MASK_SAMPLE_STEPS)
+        valid_cells = ~np.ma.getmaskarray(variable[:, :, ::sample_step]).all(axis=2)
+
+    # count the valid cells of each tile, skipping tiles without any
+    tile_lat, tile_lon = tile_shape
+    valid_counts = []
+    for lat_start in range(0, lat_size, tile_lat):
+        for lon_start in range(0, lon_size, tile_lon):
+            
+            tile = (slice(lat_start, min(lat_start + tile_lat, lat_size)),
+                    slice(lon_start, min(lon_start + tile_lon, lon_size)))
+            valid_count = np.count_nonzero(valid_cells[tile])
+            if valid_count > 0:
+                valid_counts.append((valid_count, tile))
+
+    _logger.info('Processing %s of %s tiles with shape %s', 
+                 len(valid_counts), 
+                 math.ceil(lat_size / tile_lat) * math.ceil(lon_size / tile_lon), 
+                 tile_shape)
+    
+    # order the tiles by decreasing number of valid cells
+    valid_counts.sort(key=lambda valid_count_and_tile: valid_count_and_tile[0], reverse=True)
+    
+    return [tile for (_, tile) in valid_counts]
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _scaled_variable_name(index_name,      # pragma: no cover
+                          scale):
+    '''
+    Gets the name of the variable used for a scaled index at a scale, for example 'spi_gamma_03'.
+
+    :param index_name: name of the index and distribution, for example 'spi_gamma'
+    :param scale: the number of time steps of the scale
+    :return: the variable name
+    :rtype: string
+    '''
+
+    return index_name + '_' + str(scale).zfill(2)
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _cells_to_tile(values,                  # pragma: no cover
+                   tile):
+    '''
+    Reshapes an array of values for the grid cells of a tile, such as the time series computed for 
+    the tile's cells, into the shape of the tile, ready for writing into a NetCDF variable.
+
+    :param values: 2-D array of values with shape (cells, time), with the cells in row-major (lat, lon) order
+    :param tile: the tile, as a tuple of latitude and longitude slices
+    :return: the values with shape (lat, lon, time)
+    :rtype: 3-D numpy.ndarray
+    '''
+
+    lat_slice, lon_slice = tile
+    return values.reshape(lat_slice.stop - lat_slice.start, lon_slice.stop - lon_slice.start, -1)
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _read_tile_params(variable,             # pragma: no cover
+                      tile):
+    '''
+    Reads a tile of a stored parameter variable with (lat, lon, calendar_step) dimensions, 
+    as the parameters for each of the tile's grid cells with missing values as NaNs.
+
+    :param variable: the parameter variable of an open NetCDF dataset
+    :param tile: the tile, as a tuple of latitude and longitude slices
+    :return: the parameters with shape (cells, calendar_step)
+    :rtype: 2-D numpy.ndarray of floats
+    '''
+
+    params = utils.nan_filled(variable[tile[0], tile[1], :])
+    return params.reshape(-1, params.shape[2])
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _write_tile(netcdf_file,                # pragma: no cover
+                variable_name,
+                tile,
+                values,
+                time_start=0):
+    '''
+    Sends a tile of values to the writer process, to be written into a NetCDF variable with (lat, lon, time) 
+    dimensions (or (lat, lon, calendar_step) for fitting parameters) at the tile's position.
+
+    :param netcdf_file: the NetCDF file which will be written
+    :param variable_name: the name of the variable which will be written
+    :param tile: the tile at which the values will be written, as a tuple of latitude and longitude slices
+    :param values: 3-D array of values with shape (lat, lon, time)
+    :param time_start: the time index at which the tile's values begin
+    '''
+
+    _output_queue.put((netcdf_file, variable_name, tile, time_start, values))
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _write_outputs(output_queue):           # pragma: no cover
+    '''
+    Writes the tiles received on a queue into the corresponding NetCDF variables, until a None is received.
+    This runs as the single writer process, keeping each output NetCDF open for the duration of a computation 
+    and syncing the open NetCDFs at intervals, rather than having each worker process open, sync and close 
+    an output NetCDF for every tile.
+
+    :param output_queue: the queue from which tiles are read, as tuples of 
+                         (NetCDF file, variable name, tile, time index, values)
+    '''
+
+    datasets = {}
+    try:
+
+        # write each tile into its NetCDF, opening the NetCDF if not already open
+        for count, (netcdf_file, variable_name, (lat_slice, lon_slice), time_start, values) in \
+                enumerate(iter(output_queue.get, None), start=1):
+
+            if netcdf_file not in datasets:
+                datasets[netcdf_file] = netCDF4.Dataset(netcdf_file, mode='a')
+            datasets[netcdf_file][variable_name][lat_slice, lon_slice, time_start:] = values
+
+            # sync the open NetCDFs at intervals, so that progress is flushed to disk during long runs
+            if (count % _SYNC_INTERVAL) == 0:
+                for dataset in datasets.values():
+                    dataset.sync()
+
+    finally:
+
+        # close all the NetCDFs we've opened
+        for dataset in datasets.values():
+            dataset.close()
+
+#-----------------------------------------------------------------------------------------------------------------------
+def _compute_and_write(function,            # pragma: no cover
+                       arguments,
+                       number_of_workers):
+    '''
+    Maps a computation function over an iterable of arguments using a pool of worker processes, with the results 
+    sent by the workers to a single writer process which writes these into the output NetCDFs.
+
+    :param function: the function to map over the arguments, expected to send its results via _write_tile()
+    :param arguments: iterable of arguments, each of which will be passed to a call of the function, 
+                      ordered with the most expensive first
+    :param number_of_workers: the number of worker processes in the process pool
+    '''
+
+    # start the writer process, which reads the results sent to the queue by the workers
+    output_queue = multiprocessing.Queue()
+    writer = multiprocessing.Process(target=_write_outputs, args=(output_queue,))
+    writer.start()
+    
+    try:
+
+        # create a process Pool for worker processes, each having access to the writer's queue
+        pool = multiprocessing.Pool(processes=number_of_workers,
+                                    initializer=_init_worker,
+                                    initargs=(output_queue,))
+
+        # map the arguments iterable to the compute function, handing out one argument at a time as workers 
+        # become free so that the work is balanced even though the costs of the arguments differ, 
+        # iterating over the results raises the exception thrown by a worker, if any
+        for _ in pool.imap_unordered(function, arguments, chunksize=1):
+            pass
+
+        # close the pool and wait on all processes to finish
+        pool.close()
+        pool.join()
+
+    finally:
+
+        # signal the writer that there are no further results, and wait for it to finish writing
+        output_queue.put(None)
+        writer.join()
+
+    if writer.exitcode != 0:
+        message = 'Failed to write the computed results, writer process exit code: {0}'.format(writer.exitcode)
+        _logger.error(message)
+        raise RuntimeError(message)
+
 #-----------------------------------------------------------------------------------------------------------------------
 class GridProcessor(object):             # pragma: no cover
 
@@ -59,7 +351,10 @@ class GridProcessor(object):             # pragma: no cover
                  var_name_pet=None,
                  netcdf_awc=None,
                  var_name_awc=None,
-                 scales=None):
+                 scales=None,
+                 save_params=None,
+                 load_params=None,
+                 append=False):
 
         # assign member values
         self.output_file_base = output_file_base
@@ -76,6 +371,9 @@ class GridProcessor(object):             # pragma: no cover
         self.calibration_end_year = calibration_end_year        
         self.index = index
         self.periodicity = periodicity
+        self.save_params = save_params
+        self.load_params = load_params
+        self.append = append
             
         # determine the file to use for coordinate specs (years range and lat/lon sizes), get relevant units
         if self.index == 'pet':
@@ -88,6 +386,7 @@ class GridProcessor(object):             # pragma: no cover
 
                 # use the temperature file as the file that specifies the coordinate specs
                 coordinate_specs_file = self.netcdf_temp
+                coordinate_specs_variable = self.var_name_temp
                 
             else:
                 message = 'A temperature file was not specified, required for PET computation'
@@ -108,6 +407,7 @@ class GridProcessor(object):             # pragma: no cover
 
             # use the precipitation file as the file that specifies the coordinate specs
             coordinate_specs_file = self.netcdf_precip
+            coordinate_specs_variable = self.var_name_precip
 
             # SPI and PNP only require precipitation
             if self.index not in ['spi', 'pnp']:
@@ -139,6 +439,14 @@ class GridProcessor(object):             # pragma: no cover
         self.data_start_year, self.data_end_year = netcdf_utils.initial_and_final_years(coordinate_specs_file)
         self.lat_size, self.lon_size = netcdf_utils.lat_and_lon_sizes(coordinate_specs_file)
         
+        # the number of worker processes we'll have in our process pool, one per core, 
+        # with each worker running the numba kernels on a single thread (see _init_worker())
+        self.number_of_workers = multiprocessing.cpu_count()   # use 1 here for debugging
+
+        # get the shape of the tiles we'll process, aligned to the chunking of the input variable, 
+        # the output variables are chunked to match so that each tile is written as whole chunks
+        self.tile_shape = _tile_shape(coordinate_specs_file, coordinate_specs_variable, self.number_of_workers)
+
         # initialize the NetCDF files used for Palmers output, scaled indices will have 
         # corresponding files initialized at each scale run
         if self.index == 'palmers':
@@ -156,60 +464,57 @@ class GridProcessor(object):             # pragma: no cover
                                                                 'pdsi',
                                                                 'Palmer Drought Severity Index',
                                                                 _VALID_MIN,
-                                                                _VALID_MAX)
+                                                                _VALID_MAX,
+                                                                chunk_shape=self.tile_shape)
             netcdf_utils.initialize_netcdf_single_variable_grid(self.netcdf_phdi,
                                                                 self.netcdf_precip,
                                                                 'phdi',
                                                                 'Palmer Hydrological Drought Index',
                                                                 _VALID_MIN,
-                                                                _VALID_MAX)
+                                                                _VALID_MAX,
+                                                                chunk_shape=self.tile_shape)
             netcdf_utils.initialize_netcdf_single_variable_grid(self.netcdf_pmdi,
                                                                 self.netcdf_precip,
                                                                 'pmdi',
                                                                 'Palmer Modified Drought Index',
                                                                 _VALID_MIN,
-                                                                _VALID_MAX)
+                                                                _VALID_MAX,
+                                                                chunk_shape=self.tile_shape)
             netcdf_utils.initialize_netcdf_single_variable_grid(self.netcdf_scpdsi,
                                                                 self.netcdf_precip,
                                                                 'scpdsi',
                                                                 'Self-calibrated Palmer Drought Severity Index',
                                                                 _VALID_MIN,
-                                                                _VALID_MAX)
+                                                                _VALID_MAX,
+                                                                chunk_shape=self.tile_shape)
             netcdf_utils.initialize_netcdf_single_variable_grid(self.netcdf_zindex,
                                                                 self.netcdf_precip,
                                                                 'zindex',
                                                                 'Palmer Z-Index',
                                                                 _VALID_MIN,
-                                                                _VALID_MAX)
+                                                                _VALID_MAX,
+                                                                chunk_shape=self.tile_shape)
 
         elif self.index in ['spi', 'spei', 'pnp', 'scaled']:
         
-            # place holders for the scaled NetCDFs, these files will be created as needed
-            # and assigned to these variables at each scale's computational iteration
-            self.netcdf_spi_gamma = ''
-            self.netcdf_spi_pearson = ''
-            self.netcdf_spei_gamma = ''
-            self.netcdf_spei_pearson = ''
-            self.netcdf_pnp = ''
+            # dictionary of index names and scales (ex. ('spi_gamma', 3)) to the corresponding 
+            # scaled NetCDFs, these files will be created as needed when run
+            self.scaled_netcdfs = {}
 
     #-------------------------------------------------------------------------------------------------------------------
     def _initialize_scaled_netcdfs(self):
 
-        # dictionary of index types to the NetCDF dataset files corresponding to the base index names and
-        # day scales (this is the object we'll build and return from this function)
-        netcdfs = {}
-
-        # make a scale type substring to use within the variable long_name attributes
-        scale_type = str(self.timestep_scale) + '-month scale'
+        # make a scale increment substring to use within the variable long_name attributes
+        scale_increment = 'month'
         if self.periodicity == 'daily':
             if self.index in ['spi', 'pnp']:
-                scale_type = str(self.timestep_scale) + '-day scale'
+                scale_increment = 'day'
             else:
                 message = 'Incompatible periodicity -- only SPI and PNP are supported for daily time series'
                 _logger.error(message)
                 raise ValueError(message)
         elif self.periodicity != 'monthly':
-            raise ValueError('Unsupported periodicity argument: %s' % self.time_series_type)
+            raise ValueError('Unsupported periodicity argument: %s' % self.periodicity)
         
         # dictionary of index types (ex. 'spi_gamma', 'spei_pearson', etc.) mapped to their corresponding long 
         # variable names, to be used within the respective NetCDFs as variable long_name attributes
@@ -231,59 +536,88 @@ class GridProcessor(object):             # pragma: no cover
         else:
             raise ValueError('Unsupported index: %s', self.index)
 
-        # add the scale type to the end of each variable's long name
-        names_to_longnames = {k: str(v + scale_type) for (k, v) in names_to_longnames.items()}
-        
-        # loop over the indices, creating an output NetCDF dataset for each
-        for index_name, long_name in names_to_longnames.items():
-
-            # use a separate valid min/max for PNP than for the other SP* indices
-            if index_name == 'pnp':
-                valid_min = np.float32(-1000.0)
-                valid_max = np.float32(1000.0)
-            else:
-                valid_min = np.float32(-3.09)
-                valid_max = np.float32(3.09)
-
-            # create the variable name from the index and day scale
-            variable_name = index_name + '_{0}'.format(str(self.timestep_scale).zfill(2))
-
-            # create the NetCDF file path from the
-            netcdf_file = self.output_file_base + '_' + variable_name + '.nc'
-
-            # initialize the output NetCDF
-            netcdf_utils.initialize_netcdf_single_variable_grid(netcdf_file,
-                                                                self.netcdf_precip,
-                                                                variable_name,
-                                                                long_name.format(self.timestep_scale),
-                                                                valid_min,
-                                                                valid_max)
-
-            # add the days scale index's NetCDF to the dictionary for the current index
-            netcdfs[index_name] = netcdf_file
+        # loop over the scales and indices, creating an output NetCDF dataset for each, or appending 
+        # the new time steps to the existing output NetCDFs if we're in append mode
+        append_starts = set()
+        for scale in self.scales:
+            
+            # make a scale type substring to add to the end of each variable's long name
+            scale_type = '{0}-{1} scale'.format(scale, scale_increment)
+            
+            for index_name, long_name in names_to_longnames.items():
+    
+                # use a separate valid min/max for PNP than for the other SP* indices
+                if index_name == 'pnp':
+                    valid_min = np.float32(-1000.0)
+                    valid_max = np.float32(1000.0)
+                else:
+                    valid_min = np.float32(-3.09)
+                    valid_max = np.float32(3.09)
+    
+                # create the variable name from the index and day scale
+                variable_name = _scaled_variable_name(index_name, scale)
+    
+                # create the NetCDF file path from the
+                netcdf_file = self.output_file_base + '_' + variable_name + '.nc'
+    
+                if self.append:
+                    
+                    # extend the existing output NetCDF's times to those of the input
+                    append_starts.add(netcdf_utils.append_netcdf_times(netcdf_file, self.netcdf_precip))
+                    
+                else:
+                    
+                    # initialize the output NetCDF
+                    netcdf_utils.initialize_netcdf_single_variable_grid(netcdf_file,
+                                                                        self.netcdf_precip,
+                                                                        variable_name,
+                                                                        long_name + scale_type,
+                                                                        valid_min,
+                                                                        valid_max,
+                                                                        chunk_shape=self.tile_shape)
+    
+                # add the scale's NetCDF to the dictionary of NetCDFs for the index and scale
+                self.scaled_netcdfs[index_name, scale] = netcdf_file
 
-        # assign the NetCDF file paths to the corresponding member variables
-        if self.index == 'spi':
-            self.netcdf_spi_gamma = netcdfs['spi_gamma']
-            self.netcdf_spi_pearson = netcdfs['spi_pearson']
-        elif self.index == 'spei':
-            self.netcdf_spei_gamma = netcdfs['spei_gamma']
-            self.netcdf_spei_pearson = netcdfs['spei_pearson']
-        elif self.index == 'pnp':
-            self.netcdf_pnp = netcdfs['pnp']
-        elif self.index == 'scaled':
-            self.netcdf_spi_gamma = netcdfs['spi_gamma']
-            self.netcdf_spi_pearson = netcdfs['spi_pearson']
-            self.netcdf_spei_gamma = netcdfs['spei_gamma']
-            self.netcdf_spei_pearson = netcdfs['spei_pearson']
-            self.netcdf_pnp = netcdfs['pnp']
+                # initialize the NetCDF for storing the calibration parameters at this scale, if requested, 
+                # parameters are stored for SPI, SPEI, and PNP
+                if (not self.append) and (self.save_params is not None) and (index_name in _STORED_PARAM_NAMES):
+                
+                    description = 'Calibration parameters for {0}, {1}, '.format(index_name, scale_type) + \
+                                  'calibration period {0}-{1}'.format(self.calibration_start_year, 
+                                                                      self.calibration_end_year)
+                    netcdf_utils.initialize_netcdf_fitting_params(self._fitting_params_file(self.save_params, 
+                                                                                            index_name, 
+                                                                                            scale),
+                                                                  self.netcdf_precip,
+                                                                  _STORED_PARAM_NAMES[index_name],
+                                                                  366 if self.periodicity == 'daily' else 12,
+                                                                  description)
+
+        # determine the time steps we'll compute when appending, which start at the first time step not yet 
+        # present in the output NetCDFs, and the input time steps we'll read for these, which start at the 
+        # beginning of the year containing the earliest time step included in the first appended step's 
+        # scaled sum at the largest scale
+        self.append_start = 0
+        self.read_start = 0
+        if self.append:
+            
+            if len(append_starts) != 1:
+                message = 'Unable to append, the existing output NetCDFs contain differing numbers of time steps'
+                _logger.error(message)
+                raise ValueError(message)
 
+            self.append_start = append_starts.pop()
+            self.read_start = max(0, ((self.append_start - max(self.scales) + 1) // 12) * 12)
+            
     #-------------------------------------------------------------------------------------------------------------------
     def run(self):
 
-        # the number of worker processes we'll have in our process pool
-        number_of_workers = multiprocessing.cpu_count()   # use 1 here for debugging
-    
+        # compile the numba kernels before the worker processes are started, so that the workers get the compiled 
+        # kernels from this process or from the on-disk cache rather than each compiling them again (kernels with 
+        # parallel loops are compiled in a separate process, so that this process remains safe to fork)
+        climate_indices.warmup([self.index])
+
         # all index combinations/bundles except SPI and PNP will require PET, so compute it here if required
         if (self.netcdf_pet is None) and (self.index in ['pet', 'spei', 'scaled', 'palmers']):
         
@@ -294,59 +628,41 @@ class GridProcessor(object):             # pragma: no cover
                                                                 'Potential Evapotranspiration',
                                                                 0.0,
                                                                 10000.0,
-                                                                'millimeters')
+                                                                'millimeters',
+                                                                chunk_shape=self.tile_shape)
 
-            # create a process Pool for worker processes which will compute indices over an entire latitude slice
-            pool = multiprocessing.Pool(processes=number_of_workers)
+            # the PET variable we'll read from the computed PET NetCDF, 
+            # for use as an input when computing SPEI and Palmers
+            self.var_name_pet = 'pet'
+            self.units_pet = 'millimeters'
 
-            # map the latitude indices as an arguments iterable to the compute function
-            result = pool.map_async(self._process_latitude_pet, range(self.lat_size))
-    
-            # get the exception(s) thrown, if any
-            result.get()
-    
-            # close the pool and wait on all processes to finish
-            pool.close()
-            pool.join()
+            # compute over all tiles containing valid temperatures using a pool of worker 
+            # processes, with the results written to the output NetCDFs by a writer process
+            _compute_and_write(self._process_tile_pet, 
+                               _grid_tiles(self.netcdf_temp, self.var_name_temp, self.tile_shape), 
+                               self.number_of_workers)
 
         # compute indices other than PET if requested
         if self.index != 'pet':
             
             if self.index in ['spi', 'spei', 'pnp', 'scaled']:
                 
-                for scale in self.scales:
-                    
-                    self.timestep_scale = scale
-                    
-                    self._initialize_scaled_netcdfs()
-                    
-                    # create a process Pool for worker processes which will compute indices over a full latitude slice
-                    pool = multiprocessing.Pool(processes=number_of_workers)
-
-                    # map the latitude indices as an arguments iterable to the compute function
-                    result = pool.map_async(self._process_latitude_scaled, range(self.lat_size))
-            
-                    # get the exception(s) thrown, if any
-                    result.get()
-            
-                    # close the pool and wait on all processes to finish
-                    pool.close()
-                    pool.join()
+                self._initialize_scaled_netcdfs()
+                
+                # compute all scales over all tiles containing valid precipitation using a pool of worker 
+                # processes, with the results written to the output NetCDFs by a writer process, each tile's 
+                # inputs are read once and used for all scales rather than read again for each scale
+                _compute_and_write(self._process_tile_scaled, 
+                                   _grid_tiles(self.netcdf_precip, self.var_name_precip, self.tile_shape), 
+                                   self.number_of_workers)
                 
             elif self.index == 'palmers':
     
-                # create a process Pool for worker processes which will compute indices over an entire latitude slice
-                pool = multiprocessing.Pool(processes=number_of_workers)
-
-                # map the latitude indices as an arguments iterable to the compute function
-                result = pool.map_async(self._process_latitude_palmers, range(self.lat_size))
-        
-                # get the exception(s) thrown, if any
-                result.get()
-        
-                # close the pool and wait on all processes to finish
-                pool.close()
-                pool.join()
+                # compute over all tiles containing valid precipitation using a pool of worker 
+                # processes, with the results written to the output NetCDFs by a writer process
+                _compute_and_write(self._process_tile_palmers, 
+                                   _grid_tiles(self.netcdf_precip, self.var_name_precip, self.tile_shape), 
+                                   self.number_of_workers)
                 
             else:
                             
@@ -354,263 +670,304 @@ class GridProcessor(object):             # pragma: no cover
     
 
     #-------------------------------------------------------------------------------------------------------------------
-    def _process_latitude_scaled(self, lat_index):
+    def _process_tile_scaled(self, tile):
         '''
-        Processes the relevant scaled indices for a single latitude slice at a single scale.
+        Processes the relevant scaled indices for a single tile at all scales. The tile's input values are read 
+        (and for daily transformed to 366-day years) only once, and the scaled sums of precipitation for all 
+        scales are computed from a single cumulative sum pass over the values.
 
-        :param lat_index: the latitude index of the latitude slice that will be read from NetCDF, computed, and written
+        :param tile: the tile that will be read from NetCDF, computed, and written, 
+                     as a tuple of latitude and longitude slices
         '''
 
         # open the precipitation NetCDF within a context manager
         with netCDF4.Dataset(self.netcdf_precip) as dataset_precip:
 
-            # read the latitude slice of input precipitation
-            lat_slice_precip = dataset_precip[self.var_name_precip][lat_index, :, :]   # assuming (lat, lon, time)
+            # read the tile of input precipitation, when appending we only read 
+            # the trailing time steps required for computing the appended time steps
+            tile_precip = dataset_precip[self.var_name_precip][tile[0], tile[1], self.read_start:]   # (lat, lon, time)
+
+        # we'll compute over the tile's grid cells as time series in a 2-D array with shape 
+        # (cells, time), with missing values as NaNs, reshaping the results back into the tile's shape before writing
+        time_size = tile_precip.shape[2]
+        precips = utils.nan_filled(tile_precip).reshape(-1, time_size)
+        
+        # the initial year of the values we've read, and the offset of 
+        # the time steps we'll write from the start of these values
+        data_start_year = self.data_start_year + (self.read_start // 12)
+        write_offset = self.append_start - self.read_start
 
         if self.periodicity == 'daily':
 
+            scale_increment = 'day'
+
             # times are daily, transform to all leap year times (i.e. 366 days per year), 
             # so we fill Feb. 29th of each non-leap missing
             # TODO / FIXME move this up/out of here, should only need to be computed once
             total_years = self.data_end_year - self.data_start_year + 1
 
-            # allocate an array to hold transformed time series where all years contain 366 days
-            original_days_count = lat_slice_precip.shape[1]
-            lat_slice_precip_all_leap = np.full((self.lon_size, total_years * 366), np.NaN)
+            # transform the time series of all grid cells at once so these represent all years containing 366 days, 
+            # with the Feb. 29th element containing a fill value during non-leap years, and use these all leap 
+            # daily values as the precipitation we'll work on
+            precips = utils.transform_to_366day(precips, self.data_start_year, total_years)
             
-            # at each longitude we have a time series of values, loop over these longitudes and transform each
-            # corresponding time series to 366 day years representation (fill Feb 29 during non-leap years)
-            # TODO work out how to apply this across the lon axis, to eliminate this loop (np.apply_along_axis()?)
-            for lon_index in range(self.lon_size):
-                
-                # transform the data so it represents all years containing 366 days, 
-                # with the Feb. 29th element containing a fill value during non-leap years
-                lat_slice_precip_all_leap[lon_index, :] = utils.transform_to_366day(lat_slice_precip[lon_index, :],
-                                                                                    self.data_start_year,
-                                                                                    total_years)
-
-            # use the all leap daily values as the latitude slice we'll work on
-            lat_slice_precip = lat_slice_precip_all_leap
+        else:
             
-        # compute PNP if specified
-        if self.index in ['pnp', 'scaled']:
-
-            if self.periodicity == 'daily':  
-                scale_increment = 'day'
-            elif self.periodicity == 'monthly':
-                scale_increment = 'month'
-                message = "Computing {scale}-{incr} ".format(scale=self.timestep_scale, incr=scale_increment) + \
-                          "{index} for latitude index {lat}".format(index='PNP', lat=lat_index)
-
-            # compute PNP across all longitudes of the latitude slice
-            lat_slice_pnp = np.apply_along_axis(indices.percentage_of_normal,
-                                                1,
-                                                lat_slice_precip,
-                                                self.timestep_scale,
-                                                self.data_start_year,
-                                                self.calibration_start_year,
-                                                self.calibration_end_year,
-                                                self.time_series_type)
-
-            if self.periodicity == 'daily':
-
-                # at each longitude we have a time series of values with a 366 day per year representation
-                # (Feb. 29 during non-leap years is a fill value), loop over these longitudes and transform
-                # each corresponding time series back to a normal Gregorian calendar
-                lat_slice_pnp_gregorian = np.full((self.lon_size, original_days_count), np.NaN)
-                for lon_index in range(lat_slice_precip.shape[0]):
-                    
-                    # transform the data so it represents mixed leap and non-leap years, i.e. normal Gregorian calendar
-                    lat_slice_pnp_gregorian[lon_index, :] = utils.transform_to_gregorian(lat_slice_pnp[lon_index, :],
-                                                                                         self.data_start_year)
-
-                # use the transformed arrays as the lat slice we'll write to the output NetCDF
-                lat_slice_pnp = lat_slice_pnp_gregorian
+            scale_increment = 'month'
             
-            # use relevant variable name
-            pnp_variable_name = 'pnp_' + str(self.timestep_scale).zfill(2)
-
-            # open the existing PNP NetCDF file for writing, copy the latitude 
-            # slice into the PNP variable at the indexed latitude position
-            pnp_lock.acquire()
-            pnp_dataset = netCDF4.Dataset(self.netcdf_pnp, mode='a')
-            pnp_dataset[pnp_variable_name][lat_index, :, :] = lat_slice_pnp   # assuming (lat, lon, time) orientation
-            pnp_dataset.sync()
-            pnp_dataset.close()
-            pnp_lock.release()
-
-        # compute SPI if specified
-        if self.index in ['spi', 'scaled']:
-
-            if self.periodicity == 'daily':  
-                scale_increment = 'day'
-            elif self.periodicity == 'monthly':
-                scale_increment = 'month'
-            _logger.info('Computing {scale}-{incr} {index} for latitude index {lat}'.format(scale=self.timestep_scale, 
-                                                                                            incr=scale_increment, 
-                                                                                            index='SPI', 
-                                                                                            lat=lat_index))
-
-            # compute SPI/Gamma across all longitudes of the latitude slice
-            spi_gamma_lat_slice = np.apply_along_axis(indices.spi,
-                                                      1,
-                                                      lat_slice_precip,
-                                                      self.timestep_scale,
-                                                      indices.Distribution.gamma,
-                                                      self.data_start_year,
-                                                      self.calibration_start_year,
-                                                      self.calibration_end_year,
-                                                      self.periodicity)
-
-            # compute SPI/Pearson across all longitudes of the latitude slice
-            spi_pearson_lat_slice = np.apply_along_axis(indices.spi,
-                                                        1,
-                                                        lat_slice_precip,
-                                                        self.timestep_scale,
-                                                        indices.Distribution.pearson_type3,
-                                                        self.data_start_year,
-                                                        self.calibration_start_year,
-                                                        self.calibration_end_year,
-                                                        self.periodicity)
-
-            if self.periodicity == 'daily':
+        # compute the scaled sums of precipitation for all scales from a single pass over the values, 
+        # these are used as the values for computing PNP and SPI at a scale of 1 (i.e. without further scaling)
+        if self.index in ['pnp', 'spi', 'scaled']:
+            
+            scaled_precips = compute.sum_to_scales(precips, self.scales)
 
-                # at each longitude we have a time series of values with a 366 day per year representation 
-                # (Feb. 29 during non-leap years is a fill value), loop over these longitudes and transform each 
-                # corresponding time series back to a normal Gregorian calendar
-                lat_slice_spi_gamma = np.full((self.lon_size, original_days_count), np.NaN)
-                lat_slice_spi_pearson = np.full((self.lon_size, original_days_count), np.NaN)
-                for lon_index in range(lat_slice_precip.shape[0]):
-                    
-                    # transform the data so it represents mixed leap and non-leap years, i.e. normal Gregorian calendar
-                    lat_slice_spi_gamma[lon_index, :] = utils.transform_to_gregorian(spi_gamma_lat_slice[lon_index, :],
-                                                                                     self.data_start_year)
-                    lat_slice_spi_pearson[lon_index, :] = utils.transform_to_gregorian(spi_pearson_lat_slice[lon_index, :],
-                                                                                       self.data_start_year)
-
-                # use these transformed arrays as the lat slices we'll write to the output NetCDF
-                spi_gamma_lat_slice = lat_slice_spi_gamma
-                spi_pearson_lat_slice = lat_slice_spi_pearson
-
-            # use relevant variable names
-            spi_gamma_variable_name = 'spi_gamma_' + str(self.timestep_scale).zfill(2)
-            spi_pearson_variable_name = 'spi_pearson_' + str(self.timestep_scale).zfill(2)
-
-            # open the existing SPI/Gamma NetCDF file for writing, copy the latitude
-            # slice into the SPI variable at the indexed latitude position
-            spi_gamma_lock.acquire()
-            spi_gamma_dataset = netCDF4.Dataset(self.netcdf_spi_gamma, mode='a')
-            spi_gamma_dataset[spi_gamma_variable_name][lat_index, :, :] = spi_gamma_lat_slice   # (lat, lon, time)
-            spi_gamma_dataset.sync()
-            spi_gamma_dataset.close()
-            spi_gamma_lock.release()
-
-            # open the existing SPI/Pearson NetCDF file for writing, copy the latitude 
-            # slice into the SPI variable at the indexed latitude position
-            spi_pearson_lock.acquire()
-            spi_pearson_dataset = netCDF4.Dataset(self.netcdf_spi_pearson, mode='a')
-            spi_pearson_dataset[spi_pearson_variable_name][lat_index, :, :] = spi_pearson_lat_slice   # (lat, lon, time)
-            spi_pearson_dataset.sync()
-            spi_pearson_dataset.close()
-            spi_pearson_lock.release()
-
-        # compute SPEI if specified
+        # read the tile of input PET if we'll compute SPEI
         if self.index in ['spei', 'scaled']:
 
             if self.periodicity == 'daily':
                 message = 'Daily SPEI not yet supported'
                 _logger.error(message)
                 raise ValueError(message)
-            elif self.periodicity == 'monthly':
-                scale_increment = 'month'
-                message = "Computing {scale}-{incr} ".format(scale=self.timestep_scale, incr=scale_increment) + \
-                          "{index} for latitude index {lat}".format(index='SPEI', lat=lat_index)
-                _logger.info(message)
-                
+
             # open the PET NetCDF within a context manager (this PET file should be present, either provided initially
             # as a command line argument to the script or computed from temperature earlier in the processing chain)
             with netCDF4.Dataset(self.netcdf_pet) as dataset_pet:            
                 
-                # read the latitude slice of input PET
-                lat_slice_pet = dataset_pet['pet'][lat_index, :, :]   # assuming (lat, lon, time) orientation
-
-            # allocate latitude slices for SPEI output
-            spei_gamma_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-            spei_pearson_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-
-            # compute SPEI for each longitude from the latitude slice where we have valid inputs
-            for lon_index in range(self.lon_size):
-
-                # get the time series values for this longitude
-                precip_time_series = lat_slice_precip[lon_index, :]
-                pet_time_series = lat_slice_pet[lon_index, :]
-
-                # compute SPEI for the current longitude only if we have valid inputs
-                if (not precip_time_series.mask.all()) and \
-                   (not pet_time_series.mask.all()):
-
-                    # compute SPEI/Gamma
-                    spei_gamma_lat_slice[lon_index, :] = indices.spei(self.timestep_scale,
-                                                                      indices.Distribution.gamma,
-                                                                      self.periodicity,
-                                                                      self.data_start_year,
-                                                                      self.calibration_start_year,
-                                                                      self.calibration_end_year,
-                                                                      precip_time_series,
-                                                                      pet_mm=pet_time_series)
-               
-                    # compute SPEI/Pearson
-                    spei_pearson_lat_slice[lon_index, :] = indices.spei(self.timestep_scale,
-                                                                        indices.Distribution.pearson_type3,
-                                                                        self.periodicity,
-                                                                        self.data_start_year,
-                                                                        self.calibration_start_year,
-                                                                        self.calibration_end_year,
-                                                                        precip_time_series,
-                                                                        pet_mm=pet_time_series)
-                 
-            # use relevant variable names
-            spei_gamma_variable_name = 'spei_gamma_' + str(self.timestep_scale).zfill(2)
-            spei_pearson_variable_name = 'spei_pearson_' + str(self.timestep_scale).zfill(2)
-
-            # open the existing SPEI/Gamma NetCDF file for writing, copy the latitude slice 
-            # into the SPEI variable at the indexed latitude position
-            spei_gamma_lock.acquire()
-            spei_gamma_dataset = netCDF4.Dataset(self.netcdf_spei_gamma, mode='a')
-            spei_gamma_dataset[spei_gamma_variable_name][lat_index, :, :] = spei_gamma_lat_slice
-            spei_gamma_dataset.sync()
-            spei_gamma_dataset.close()
-            spei_gamma_lock.release()
-
-            # open the existing SPEI/Pearson NetCDF file for writing, copy the latitude slice
-            # into the SPEI variable at the indexed latitude position
-            spei_pearson_lock.acquire()
-            spei_pearson_dataset = netCDF4.Dataset(self.netcdf_spei_pearson, mode='a')
-            spei_pearson_dataset[spei_pearson_variable_name][lat_index, :, :] = spei_pearson_lat_slice
-            spei_pearson_dataset.sync()
-            spei_pearson_dataset.close()
-            spei_pearson_lock.release()
+                # read the tile of input PET, as time series with shape (cells, time), when appending 
+                # we only read the same trailing time steps as we've read for precipitation
+                pets = dataset_pet[self.var_name_pet][tile[0], tile[1], self.read_start:]   # (lat, lon, time)
+                pets = utils.nan_filled(pets).reshape(precips.shape)
+
+            # compute the offset (P - PET) differences once for the tile, and the scaled sums of the differences 
+            # for all scales from a single pass over the values, these are used for computing SPEI at a scale of 1
+            scaled_p_minus_pets = compute.sum_to_scales(indices.spei_grid_differences(precips, pets), self.scales)
+
+        for scale_index, scale in enumerate(self.scales):
+            
+            # compute PNP if specified
+            if self.index in ['pnp', 'scaled']:
+    
+                _logger.info('Computing {scale}-{incr} {index} for tile {tile}'.format(scale=scale, 
+                                                                                       incr=scale_increment, 
+                                                                                       index='PNP', 
+                                                                                       tile=tile))
+    
+                # compute PNP across all grid cells of the tile
+                tile_pnp = self._compute_pnp(tile, scaled_precips[scale_index], data_start_year, scale)
+    
+                if self.periodicity == 'daily':
+    
+                    # at each grid cell we have a time series of values with a 366 day per year representation
+                    # (Feb. 29 during non-leap years is a fill value), transform the time series of all cells 
+                    # back to a normal Gregorian calendar, and use these as the tile we'll write to the output NetCDF
+                    tile_pnp = utils.transform_to_gregorian(tile_pnp, self.data_start_year)
+                
+                # send the tile to the writer process, to be copied into the PNP variable at the tile's position
+                _write_tile(self.scaled_netcdfs['pnp', scale], 
+                            _scaled_variable_name('pnp', scale), 
+                            tile, 
+                            _cells_to_tile(tile_pnp[:, write_offset:], tile), 
+                            self.append_start)
+    
+            # compute SPI if specified
+            if self.index in ['spi', 'scaled']:
+    
+                _logger.info('Computing {scale}-{incr} {index} for tile {tile}'.format(scale=scale, 
+                                                                                       incr=scale_increment, 
+                                                                                       index='SPI', 
+                                                                                       tile=tile))
+    
+                # compute SPI/Gamma and SPI/Pearson across all grid cells of the tile
+                tile_spis = self._compute_spi_grids(tile, scaled_precips[scale_index], data_start_year, scale, 'spi')
+                for index_name, tile_spi in tile_spis.items():
+    
+                    if self.periodicity == 'daily':
+        
+                        # at each grid cell we have a time series of values with a 366 day per year representation 
+                        # (Feb. 29 during non-leap years is a fill value), transform the time series of all cells 
+                        # back to a normal Gregorian calendar, and use these as the tile we'll write to the output NetCDF
+                        tile_spi = utils.transform_to_gregorian(tile_spi, self.data_start_year)
+        
+                    # send the tile to the writer process, to be copied into the SPI variable at the tile's position
+                    _write_tile(self.scaled_netcdfs[index_name, scale], 
+                                _scaled_variable_name(index_name, scale), 
+                                tile, 
+                                _cells_to_tile(tile_spi[:, write_offset:], tile), 
+                                self.append_start)
+    
+            # compute SPEI if specified
+            if self.index in ['spei', 'scaled']:
+    
+                _logger.info('Computing {scale}-{incr} {index} for tile {tile}'.format(scale=scale, 
+                                                                                       incr=scale_increment, 
+                                                                                       index='SPEI', 
+                                                                                       tile=tile))
+
+                # compute SPEI/Gamma and SPEI/Pearson across all grid cells of the tile, 
+                # cells without valid inputs result in NaNs
+                tile_speis = self._compute_spi_grids(tile, 
+                                                     scaled_p_minus_pets[scale_index], 
+                                                     data_start_year, 
+                                                     scale, 
+                                                     'spei')
+                for index_name, tile_spei in tile_speis.items():
+                     
+                    # send the tile to the writer process, to be copied into the SPEI variable at the tile's position
+                    _write_tile(self.scaled_netcdfs[index_name, scale], 
+                                _scaled_variable_name(index_name, scale), 
+                                tile, 
+                                _cells_to_tile(tile_spei[:, write_offset:], tile), 
+                                self.append_start)
+
+    #-------------------------------------------------------------------------------------------------------------------
+    def _fitting_params_file(self, file_base, index_name, scale):
+        '''
+        Gets the path of the NetCDF file used to store the fitting parameters for an index at a scale.
+
+        :param file_base: base file path and name of the fitting parameter files
+        :param index_name: name of the index and distribution, for example 'spi_gamma'
+        :param scale: the number of time steps of the scale
+        :return: the fitting parameters NetCDF file path
+        :rtype: string
+        '''
+
+        return file_base + '_' + _scaled_variable_name(index_name, scale) + '_params.nc'
+
+    #-------------------------------------------------------------------------------------------------------------------
+    def _compute_spi_grids(self, tile, scaled_values, data_start_year, scale, index):
+        '''
+        Computes SPI (or SPEI) for the Gamma and Pearson distributions for a single tile at a single scale, from 
+        precipitation (or offset P - PET) values already summed to the scale, with both distributions computed from 
+        the same validated and reshaped values. If a fitting parameters file base was specified for loading then the 
+        stored fitting parameters are read and used to transform the values without refitting, and if one was 
+        specified for saving then the fitted parameters are written for later use.
+
+        :param tile: the tile, as a tuple of latitude and longitude slices
+        :param scaled_values: the tile's precipitation values (for SPI) or offset (P - PET) differences 
+                              (for SPEI) summed to the scale, with shape (cells, time)
+        :param data_start_year: the initial year of the tile's values
+        :param scale: the number of time steps of the scale
+        :param index: the index being computed, either 'spi' or 'spei'
+        :return: dictionary of index names (for example 'spi_gamma' and 'spi_pearson') to the tile's index values, 
+                 each with shape (cells, time)
+        :rtype: dictionary of strings to 2-D numpy.ndarray of floats
+        '''
+
+        index_names_to_distributions = {index + '_gamma': indices.Distribution.gamma,
+                                        index + '_pearson': indices.Distribution.pearson_type3}
+
+        fitting_params = None
+        if self.load_params is not None:
+
+            # read the tile of stored fitting parameters, each with shape (cells, calendar_step)
+            fitting_params = {}
+            for index_name, distribution in index_names_to_distributions.items():
+                with netCDF4.Dataset(self._fitting_params_file(self.load_params, index_name, scale)) as params_dataset:
+                    fitting_params[distribution] = {name: _read_tile_params(params_dataset[name], tile)
+                                                    for name in _STORED_PARAM_NAMES[index_name]}
+
+        elif self.save_params is not None:
+
+            fitting_params = {}
+            for index_name, distribution in index_names_to_distributions.items():
+
+                # fit the calibration period values across all grid cells of the tile, 
+                # the values are already scaled so we fit these at a scale of 1
+                fitting_params[distribution] = indices.spi_grid_fitting_params(scaled_values,
+                                                                               1,
+                                                                               distribution,
+                                                                               data_start_year,
+                                                                               self.calibration_start_year,
+                                                                               self.calibration_end_year,
+                                                                               self.periodicity)
+
+                # send the tile of each parameter to the writer process, to be 
+                # copied into the parameter's variable at the tile's position
+                params_file = self._fitting_params_file(self.save_params, index_name, scale)
+                for name, params in fitting_params[distribution].items():
+                    _write_tile(params_file, name, tile, _cells_to_tile(params, tile))   # (lat, lon, calendar_step)
+            
+        # the values are already scaled so we compute the index at a scale of 1
+        tile_values = indices.spi_grid_distributions(scaled_values,
+                                                     1,
+                                                     list(index_names_to_distributions.values()),
+                                                     data_start_year,
+                                                     self.calibration_start_year,
+                                                     self.calibration_end_year,
+                                                     self.periodicity,
+                                                     fitting_params)
+
+        return dict(zip(index_names_to_distributions.keys(), tile_values))
+
+    #-------------------------------------------------------------------------------------------------------------------
+    def _compute_pnp(self, tile, scaled_precips, data_start_year, scale):
+        '''
+        Computes PNP for a single tile at a single scale, from precipitation values already summed to the scale. If a parameters file base was specified for 
+        loading then the stored calibration averages are read and used in place of the calibration period values, 
+        and if one was specified for saving then the calibration averages are written for later use.
+
+        :param tile: the tile, as a tuple of latitude and longitude slices
+        :param scaled_precips: the tile's precipitation values summed to the scale, with shape (cells, time)
+        :param data_start_year: the initial year of the tile's precipitation values
+        :param scale: the number of time steps of the scale
+        :return: the tile's PNP values, with shape (cells, time)
+        :rtype: 2-D numpy.ndarray of floats
+        '''
+
+        # the values are already scaled so we compute the averages and PNP at a scale of 1
+        averages = None
+        if self.load_params is not None:
+
+            # read the tile of stored averages, with shape (cells, calendar_step)
+            with netCDF4.Dataset(self._fitting_params_file(self.load_params, 'pnp', scale)) as params_dataset:
+                averages = _read_tile_params(params_dataset['averages'], tile)
+
+        elif self.save_params is not None:
+
+            # compute the calibration averages across all grid cells of the tile
+            averages = indices.percentage_of_normal_grid_averages(scaled_precips,
+                                                                  1,
+                                                                  data_start_year,
+                                                                  self.calibration_start_year,
+                                                                  self.calibration_end_year,
+                                                                  self.periodicity)
+
+            # send the tile of averages to the writer process, to be copied into the tile's position
+            _write_tile(self._fitting_params_file(self.save_params, 'pnp', scale), 
+                        'averages', 
+                        tile, 
+                        _cells_to_tile(averages, tile))   # (lat, lon, calendar_step)
+            
+        # compute PNP across all grid cells of the tile
+        return indices.percentage_of_normal_grid(scaled_precips,
+                                                 1,
+                                                 data_start_year,
+                                                 self.calibration_start_year,
+                                                 self.calibration_end_year,
+                                                 self.periodicity,
+                                                 averages)
 
     #-------------------------------------------------------------------------------------------------------------------
-    def _process_latitude_pet(self, lat_index):
+    def _process_tile_pet(self, tile):
         '''
-        Processes PET for a single latitude slice.
+        Processes PET for a single tile.
 
-        :param lat_index: the latitude index of the latitude slice that will be read from NetCDF, computed, and written
+        :param tile: the tile that will be read from NetCDF, computed, and written, 
+                     as a tuple of latitude and longitude slices
         '''
 
-        _logger.info('Computing %s PET for latitude index %s', self.periodicity, lat_index)
+        _logger.info('Computing %s PET for tile %s', self.periodicity, tile)
 
         # open the temperature NetCDF within a context manager
         with netCDF4.Dataset(self.netcdf_temp) as temp_dataset:
 
-            # read the latitude slice of input temperature values
-            temp_lat_slice = temp_dataset[self.var_name_temp][lat_index, :, :]   # assuming (lat, lon, time) orientation
+            # read the tile of input temperature values
+            tile_temp = temp_dataset[self.var_name_temp][tile[0], tile[1], :]   # assuming (lat, lon, time) orientation
 
             #TODO verify that values are in degrees Celsius, if not then convert
             
-            # get the actual latitude value (assumed to be in degrees north) for the latitude slice specified by the index
-            latitude_degrees_north = temp_dataset['lat'][lat_index]
+            # get the actual latitude values (assumed to be in degrees north) for the tile's latitude slices
+            latitudes_degrees_north = temp_dataset['lat'][tile[0]]
 
             if self.periodicity == 'daily':
 
@@ -653,145 +1010,88 @@ class GridProcessor(object):             # pragma: no cover
 
             else:    # monthly
 
-                # compute PET across all longitudes of the latitude slice
-                pet_lat_slice = np.apply_along_axis(indices.pet,
-                                                    1,
-                                                    temp_lat_slice,
-                                                    latitude_degrees=latitude_degrees_north,
-                                                    data_start_year=self.data_start_year)
-
-            # open the existing PET NetCDF file for writing, copy the latitude slice
-            # into the PET variable at the indexed latitude position
-            pet_lock.acquire()
-            pet_dataset = netCDF4.Dataset(self.netcdf_pet, mode='a')
-            pet_dataset['pet'][lat_index, :, :] = pet_lat_slice   # this assumes (lat, lon, time), TODO make this more general to allow for other dimension orders, etc.
-            pet_dataset.sync()
-            pet_dataset.close()
-            pet_lock.release()
+                # compute PET for all grid cells of the tile at once, as time series with shape (cells, time), 
+                # with each cell's latitude being that of its latitude slice, assumes (lat, lon, time) orientation
+                temps = utils.nan_filled(tile_temp).reshape(-1, tile_temp.shape[2])
+                latitudes = np.repeat(utils.nan_filled(latitudes_degrees_north), tile_temp.shape[1])
+                tile_pet = _cells_to_tile(indices.pet_grid(temps, latitudes, self.data_start_year), tile)
+
+            # send the tile to the writer process, to be copied into the PET variable at the tile's 
+            # position, this assumes (lat, lon, time), TODO make this more general to allow for other 
+            # dimension orders, etc.
+            _write_tile(self.netcdf_pet, 'pet', tile, tile_pet)
 
     #-------------------------------------------------------------------------------------------------------------------
-    def _process_latitude_palmers(self, lat_index):
+    def _process_tile_palmers(self, tile):
         """
-        Perform computation of Palmer indices on a latitude slice, i.e. all lat/lon locations for a single latitude.
-        Each lat/lon will have its corresponding time series used as input, with a corresponding time series output
-        for each index computed. The full latitude slice (all lons for the indexed lat) of index values will be written
-        into the corresponding NetCDF.
+        Perform computation of Palmer indices on a tile, i.e. all lat/lon locations within a range of latitudes and 
+        longitudes. Each lat/lon will have its corresponding time series used as input, with a corresponding time 
+        series output for each index computed. The full tile of index values will be written into the corresponding 
+        NetCDF.
 
-        :param lat_index: index of the latitude in the NetCDF, valid range is [0..(total # of divisions - 1)]
+        :param tile: the tile that will be read from NetCDF, computed, and written, 
+                     as a tuple of latitude and longitude slices
         """
 
-        _logger.info('Computing Palmers for latitude index %s', lat_index)
+        _logger.info('Computing Palmers for tile %s', tile)
 
         # open the input NetCDFs
         with netCDF4.Dataset(self.netcdf_precip) as dataset_precip, \
              netCDF4.Dataset(self.netcdf_pet) as dataset_pet, \
              netCDF4.Dataset(self.netcdf_awc) as dataset_awc:
 
-            # read the latitude slice of input precipitation and PET values
-            # assumes (lat, lon, time) orientation
-            lat_slice_precip = dataset_precip[self.var_name_precip][lat_index, :, :]    
-            lat_slice_pet = dataset_pet[self.var_name_pet][lat_index, :, :]
+            # read the tile of input precipitation and PET values, as time series 
+            # with shape (cells, time), assumes (lat, lon, time) orientation
+            tile_precip = dataset_precip[self.var_name_precip][tile[0], tile[1], :]
+            precips = tile_precip.reshape(-1, tile_precip.shape[2])
+            pets = dataset_pet[self.var_name_pet][tile[0], tile[1], :].reshape(precips.shape)
 
             # determine the dimensionality of the AWC dataset, in case there is 
-            # a missing time dimension, then get the AWC latitude slice accordingly
+            # a missing time dimension, then get the AWC tile accordingly
             awc_dims = dataset_awc[self.var_name_awc].dimensions
             if awc_dims == ('time', 'lat', 'lon'):
-                awc_lat_slice = dataset_awc[self.var_name_awc][lat_index, :, 0].flatten()
+                awcs = dataset_awc[self.var_name_awc][0, tile[0], tile[1]].flatten()
             elif awc_dims == ('lat', 'lon'):
-                awc_lat_slice = dataset_awc[self.var_name_awc][lat_index, :].flatten()
+                awcs = dataset_awc[self.var_name_awc][tile[0], tile[1]].flatten()
             else:
                 message = 'Unable to read the available water capacity (AWC) values due to ' + \
                           'unsupported variable dimensions: {dims}'.format(dims=awc_dims)
                 _logger.error(message)
                 raise ValueError(message)
  
-        # allocate arrays to contain a latitude slice of Palmer values
-        pdsi_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-        phdi_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-        zindex_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-        scpdsi_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-        pmdi_lat_slice = np.full(lat_slice_precip.shape, np.NaN)
-        
-        # compute Palmer indices for each longitude from the latitude slice where we have valid inputs
-        for lon_index in range(self.lon_size):
-        
-            # get the time series values for this longitude
-            precip_time_series = lat_slice_precip[lon_index, :]
-            pet_time_series = lat_slice_pet[lon_index, :]
-            awc = awc_lat_slice[lon_index]
-        
-            # compute Palmer indices only if we have valid inputs
-            if utils.is_data_valid(precip_time_series) and \
-               utils.is_data_valid(pet_time_series) and \
-               awc is not np.ma.masked and \
-               not math.isnan(awc) and \
-               not math.isclose(awc, self.fill_value_awc):
-        
-                # put precipitation and PET into inches, if not already
-                if self.units_precip in _POSSIBLE_MM_UNITS:
-                    precip_time_series = precip_time_series * _MM_TO_INCHES_FACTOR
-                if self.units_pet in _POSSIBLE_MM_UNITS:
-                    pet_time_series = pet_time_series * _MM_TO_INCHES_FACTOR
-        
-                # compute Palmer indices
-                palmer_values = indices.scpdsi(precip_time_series,
-                                               pet_time_series,
-                                               awc,
-                                               self.data_start_year,
-                                               self.calibration_start_year,
-                                               self.calibration_end_year)
-        
-                # add the values into the slice, first clipping all values to the valid range
-                scpdsi_lat_slice[lon_index, :] = np.clip(palmer_values[0], _VALID_MIN, _VALID_MAX)
-                pdsi_lat_slice[lon_index, :] = np.clip(palmer_values[1], _VALID_MIN, _VALID_MAX)
-                phdi_lat_slice[lon_index, :] = np.clip(palmer_values[2], _VALID_MIN, _VALID_MAX)
-                pmdi_lat_slice[lon_index, :] = np.clip(palmer_values[3], _VALID_MIN, _VALID_MAX)
-                zindex_lat_slice[lon_index, :] = palmer_values[4]
-        
-        # open the existing PDSI NetCDF file for writing, copy the latitude slice 
-        # into the PET variable at the indexed latitude position
-        pdsi_lock.acquire()
-        pdsi_dataset = netCDF4.Dataset(self.netcdf_pdsi, mode='a')
-        pdsi_dataset['pdsi'][lat_index, :, :] = pdsi_lat_slice
-        pdsi_dataset.sync()
-        pdsi_dataset.close()
-        pdsi_lock.release()
-        
-        # open the existing PHDI NetCDF file for writing, copy the latitude slice
-        # into the PET variable at the indexed latitude position
-        phdi_lock.acquire()
-        phdi_dataset = netCDF4.Dataset(self.netcdf_phdi, mode='a')
-        phdi_dataset['phdi'][lat_index, :, :] = phdi_lat_slice
-        phdi_dataset.sync()
-        phdi_dataset.close()
-        phdi_lock.release()
+        # we'll work with missing values as NaNs, including AWC values equal to the AWC variable's fill value
+        precips = utils.nan_filled(precips)
+        pets = utils.nan_filled(pets)
+        awcs = utils.nan_filled(awcs, np.float64)
+        awcs[np.isclose(awcs, self.fill_value_awc)] = np.NaN
+
+        # put precipitation and PET into inches, if not already
+        if self.units_precip in _POSSIBLE_MM_UNITS:
+            precips = precips * _MM_TO_INCHES_FACTOR
+        if self.units_pet in _POSSIBLE_MM_UNITS:
+            pets = pets * _MM_TO_INCHES_FACTOR
+
+        # compute Palmer indices for all grid cells of the tile at once, 
+        # with missing values for the grid cells without valid inputs
+        tile_scpdsi, tile_pdsi, tile_phdi, tile_pmdi, tile_zindex = indices.scpdsi_grid(precips,
+                                                                                        pets,
+                                                                                        awcs,
+                                                                                        self.data_start_year,
+                                                                                        self.calibration_start_year,
+                                                                                        self.calibration_end_year)
+
+        # clip all values other than Z-Index to the valid range
+        tile_scpdsi = np.clip(tile_scpdsi, _VALID_MIN, _VALID_MAX)
+        tile_pdsi = np.clip(tile_pdsi, _VALID_MIN, _VALID_MAX)
+        tile_phdi = np.clip(tile_phdi, _VALID_MIN, _VALID_MAX)
+        tile_pmdi = np.clip(tile_pmdi, _VALID_MIN, _VALID_MAX)
         
-        # open the existing Z-Index NetCDF file for writing, copy the latitude slice
-        # into the Z-Index variable at the indexed latitude position
-        zindex_lock.acquire()
-        zindex_dataset = netCDF4.Dataset(self.netcdf_zindex, mode='a')
-        zindex_dataset['zindex'][lat_index, :, :] = zindex_lat_slice
-        zindex_dataset.sync()
-        zindex_dataset.close()
-        zindex_lock.release()
-        
-        # open the existing SCPDSI NetCDF file for writing, copy the latitude slice
-        # into the scPDSI variable at the indexed latitude position
-        scpdsi_lock.acquire()
-        scpdsi_dataset = netCDF4.Dataset(self.netcdf_scpdsi, mode='a')
-        scpdsi_dataset['scpdsi'][lat_index, :, :] = scpdsi_lat_slice
-        scpdsi_dataset.sync()
-        scpdsi_dataset.close()
-        scpdsi_lock.release()
-        
-        # open the existing PMDI NetCDF file for writing, copy the latitude slice
-        # into the PMDI variable at the indexed latitude position
-        pmdi_lock.acquire()
-        pmdi_dataset = netCDF4.Dataset(self.netcdf_pmdi, mode='a')
-        pmdi_dataset['pmdi'][lat_index, :, :] = pmdi_lat_slice
-        pmdi_dataset.sync()
-        pmdi_dataset.close()
-        pmdi_lock.release()
+        # send the tiles to the writer process, to be copied into the Palmer variables at the tile's position
+        _write_tile(self.netcdf_pdsi, 'pdsi', tile, _cells_to_tile(tile_pdsi, tile))
+        _write_tile(self.netcdf_phdi, 'phdi', tile, _cells_to_tile(tile_phdi, tile))
+        _write_tile(self.netcdf_zindex, 'zindex', tile, _cells_to_tile(tile_zindex, tile))
+        _write_tile(self.netcdf_scpdsi, 'scpdsi', tile, _cells_to_tile(tile_scpdsi, tile))
+        _write_tile(self.netcdf_pmdi, 'pmdi', tile, _cells_to_tile(tile_pmdi, tile))
 
 #-----------------------------------------------------------------------------------------------------------------------
 def _validate_arguments(index,
@@ -804,7 +1104,10 @@ def _validate_arguments(index,
                         var_name_pet=None,
                         netcdf_awc=None,
                         var_name_awc=None,
-                        scales=None):
+                        scales=None,
+                        save_params=None,
+                        load_params=None,
+                        append=False):
     """
     Validate the processing settings to confirm that proper argument combinations have been provided.
     
@@ -1012,7 +1315,57 @@ def _validate_arguments(index,
             message = "One or more negative scale specified within --scales argument"
             _logger.error(message)
             raise ValueError(message)
+
+    # calibration parameters are stored for SPI, SPEI, and PNP only, and can either be saved or loaded but not both
+    if (save_params is not None) or (load_params is not None):
+
+        if index not in ['spi', 'spei', 'pnp', 'scaled']:
+            message = "Saving or loading calibration parameters is only supported for SPI, SPEI, and PNP"
+            _logger.error(message)
+            raise ValueError(message)
+
+        if (save_params is not None) and (load_params is not None):
+            message = "Both --save_params and --load_params were specified, only one of these should be provided"
+            _logger.error(message)
+            raise ValueError(message)
+
+        # make sure that we have a stored parameters file for each index, distribution, and scale
+        if load_params is not None:
+            index_names = []
+            if index in ['spi', 'scaled']:
+                index_names.extend(['spi_gamma', 'spi_pearson'])
+            if index in ['spei', 'scaled']:
+                index_names.extend(['spei_gamma', 'spei_pearson'])
+            if index in ['pnp', 'scaled']:
+                index_names.append('pnp')
+            for scale in scales:
+                for index_name in index_names:
+                    params_file = load_params + '_' + _scaled_variable_name(index_name, scale) + '_params.nc'
+                    if not os.path.isfile(params_file):
+                        message = "Missing fitting parameters file: '{file}'".format(file=params_file)
+                        _logger.error(message)
+                        raise ValueError(message)
     
+    # appending to existing outputs requires stored calibration parameters, since the calibration 
+    # period values are not read, and is only supported for monthly SPI, SPEI, and PNP
+    if append:
+        
+        if index not in ['spi', 'spei', 'pnp', 'scaled']:
+            message = "Appending to existing output files is only supported for SPI, SPEI, and PNP"
+            _logger.error(message)
+            raise ValueError(message)
+        
+        if periodicity != 'monthly':
+            message = "Appending to existing output files is only supported for monthly periodicity"
+            _logger.error(message)
+            raise ValueError(message)
+
+        if load_params is None:
+            message = "Appending to existing output files requires stored calibration parameters " + \
+                      "(missing --load_params argument)"
+            _logger.error(message)
+            raise ValueError(message)
+
 #-----------------------------------------------------------------------------------------------------------------------
 def process_grid(index,
                  periodicity,
@@ -1027,7 +1380,10 @@ def process_grid(index,
                  var_name_pet=None,
                  netcdf_awc=None,
                  var_name_awc=None,
-                 scales=None):
+                 scales=None,
+                 save_params=None,
+                 load_params=None,
+                 append=False):
     
     # validate the arguments
     _validate_arguments(index,
@@ -1040,7 +1396,10 @@ def process_grid(index,
                         var_name_pet,
                         netcdf_awc,
                         var_name_awc,
-                        scales)
+                        scales,
+                        save_params,
+                        load_params,
+                        append)
                 
     # instantiate and run a grid processor object
     grid_processor = GridProcessor(index,
@@ -1056,7 +1415,10 @@ def process_grid(index,
                                    var_name_pet,
                                    netcdf_awc,
                                    var_name_awc,
-                                   scales)
+                                   scales,
+                                   save_params,
+                                   load_params,
+                                   append)
     grid_processor.run()
         
 #-----------------------------------------------------------------------------------------------------------------------
@@ -1110,6 +1472,17 @@ if __name__ == '__main__':
                             help="Timestep scales over which the PNP, SPI, and SPEI values are to be computed",
                             type=int,
                             nargs = '*')
+        parser.add_argument("--save_params",
+                            help="Base output file path and name for NetCDF files in which the SPI, SPEI, and PNP " + \
+                                 "calibration parameters computed from the calibration period will be stored")
+        parser.add_argument("--load_params",
+                            help="Base file path and name of NetCDF files containing SPI, SPEI, and PNP calibration " + \
+                                 "parameters stored by a previous run using --save_params, these will be used " + \
+                                 "in place of fitting the calibration period")
+        parser.add_argument("--append",
+                            help="Compute only the time steps of the input which are not yet present in existing " + \
+                                 "output files and append these to the output files, requires --load_params",
+                            action="store_true")
         args = parser.parse_args()
 
         
@@ -1132,7 +1505,10 @@ if __name__ == '__main__':
                      args.var_name_pet,
                      args.netcdf_awc,
                      args.var_name_awc,
-                     args.scales)
+                     args.scales,
+                     args.save_params,
+                     args.load_params,
+                     args.append)
         
         # report on the elapsed time
         end_datetime = datetime.now()
@@ -1642,6 +1642,12 @@ class FixturesTestCase(unittest.TestCase):
          [ 142.169921875, 55.7197265625, 45.1103515625, 33.8095703125, 99.6796875, 164.169921875, 96.6796875, 194.830078125, 141.259765625, 121.040039063, 11.3203125, 32.41015625], \
          [ 34.8896484375, 29.4599609375, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN, np.NaN ]])
 
+    # grid of three cells as time series with shape (cells, time), two containing the monthly 
+    # precipitation observations and one with all missing values, used for testing the gridded indices
+    fixture_precips_mm_monthly_grid = np.array([fixture_precips_mm_monthly.flatten(),
+                                                np.full(fixture_precips_mm_monthly.size, np.NaN),
+                                                fixture_precips_mm_monthly.flatten()])
+
     # PNP values calculated at 6-month scale corresponding to the monthly precipitation array
     fixture_pnp_6month = np.array(
         [ np.NaN,  np.NaN,  np.NaN,  np.NaN,  np.NaN,  1.199,  1.171,  1.071,  1.038,  0.978,  0.910,  0.941,  \
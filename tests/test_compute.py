@@ -1,6 +1,8 @@
 import logging
 import math
 import numpy as np
+import scipy.special
+import scipy.stats
 import unittest
 
 from tests import fixtures
@@ -88,31 +90,143 @@ class ComputeTestCase(fixtures.FixturesTestCase):
         np.testing.assert_raises(ValueError, compute._estimate_pearson3_parameters, [1.0, -1.0, 1.0])
         np.testing.assert_raises(ValueError, compute._estimate_pearson3_parameters, [1.0, -1.0, 1e-7])
         
+    #----------------------------------------------------------------------------------------
+    def test_gamma_parameters(self):
+        """
+        Test for the compute.gamma_parameters() function
+        """
+
+        # compute the fitting parameters from the calibration period
+        probabilities_of_zero, alphas, betas = compute.gamma_parameters(self.fixture_precips_mm_monthly,
+                                                                        self.fixture_data_year_start_monthly,
+                                                                        self.fixture_data_year_start_monthly,
+                                                                        self.fixture_data_year_end_monthly,
+                                                                        'monthly')
+        self.assertEqual(alphas.shape, (12,))
+        self.assertEqual(betas.shape, (12,))
+        self.assertEqual(probabilities_of_zero.shape, (12,))
+
+        # confirm that transforming with the stored parameters gives the same result as fitting the values
+        fitting_params = {'probabilities_of_zero': probabilities_of_zero, 
+                          'alphas': alphas, 
+                          'betas': betas}
+        computed_values = compute.transform_fitted_gamma(self.fixture_precips_mm_monthly.copy(),
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_data_year_end_monthly,
+                                                         'monthly',
+                                                         fitting_params)
+        np.testing.assert_allclose(computed_values, 
+                                   self.fixture_transformed_gamma_monthly,
+                                   err_msg='Transformed gamma values using stored parameters not computed as expected')
+
+        # confirm that the parameters for a 3-D array are computed for each cell
+        values = np.stack([self.fixture_precips_mm_monthly, self.fixture_precips_mm_monthly], axis=-1)
+        cells_params = compute.gamma_parameters(values,
+                                                self.fixture_data_year_start_monthly,
+                                                self.fixture_data_year_start_monthly,
+                                                self.fixture_data_year_end_monthly,
+                                                'monthly')
+        for cell_params, params in zip(cells_params, (probabilities_of_zero, alphas, betas)):
+            self.assertEqual(cell_params.shape, (12, 2))
+            np.testing.assert_allclose(cell_params[:, 1], params)
+
+    #----------------------------------------------------------------------------------------
+    def test_pearson_parameters(self):
+        """
+        Test for the compute.pearson_parameters() function
+        """
+
+        # compute the fitting parameters from the calibration period
+        params = compute.pearson_parameters(self.fixture_precips_mm_monthly,
+                                            self.fixture_data_year_start_monthly,
+                                            self.fixture_calibration_year_start_monthly,
+                                            self.fixture_calibration_year_end_monthly,
+                                            'monthly')
+        for param in params:
+            self.assertEqual(param.shape, (12,))
+
+        # confirm that transforming with the stored parameters gives the same result as fitting the values
+        fitting_params = dict(zip(('probabilities_of_zero', 'locs', 'scales', 'skews'), params))
+        computed_values = compute.transform_fitted_pearson(self.fixture_precips_mm_monthly, 
+                                                           self.fixture_data_year_start_monthly,
+                                                           self.fixture_calibration_year_start_monthly,
+                                                           self.fixture_calibration_year_end_monthly,
+                                                           'monthly',
+                                                           fitting_params)
+        np.testing.assert_allclose(computed_values, 
+                                   self.fixture_transformed_pearson3,
+                                   atol=0.001,
+                                   err_msg='Transformed Pearson Type III values using stored parameters ' + \
+                                           'not computed as expected')
+
     #----------------------------------------------------------------------------------------
     def test_pearson3cdf(self):
         """
         Test for the compute._pearson3cdf() function
         """
 
-        self.assertTrue(math.isnan(compute._pearson3cdf(5.0, [1.0, -1.0, 0.0])), 
+        self.assertTrue(math.isnan(compute._pearson3cdf(5.0, 1.0, -1.0, 0.0)), 
                         msg='Failed to accurately compute Pearson Type III CDF')
 
-        self.assertEqual(compute._pearson3cdf(5.0, [1.0, 1.0, 1e-7]), 
+        self.assertEqual(compute._pearson3cdf(5.0, 1.0, 1.0, 1e-7), 
                          0.9999841643790834, 
                          msg='Failed to accurately compute Pearson Type III CDF')
          
-        self.assertEqual(compute._pearson3cdf(7.7, [1.0, 501.0, 0.0]), 
+        self.assertEqual(compute._pearson3cdf(7.7, 1.0, 501.0, 0.0), 
                          0.752667498611228, 
                          msg='Failed to accurately compute Pearson Type III CDF')
          
-        self.assertEqual(compute._pearson3cdf(7.7, [1.0, 501.0, -10.0]), 
-                         0.10519432662999628, 
-                         msg='Failed to accurately compute Pearson Type III CDF')
+        self.assertAlmostEqual(compute._pearson3cdf(7.7, 1.0, 501.0, -10.0), 
+                               0.10519432662999628, 
+                               msg='Failed to accurately compute Pearson Type III CDF')
          
-        self.assertEqual(compute._pearson3cdf(1e-6, [441.0, 501.0, 30.0]), 
+        self.assertEqual(compute._pearson3cdf(1e-6, 441.0, 501.0, 30.0), 
                          0.0005,  # value corresponding to trace value
                          msg='Failed to accurately compute Pearson Type III CDF')
 
+    #----------------------------------------------------------------------------------------
+    def test_incomplete_gamma(self):
+        """
+        Test for the compute._incomplete_gamma() function
+        """
+
+        self.assertEqual(compute._incomplete_gamma(2.0, 0.0), 
+                         0.0, 
+                         msg='Failed to accurately compute incomplete gamma function')
+
+        # compare against SciPy across the series, continued fraction and asymptotic regions
+        for a, x in [(0.5, 0.2), (2.0, 1.5), (2.0, 7.0), (40.0, 38.0), (150.0, 170.0), (2e4, 2.01e4), (1e6, 9.99e5)]:
+            np.testing.assert_allclose(compute._incomplete_gamma(a, x), 
+                                       scipy.special.gammainc(a, x), 
+                                       rtol=1e-10,
+                                       err_msg='Failed to accurately compute incomplete gamma function')
+
+    #----------------------------------------------------------------------------------------
+    def test_normal_ppf(self):
+        """
+        Test for the compute._normal_ppf() function
+        """
+
+        self.assertTrue(math.isnan(compute._normal_ppf(np.NaN)), 
+                        msg='Failed to accurately compute normal quantile function')
+        self.assertTrue(math.isnan(compute._normal_ppf(1.5)), 
+                        msg='Failed to accurately compute normal quantile function')
+        self.assertEqual(compute._normal_ppf(0.0), 
+                         -np.inf, 
+                         msg='Failed to accurately compute normal quantile function')
+        self.assertEqual(compute._normal_ppf(1.0), 
+                         np.inf, 
+                         msg='Failed to accurately compute normal quantile function')
+
+        # compare against SciPy in both tails and the central region
+        for probability in [1e-12, 0.0005, 0.02, 0.3, 0.5, 0.7, 0.98, 0.9995]:
+            np.testing.assert_allclose(compute._normal_ppf(probability), 
+                                       scipy.stats.norm.ppf(probability), 
+                                       rtol=1e-9,
+                                       atol=1e-12,
+                                       err_msg='Failed to accurately compute normal quantile function')
+
     #----------------------------------------------------------------------------------------
     def test_pearson_fit_ufunc(self):
         """
@@ -125,9 +239,9 @@ class ComputeTestCase(fixtures.FixturesTestCase):
         self.assertTrue(math.isnan(compute._pearson_fit_ufunc(5.0, 1.0, -1.0, 0.0, 0.0)), 
                         msg='Failed to accurately compute error function')
 
-        self.assertEqual(compute._pearson_fit_ufunc(7.7, 1.0, 501.0, 0.0, 0.07), 
-                         0.7387835329883602, 
-                         msg='Failed to accurately compute error function')
+        self.assertAlmostEqual(compute._pearson_fit_ufunc(7.7, 1.0, 501.0, 0.0, 0.07), 
+                               0.7387835329883602, 
+                               msg='Failed to accurately compute error function')
 
     #----------------------------------------------------------------------------------------
     def test_pearson3_fitting_values(self):
@@ -176,6 +290,17 @@ class ComputeTestCase(fixtures.FixturesTestCase):
                                    equal_nan=True, 
                                    err_msg='Failed to accurately compute Pearson Type III fitting values')
 
+        # a 3-D array of values with shape (years, 12, cells) should give the same 
+        # fitting values for each cell as computed for the cell's 2-D array of values
+        precips_3d = np.stack([self.fixture_precips_mm_monthly, precips_mm], axis=-1)
+        computed_values = compute._pearson3_fitting_values(precips_3d)
+        for cell_index in range(precips_3d.shape[2]):
+            np.testing.assert_allclose(computed_values[:, :, cell_index], 
+                                       compute._pearson3_fitting_values(precips_3d[:, :, cell_index]), 
+                                       atol=1e-8, 
+                                       err_msg='Failed to accurately compute Pearson Type III fitting values ' + \
+                                               'for a 3-D array of values')
+
     #----------------------------------------------------------------------------------------
     def test_sum_to_scale(self):
         '''
@@ -202,10 +327,58 @@ class ComputeTestCase(fixtures.FixturesTestCase):
         values = np.array([3, 4, 6, 2, 1, 3, 5, np.NaN, 8, 5, 6])
         computed_values = compute.sum_to_scale(values, 3)
         expected_values = np.array([np.NaN, np.NaN, 13, 12, 9, 6, 9, np.NaN, np.NaN, np.NaN, 19])
-        np.testing.assert_allclose(computed_values, 
-                                   expected_values, 
-                                   err_msg='Sliding sums not computed as expected when missing values appended to end of input array')            
-    
+        np.testing.assert_allclose(computed_values,
+                                   expected_values,
+                                   err_msg='Sliding sums not computed as expected when missing values appended to end of input array')
+
+        # test a 2-D input array, with sums computed along the final (time) axis of each row
+        values = np.array([[3, 4, 6, 2, 1, 3, 5, 8, 5, 6, 2],
+                           [3, 4, 6, 2, 1, 3, 5, np.NaN, 8, 5, 6]])
+        computed_values = compute.sum_to_scale(values, 3)
+        expected_values = np.array([[np.NaN, np.NaN, 13, 12, 9, 6, 9, 16, 18, 19, 13],
+                                    [np.NaN, np.NaN, 13, 12, 9, 6, 9, np.NaN, np.NaN, np.NaN, 19]])
+        np.testing.assert_allclose(computed_values,
+                                   expected_values,
+                                   err_msg='Sliding sums not computed as expected for a 2-D input array')
+
+    #----------------------------------------------------------------------------------------
+    def test_sum_to_scales(self):
+        '''
+        Test for the compute.sum_to_scales() function
+        '''
+
+        # sums for several scales should match the sums of each group of values, stacked along a leading 
+        # scales axis, including a scale longer than the time series
+        values = np.array([[3, 4, 6, 2, 1, 3, 5, 8, 5, 6, 2],
+                           [3, 4, 6, 2, 1, 3, 5, np.NaN, 8, 5, 6],
+                           [0, 0, 0, 0.1, 0.2, 0, 0, 0, 0, 0.3, 0]])
+        scales = [1, 2, 3, 6, 12]
+        computed_sums = compute.sum_to_scales(values, scales)
+        self.assertEqual(computed_sums.shape, (len(scales),) + values.shape)
+        for scale, computed_values in zip(scales, computed_sums):
+            expected_values = np.full(values.shape, np.NaN)
+            for i in range(scale - 1, values.shape[1]):
+                expected_values[:, i] = np.sum(values[:, i - scale + 1:i + 1], axis=1)
+            np.testing.assert_allclose(computed_values,
+                                       expected_values,
+                                       atol=1e-12,
+                                       err_msg='Sliding sums not computed as expected for scale {0}'.format(scale))
+
+        # a 3-D array should give the same sums as each of its 2-D slices
+        computed_sums = compute.sum_to_scales(np.array([values, values[::-1]]), scales)
+        np.testing.assert_array_equal(computed_sums[:, 1], 
+                                      compute.sum_to_scales(values[::-1], scales),
+                                      err_msg='Sliding sums not computed as expected for a 3-D input array')
+
+        # a scale less than one should raise a ValueError
+        np.testing.assert_raises(ValueError, compute.sum_to_scales, values, [3, 0])
+
+        # sums of only zero values should be exactly zero, without a floating point remainder
+        computed_values = compute.sum_to_scales(values[2], [3])[0]
+        np.testing.assert_array_equal(computed_values[[2, 7, 8]], 
+                                      [0.0, 0.0, 0.0],
+                                      err_msg='Sliding sums of zeros not computed as exactly zero')
+
     #----------------------------------------------------------------------------------------
     def test_transform_fitted_gamma(self):
         '''
@@ -277,6 +450,20 @@ class ComputeTestCase(fixtures.FixturesTestCase):
                           self.fixture_calibration_year_end_daily,
                           'monthly')
 
+        # confirm that zero values are transformed to NaNs without modifying the input array
+        values = self.fixture_precips_mm_monthly.copy()
+        values[0:2, 0:3] = 0.0
+        original_values = values.copy()
+        computed_values = compute.transform_fitted_gamma(values, 
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_data_year_end_monthly,
+                                                         'monthly')
+        self.assertTrue(np.all(np.isnan(computed_values[0:2, 0:3])), 'Zero values not transformed to NaNs')
+        np.testing.assert_array_equal(values, 
+                                      original_values,
+                                      err_msg='Input values modified by the gamma transform')
+
     #----------------------------------------------------------------------------------------
     def test_transform_fitted_pearson(self):
         '''
@@ -3,7 +3,7 @@ import numpy as np
 import unittest
 
 from tests import fixtures
-from climate_indices import indices
+from climate_indices import compute, indices
 
 #-----------------------------------------------------------------------------------------------------------------------
 # disable logging messages
@@ -124,6 +124,31 @@ class IndicesTestCase(fixtures.FixturesTestCase):
                                      self.fixture_calibration_year_end_daily, 
                                      'daily')
                 
+        # compute the normal averages for the calibration period
+        averages = indices.percentage_of_normal_averages(self.fixture_precips_mm_monthly.flatten(),
+                                                         6, 
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_calibration_year_start_monthly, 
+                                                         self.fixture_calibration_year_end_monthly, 
+                                                         'monthly')
+        self.assertEqual(averages.shape, (12,))
+
+        # confirm that PNP for the final years computed from the stored averages matches the full computation,
+        # using only the values of the final years plus the preceding months required for the scaled sums
+        values = self.fixture_precips_mm_monthly.flatten()[-120:]
+        computed_pnp = indices.percentage_of_normal(values,
+                                                    6, 
+                                                    self.fixture_data_year_end_monthly - 9,
+                                                    self.fixture_calibration_year_start_monthly, 
+                                                    self.fixture_calibration_year_end_monthly, 
+                                                    'monthly',
+                                                    averages)
+        np.testing.assert_allclose(computed_pnp[5:],
+                                   self.fixture_pnp_6month[-115:],
+                                   atol=0.001,
+                                   equal_nan=True,
+                                   err_msg='PNP values from stored averages not computed as expected')
+                
         # invalid periodicity argument should raise an AttributeError
         np.testing.assert_raises(ValueError, 
                                  indices.percentage_of_normal,
@@ -134,6 +159,47 @@ class IndicesTestCase(fixtures.FixturesTestCase):
                                  self.fixture_calibration_year_end_daily, 
                                  'unsupported_value')
 
+    #----------------------------------------------------------------------------------------
+    def test_pnp_grid(self):
+
+        precips_grid = self.fixture_precips_mm_monthly_grid
+
+        # compute PNP at 6-month scale for all cells at once
+        computed_pnp = indices.percentage_of_normal_grid(precips_grid,
+                                                         6, 
+                                                         self.fixture_data_year_start_monthly,
+                                                         self.fixture_calibration_year_start_monthly, 
+                                                         self.fixture_calibration_year_end_monthly, 
+                                                         'monthly')
+
+        # confirm PNP is being computed as expected for each cell
+        self.assertEqual(computed_pnp.shape, precips_grid.shape)
+        for cell_index in [0, 2]:
+            np.testing.assert_allclose(computed_pnp[cell_index],
+                                       self.fixture_pnp_6month,
+                                       atol=0.001,
+                                       equal_nan=True,
+                                       err_msg='PNP values for a grid cell not computed as expected')
+        self.assertTrue(np.all(np.isnan(computed_pnp[1])), 'All-NaN cell does not result in all-NaN PNP')
+
+        # confirm that PNP computed from the stored averages of all cells matches the full computation
+        averages = indices.percentage_of_normal_grid_averages(precips_grid,
+                                                              6, 
+                                                              self.fixture_data_year_start_monthly,
+                                                              self.fixture_calibration_year_start_monthly, 
+                                                              self.fixture_calibration_year_end_monthly, 
+                                                              'monthly')
+        self.assertEqual(averages.shape, (3, 12))
+        np.testing.assert_array_equal(indices.percentage_of_normal_grid(precips_grid,
+                                                                        6, 
+                                                                        self.fixture_data_year_start_monthly,
+                                                                        self.fixture_calibration_year_start_monthly, 
+                                                                        self.fixture_calibration_year_end_monthly, 
+                                                                        'monthly',
+                                                                        averages),
+                                      computed_pnp,
+                                      err_msg='PNP values from stored averages not computed as expected')
+
     #----------------------------------------------------------------------------------------
     def test_spi(self):
         
@@ -232,6 +298,280 @@ class IndicesTestCase(fixtures.FixturesTestCase):
                                  self.fixture_calibration_year_end_monthly,
                                  'unsupported_value')
         
+    #----------------------------------------------------------------------------------------
+    def test_spi_grid(self):
+
+        precips_grid = self.fixture_precips_mm_monthly_grid
+
+        # compute SPI/gamma at 6-month scale for all cells at once
+        computed_spi = indices.spi_grid(precips_grid,
+                                        6,
+                                        indices.Distribution.gamma,
+                                        self.fixture_data_year_start_monthly,
+                                        self.fixture_data_year_start_monthly,
+                                        self.fixture_data_year_end_monthly,
+                                        'monthly')
+
+        # confirm SPI/gamma is being computed as expected for each cell
+        self.assertEqual(computed_spi.shape, precips_grid.shape)
+        for cell_index in [0, 2]:
+            np.testing.assert_allclose(computed_spi[cell_index],
+                                       self.fixture_spi_6_month_gamma,
+                                       atol=0.001,
+                                       err_msg='SPI/Gamma values for a grid cell not computed as expected')
+        self.assertTrue(np.all(np.isnan(computed_spi[1])), 'All-NaN cell does not result in all-NaN SPI')
+
+        # compute SPI/Pearson at 6-month scale for all cells at once
+        computed_spi = indices.spi_grid(precips_grid,
+                                        6,
+                                        indices.Distribution.pearson_type3,
+                                        self.fixture_data_year_start_monthly,
+                                        self.fixture_calibration_year_start_monthly,
+                                        self.fixture_calibration_year_end_monthly,
+                                        'monthly')
+
+        # confirm SPI/Pearson is being computed as expected for each cell
+        for cell_index in [0, 2]:
+            np.testing.assert_allclose(computed_spi[cell_index],
+                                       self.fixture_spi_6_month_pearson3,
+                                       atol=0.01,
+                                       err_msg='SPI/Pearson values for a grid cell not computed as expected')
+        self.assertTrue(np.all(np.isnan(computed_spi[1])), 'All-NaN cell does not result in all-NaN SPI')
+
+        # invalid periodicity argument should raise a ValueError
+        np.testing.assert_raises(ValueError,
+                                 indices.spi_grid,
+                                 precips_grid,
+                                 6,
+                                 indices.Distribution.gamma,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_end_monthly,
+                                 'unsupported_value')
+
+        # input array argument that's not 2-D should raise a ValueError
+        np.testing.assert_raises(ValueError,
+                                 indices.spi_grid,
+                                 self.fixture_precips_mm_monthly.flatten(),
+                                 6,
+                                 indices.Distribution.gamma,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_end_monthly,
+                                 'monthly')
+
+    #----------------------------------------------------------------------------------------
+    def test_spi_grid_float32(self):
+
+        precips_grid = self.fixture_precips_mm_monthly_grid
+
+        for distribution in [indices.Distribution.gamma, indices.Distribution.pearson_type3]:
+
+            # compute SPI for 64-bit and 32-bit float precipitation values
+            computed_spis = [indices.spi_grid(precips_grid.astype(dtype),
+                                              6,
+                                              distribution,
+                                              self.fixture_data_year_start_monthly,
+                                              self.fixture_calibration_year_start_monthly,
+                                              self.fixture_calibration_year_end_monthly,
+                                              'monthly')
+                             for dtype in [np.float64, np.float32]]
+
+            # confirm that 32-bit floats are preserved and that the SPI values match within 32-bit precision
+            self.assertEqual(computed_spis[1].dtype, np.float32)
+            np.testing.assert_allclose(computed_spis[1],
+                                       computed_spis[0],
+                                       atol=1e-5,
+                                       err_msg='SPI values for 32-bit float precipitation not computed as expected')
+
+    #----------------------------------------------------------------------------------------
+    def test_spi_grid_fitting_params(self):
+
+        precips_grid = self.fixture_precips_mm_monthly_grid
+
+        for distribution, names, calibration_years, expected_spi, tolerance in \
+                [(indices.Distribution.gamma, 
+                  ['alphas', 'betas', 'probabilities_of_zero'], 
+                  (self.fixture_data_year_start_monthly, self.fixture_data_year_end_monthly),
+                  self.fixture_spi_6_month_gamma,
+                  0.001),
+                 (indices.Distribution.pearson_type3, 
+                  ['locs', 'probabilities_of_zero', 'scales', 'skews'], 
+                  (self.fixture_calibration_year_start_monthly, self.fixture_calibration_year_end_monthly),
+                  self.fixture_spi_6_month_pearson3,
+                  0.01)]:
+
+            # compute the fitting parameters for all cells at once
+            fitting_params = indices.spi_grid_fitting_params(precips_grid,
+                                                             6,
+                                                             distribution,
+                                                             self.fixture_data_year_start_monthly,
+                                                             calibration_years[0],
+                                                             calibration_years[1],
+                                                             'monthly')
+            self.assertEqual(sorted(fitting_params.keys()), names)
+            for params in fitting_params.values():
+                self.assertEqual(params.shape, (3, 12))
+
+            # confirm that SPI computed from the stored parameters matches the expected values
+            computed_spi = indices.spi_grid(precips_grid,
+                                            6,
+                                            distribution,
+                                            self.fixture_data_year_start_monthly,
+                                            calibration_years[0],
+                                            calibration_years[1],
+                                            'monthly',
+                                            fitting_params)
+            for cell_index in [0, 2]:
+                np.testing.assert_allclose(computed_spi[cell_index],
+                                           expected_spi,
+                                           atol=tolerance,
+                                           err_msg='SPI values from stored fitting parameters not computed as expected')
+            self.assertTrue(np.all(np.isnan(computed_spi[1])), 'All-NaN cell does not result in all-NaN SPI')
+
+    #----------------------------------------------------------------------------------------
+    def test_spi_grid_distributions(self):
+
+        precips_grid = self.fixture_precips_mm_monthly_grid
+
+        # compute SPI/gamma and SPI/Pearson at 6-month scale for all cells at once
+        distributions = [indices.Distribution.gamma, indices.Distribution.pearson_type3]
+        computed_spis = indices.spi_grid_distributions(precips_grid,
+                                                       6,
+                                                       distributions,
+                                                       self.fixture_data_year_start_monthly,
+                                                       self.fixture_calibration_year_start_monthly,
+                                                       self.fixture_calibration_year_end_monthly,
+                                                       'monthly')
+
+        # confirm that each distribution's values match those computed for the distribution alone
+        self.assertEqual(len(computed_spis), 2)
+        for distribution, computed_spi in zip(distributions, computed_spis):
+            np.testing.assert_equal(computed_spi,
+                                    indices.spi_grid(precips_grid,
+                                                     6,
+                                                     distribution,
+                                                     self.fixture_data_year_start_monthly,
+                                                     self.fixture_calibration_year_start_monthly,
+                                                     self.fixture_calibration_year_end_monthly,
+                                                     'monthly'),
+                                    'SPI values for multiple distributions not computed as expected')
+
+        # unsupported distribution argument should raise a ValueError
+        np.testing.assert_raises(ValueError,
+                                 indices.spi_grid_distributions,
+                                 precips_grid,
+                                 6,
+                                 [indices.Distribution.gamma, 'unsupported_value'],
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_calibration_year_start_monthly,
+                                 self.fixture_calibration_year_end_monthly,
+                                 'monthly')
+
+    #----------------------------------------------------------------------------------------
+    def test_spei_distributions(self):
+        
+        # compute SPEI/gamma and SPEI/Pearson at 6-month scale
+        computed_spei_gamma, computed_spei_pearson = \
+            indices.spei_distributions(6,
+                                       [indices.Distribution.gamma, indices.Distribution.pearson_type3],
+                                       'monthly', 
+                                       data_start_year=self.fixture_data_year_start_monthly,
+                                       calibration_year_initial=self.fixture_data_year_start_monthly,
+                                       calibration_year_final=self.fixture_data_year_end_monthly,
+                                       precips_mm=self.fixture_precips_mm_monthly, 
+                                       temps_celsius=self.fixture_temps_celsius, 
+                                       latitude_degrees=self.fixture_latitude_degrees)
+
+        # confirm SPEI/gamma and SPEI/Pearson are being computed as expected
+        np.testing.assert_allclose(computed_spei_gamma, 
+                                   self.fixture_spei_6_month_gamma, 
+                                   atol=0.01,
+                                   err_msg='SPEI/Gamma values for 6-month scale not computed as expected')
+        np.testing.assert_allclose(computed_spei_pearson, 
+                                   self.fixture_spei_6_month_pearson3, 
+                                   atol=0.01,
+                                   err_msg='SPEI/Pearson values for 6-month scale not computed as expected')
+
+    #----------------------------------------------------------------------------------------
+    def test_spei_grid(self):
+        
+        # PET for the fixture temperatures, as a grid of the fixture location, a location 
+        # with missing PET, and a location with missing precipitation
+        pet_mm = indices.pet(self.fixture_temps_celsius, 
+                             self.fixture_latitude_degrees, 
+                             self.fixture_data_year_start_monthly)
+        precips = np.vstack((self.fixture_precips_mm_monthly.flatten(),
+                             self.fixture_precips_mm_monthly.flatten(),
+                             np.full(pet_mm.size, np.NaN)))
+        pets = np.vstack((pet_mm, np.full(pet_mm.size, np.NaN), pet_mm))
+        
+        # compute SPEI/gamma and SPEI/Pearson at 6-month scale for all locations at once
+        computed_spei_gamma, computed_spei_pearson = \
+            indices.spei_grid_distributions(precips,
+                                            pets,
+                                            6,
+                                            [indices.Distribution.gamma, indices.Distribution.pearson_type3],
+                                            self.fixture_data_year_start_monthly,
+                                            self.fixture_data_year_start_monthly,
+                                            self.fixture_data_year_end_monthly,
+                                            'monthly')
+
+        # confirm SPEI/gamma and SPEI/Pearson are being computed as expected, with NaNs for the invalid locations
+        np.testing.assert_allclose(computed_spei_gamma[0], 
+                                   self.fixture_spei_6_month_gamma, 
+                                   atol=0.01,
+                                   err_msg='SPEI/Gamma values for 6-month scale not computed as expected')
+        np.testing.assert_allclose(computed_spei_pearson[0], 
+                                   self.fixture_spei_6_month_pearson3, 
+                                   atol=0.01,
+                                   err_msg='SPEI/Pearson values for 6-month scale not computed as expected')
+        self.assertTrue(np.all(np.isnan(computed_spei_gamma[1:])))
+        self.assertTrue(np.all(np.isnan(computed_spei_pearson[1:])))
+
+        # a single distribution gives the same values as computed per location
+        computed_spei = indices.spei_grid(precips, 
+                                          pets, 
+                                          6, 
+                                          indices.Distribution.gamma,
+                                          self.fixture_data_year_start_monthly,
+                                          self.fixture_data_year_start_monthly,
+                                          self.fixture_data_year_end_monthly,
+                                          'monthly')
+        expected_spei = indices.spei(6, 
+                                     indices.Distribution.gamma, 
+                                     'monthly', 
+                                     self.fixture_data_year_start_monthly,
+                                     self.fixture_data_year_start_monthly,
+                                     self.fixture_data_year_end_monthly,
+                                     self.fixture_precips_mm_monthly,
+                                     pet_mm=pet_mm)
+        np.testing.assert_allclose(computed_spei[0], expected_spei, rtol=1e-10, equal_nan=True)
+
+        # the same values result from fitting the (P - PET) differences after these have been summed to the scale
+        scaled_differences = compute.sum_to_scales(indices.spei_grid_differences(precips, pets), [6])[0]
+        computed_spei = indices.spi_grid(scaled_differences, 
+                                         1, 
+                                         indices.Distribution.gamma,
+                                         self.fixture_data_year_start_monthly,
+                                         self.fixture_data_year_start_monthly,
+                                         self.fixture_data_year_end_monthly,
+                                         'monthly')
+        np.testing.assert_allclose(computed_spei[0], expected_spei, rtol=1e-10, equal_nan=True)
+        self.assertTrue(np.all(np.isnan(computed_spei[1:])))
+
+        # the precipitation and PET arrays must have matching shapes
+        np.testing.assert_raises(ValueError, 
+                                 indices.spei_grid,
+                                 precips, 
+                                 pets[:, :-1], 
+                                 6, 
+                                 indices.Distribution.gamma,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_start_monthly,
+                                 self.fixture_data_year_end_monthly,
+                                 'monthly')
+
     #----------------------------------------------------------------------------------------
     def test_spei(self):
         
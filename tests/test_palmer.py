@@ -98,6 +98,46 @@ class PalmerTestCase(fixtures.FixturesTestCase):
                                    atol=0.01,
                                    err_msg='Not computing the Z-Index as expected')        
 
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def test_z_index_grid(self):
+        '''
+        Test for the palmer._z_index() function using arrays of many locations with shape (cells, months)
+        '''
+        
+        # use the AL-01 climate division inputs for two cells, with the second 
+        # having its precipitation scaled in order to give different Z-Index values
+        arrays = [np.vstack((values, values)) for values in [self.fixture_palmer_precip_AL01,
+                                                             self.fixture_palmer_pet_AL01,
+                                                             self.fixture_palmer_et_AL01,
+                                                             self.fixture_palmer_pr_AL01,
+                                                             self.fixture_palmer_r_AL01,
+                                                             self.fixture_palmer_ro_AL01,
+                                                             self.fixture_palmer_pro_AL01,
+                                                             self.fixture_palmer_l_AL01,
+                                                             self.fixture_palmer_pl_AL01]]
+        arrays[0][1] *= 1.2
+        
+        Z = palmer._z_index(*arrays,
+                            self.fixture_palmer_data_begin_year,
+                            self.fixture_palmer_calibration_begin_year,
+                            self.fixture_palmer_calibration_end_year)
+                    
+        # verify that each cell's values match those computed for the cell alone
+        self.assertEqual(Z.shape, arrays[0].shape)
+        for cell in range(2):
+            expected = palmer._z_index(*[values[cell] for values in arrays],
+                                       self.fixture_palmer_data_begin_year,
+                                       self.fixture_palmer_calibration_begin_year,
+                                       self.fixture_palmer_calibration_end_year)
+            np.testing.assert_allclose(Z[cell], 
+                                       expected, 
+                                       atol=1e-10,
+                                       err_msg='Not computing the Z-Index for many locations as expected')        
+        np.testing.assert_allclose(Z[0], 
+                                   self.fixture_palmer_zindex_AL01, 
+                                   atol=0.01,
+                                   err_msg='Not computing the Z-Index for many locations as expected')        
+
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def test_climatic_characteristic(self):
         '''
@@ -195,6 +235,43 @@ class PalmerTestCase(fixtures.FixturesTestCase):
                                    equal_nan=True, 
                                    err_msg='Z-Index not computed as expected from monthly inputs')
         
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def test_scpdsi_grid(self):
+        '''
+        Test for the palmer.scpdsi_grid() function
+        '''
+        
+        # three cells, the first with the monthly fixture inputs, the second with a larger 
+        # AWC, and the third with all missing precipitation and therefore no valid inputs
+        precips = np.tile(self.fixture_precips_mm_monthly.flatten(), (3, 1))
+        precips[2, :] = np.NaN
+        pets = np.tile(self.fixture_pet_mm.flatten(), (3, 1))
+        awcs = np.array([self.fixture_awc_inches, self.fixture_awc_inches + 2.0, self.fixture_awc_inches])
+        
+        grid_values = palmer.scpdsi_grid(precips,
+                                         pets,
+                                         awcs,
+                                         self.fixture_data_year_start_monthly, 
+                                         self.fixture_calibration_year_start_monthly, 
+                                         self.fixture_calibration_year_end_monthly)
+        
+        # verify that the valid cells match the values computed for each cell alone, and the invalid cell is missing
+        for cell in range(2):
+            cell_values = palmer.scpdsi(precips[cell],
+                                        pets[cell],
+                                        awcs[cell],
+                                        self.fixture_data_year_start_monthly, 
+                                        self.fixture_calibration_year_start_monthly, 
+                                        self.fixture_calibration_year_end_monthly)
+            for (actual, expected) in zip(grid_values, cell_values):
+                np.testing.assert_allclose(actual[cell], 
+                                           expected, 
+                                           atol=1e-10, 
+                                           equal_nan=True, 
+                                           err_msg='Palmer values not computed as expected for many locations')
+        for values in grid_values:
+            self.assertTrue(np.all(np.isnan(values[2])))
+        
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def test_cafec_coeff_ufunc(self):
         '''
@@ -244,13 +321,83 @@ class PalmerTestCase(fixtures.FixturesTestCase):
                                        err_msg='Not computing the {0} as expected'.format(name))        
 
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def test_phdi_select_ufunc(self):
+    def test_pdsi_from_zindex_grid(self):
         '''
-        Test for the palmer._phdi_select_ufunc() function
+        Test for the palmer._pdsi_from_zindex_grid() function
         '''
         
-        self.assertEqual(palmer._phdi_select_ufunc(0, 5), 5)
-        self.assertEqual(palmer._phdi_select_ufunc(8, 5), 8)
+        # two cells, the first with the monthly Z-Index fixture and the second with the fixture reversed
+        zindex = np.array([self.fixture_palmer_zindex_monthly, self.fixture_palmer_zindex_monthly[::-1]])
+        
+        grid_values = palmer._pdsi_from_zindex_grid(zindex)
+        
+        # verify that each cell matches the values computed for the cell alone
+        for cell in range(2):
+            cell_values = palmer._pdsi_from_zindex(zindex[cell])
+            for (actual, expected) in zip(grid_values, cell_values):
+                np.testing.assert_array_equal(actual[cell], 
+                                              expected, 
+                                              err_msg='PDSI values not computed as expected for many locations')
+        
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def test_z_sums(self):
+        '''
+        Test for the palmer._z_sums() function
+        '''
+        
+        month_scales = np.array([3, 6, 9, 12, 18, 24, 30, 36, 42, 48])
+        zindex = self.fixture_palmer_zindex_monthly
+        calibration_values = zindex[(self.fixture_calibration_year_start_monthly - self.fixture_data_year_start_monthly) * 12:
+                                    (self.fixture_calibration_year_end_monthly - self.fixture_data_year_start_monthly + 1) * 12]
+        
+        wet_sums = palmer._z_sums(month_scales,
+                                  'WET',
+                                  zindex,
+                                  12,
+                                  self.fixture_calibration_year_start_monthly, 
+                                  self.fixture_calibration_year_end_monthly,
+                                  self.fixture_data_year_start_monthly)
+        dry_sums = palmer._z_sums(month_scales,
+                                  'DRY',
+                                  zindex,
+                                  12,
+                                  self.fixture_calibration_year_start_monthly, 
+                                  self.fixture_calibration_year_end_monthly,
+                                  self.fixture_data_year_start_monthly)
+
+        # compare against the sums of each interval of consecutive values within the calibration period
+        for (i, scale_months) in enumerate(month_scales):
+            
+            summed_values = np.array([np.sum(calibration_values[j:j + scale_months]) 
+                                      for j in range(calibration_values.size - scale_months + 1)])
+            reasonable_limit = 1.25 * np.sort(summed_values)[int(summed_values.size * 0.98)]
+            
+            self.assertAlmostEqual(wet_sums[i], 
+                                   np.max(summed_values[summed_values < reasonable_limit]),
+                                   msg='Wet spell sum not computed as expected for scale {0}'.format(scale_months))
+            self.assertAlmostEqual(dry_sums[i], 
+                                   np.min(summed_values),
+                                   msg='Dry spell sum not computed as expected for scale {0}'.format(scale_months))
+        
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def test_pdsi_at_percentiles(self):
+        '''
+        Test for the palmer._pdsi_at_percentiles() function
+        '''
+        
+        pdsi = self.fixture_palmer_pdsi_monthly
+        pdsi_sorted = np.sort(pdsi)
+        expected = [pdsi_sorted[int(pdsi.size * 0.02)], pdsi_sorted[int(pdsi.size * 0.98)]]
+        
+        # a single location
+        np.testing.assert_array_equal(palmer._pdsi_at_percentiles(pdsi, (0.02, 0.98)), 
+                                      expected,
+                                      err_msg='PDSI percentiles not computed as expected')
+        
+        # two locations, the second with the PDSI values reversed
+        np.testing.assert_array_equal(palmer._pdsi_at_percentiles(np.array([pdsi, pdsi[::-1]]), (0.02, 0.98)), 
+                                      np.array([expected, expected]).T,
+                                      err_msg='PDSI percentiles not computed as expected for many locations')
         
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     def test_water_balance(self):
@@ -281,6 +428,28 @@ class PalmerTestCase(fixtures.FixturesTestCase):
                                        atol=0.01,
                                        err_msg='Not computing the {0} as expected'.format(name))        
 
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def test_water_balance_grid(self):
+        '''
+        Test for the palmer._water_balance_grid() function
+        '''
+        
+        # use the AL-01 climate division input data for three cells, each with a different AWC 
+        awcs = np.array([self.fixture_palmer_awc_AL01 + 1.0, 0.5, self.fixture_palmer_awc_AL01])
+        pets = np.tile(self.fixture_palmer_pet_AL01.flatten(), (3, 1))
+        precips = np.tile(self.fixture_palmer_precip_AL01.flatten(), (3, 1))
+        precips[2, 100:110] = np.NaN
+        
+        grid_values = palmer._water_balance_grid(awcs, pets, precips)
+        
+        # verify that each cell's values match those of the single location water balance accounting
+        for cell in range(awcs.size):
+            cell_values = palmer._water_balance(awcs[cell], pets[cell], precips[cell])
+            for (name, actual, expected) in zip(['ET', 'PR', 'R', 'RO', 'PRO', 'L', 'PL'], grid_values, cell_values):
+                np.testing.assert_array_equal(actual[cell], 
+                                              expected, 
+                                              err_msg='Not computing the {0} as expected'.format(name))        
+
 #-----------------------------------------------------------------------------------------------------------------------
 if __name__ == '__main__':
     unittest.main()
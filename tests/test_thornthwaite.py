@@ -1,4 +1,5 @@
 import logging
+import math
 import numpy as np
 import unittest
 
@@ -70,6 +71,76 @@ class ThornthwaiteTestCase(fixtures.FixturesTestCase):
                           np.NaN,
                           self.fixture_data_year_start_monthly)
 
+    #----------------------------------------------------------------------------------------
+    def test_potential_evapotranspiration_grid(self):
+        
+        # three cells, the first with the fixture temperatures and latitude, the second 
+        # at another latitude, and the third with all missing temperatures
+        temps = np.tile(self.fixture_temps_celsius.flatten(), (3, 1))
+        temps[2, :] = np.NaN
+        latitudes = np.array([self.fixture_latitude_degrees, -35.0, self.fixture_latitude_degrees])
+        computed_pet = thornthwaite.potential_evapotranspiration_grid(temps,
+                                                                      latitudes, 
+                                                                      self.fixture_data_year_start_monthly)
+        
+        # make sure PET is being computed as expected for each cell
+        np.testing.assert_allclose(computed_pet[0], 
+                                   self.fixture_pet_mm.flatten(),
+                                   atol=0.001,
+                                   equal_nan=True,
+                                   err_msg='PET values not computed as expected for many locations')
+        np.testing.assert_allclose(computed_pet[1], 
+                                   thornthwaite.potential_evapotranspiration(temps[1], 
+                                                                             -35.0, 
+                                                                             self.fixture_data_year_start_monthly),
+                                   atol=1e-10,
+                                   equal_nan=True,
+                                   err_msg='PET values not computed as expected for many locations')
+        self.assertTrue(np.all(np.isnan(computed_pet[2])))
+        
+        # make sure that mismatched temperature and latitude arrays raise an error
+        self.assertRaises(ValueError, 
+                          thornthwaite.potential_evapotranspiration_grid, 
+                          temps, 
+                          latitudes[0:2],
+                          self.fixture_data_year_start_monthly)
+
+    #----------------------------------------------------------------------------------------
+    def test_daylight_hours_table(self):
+        
+        # compute the expected mean daylight hours of each month from the daily values
+        latitude_radians = math.radians(self.fixture_latitude_degrees)
+        expected = np.zeros((2, 12))
+        for (leap, month_days) in enumerate([thornthwaite._MONTH_DAYS_NONLEAP, thornthwaite._MONTH_DAYS_LEAP]):
+            day_of_year = 1
+            for (month, days) in enumerate(month_days):
+                for _ in range(days):
+                    sunset_hour_angle = thornthwaite._sunset_hour_angle(latitude_radians, 
+                                                                        thornthwaite._solar_declination(day_of_year))
+                    expected[leap, month] += thornthwaite._daylight_hours(sunset_hour_angle) / days
+                    day_of_year += 1
+        
+        # make sure the table for a single latitude is computed as expected
+        np.testing.assert_allclose(thornthwaite.daylight_hours_table(self.fixture_latitude_degrees), 
+                                   expected,
+                                   atol=1e-10,
+                                   err_msg='Daylight hours not computed as expected')
+        
+        # make sure that an array of latitudes gives a table entry for each latitude
+        latitudes = np.array([[self.fixture_latitude_degrees, -10.0], [self.fixture_latitude_degrees, 60.0]])
+        table = thornthwaite.daylight_hours_table(latitudes)
+        self.assertEqual(table.shape, (2, 2, 2, 12))
+        np.testing.assert_allclose(table[1, 0], 
+                                   expected,
+                                   atol=1e-10,
+                                   err_msg='Daylight hours not computed as expected for many latitudes')
+        np.testing.assert_array_equal(table[0, 1], thornthwaite.daylight_hours_table(-10.0))
+        
+        # make sure that an invalid latitude value raises an error
+        self.assertRaises(ValueError, 
+                          thornthwaite.daylight_hours_table, 
+                          np.array([45.0, 91.0]))
+
 #-----------------------------------------------------------------------------------------------------------------------
 if __name__ == '__main__':
     
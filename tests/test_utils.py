@@ -68,6 +68,39 @@ class UtilsTestCase(unittest.TestCase):
         self.assertFalse(utils.is_data_valid(['bad', 'data']))
         self.assertTrue(utils.is_data_valid(np.ma.masked_array(valid_array)))
         
+    #----------------------------------------------------------------------------------------
+    def test_nan_filled(self):
+        """
+        Test for the utils.nan_filled() function
+        """
+        
+        # an array of floats without masked elements is used as-is, without a copy
+        values = np.arange(24.0).reshape((2, 12))
+        filled = utils.nan_filled(values)
+        self.assertTrue(filled is values)
+        filled = utils.nan_filled(np.ma.masked_array(values))
+        self.assertTrue(np.shares_memory(filled, values))
+        self.assertFalse(np.ma.isMaskedArray(filled))
+        
+        # 32-bit floats are kept, other types are converted to 64-bit floats unless a type is specified
+        self.assertEqual(utils.nan_filled(values.astype(np.float32)).dtype, np.float32)
+        self.assertEqual(utils.nan_filled(np.arange(12)).dtype, np.float64)
+        self.assertEqual(utils.nan_filled(values.astype(np.float32), np.float64).dtype, np.float64)
+        
+        # non-contiguous arrays are copied into a contiguous array
+        filled = utils.nan_filled(values.T)
+        self.assertTrue(filled.flags['C_CONTIGUOUS'])
+        np.testing.assert_equal(filled, values.T)
+        
+        # masked elements are NaNs in a copy, leaving the original masked array unchanged
+        masked_values = np.ma.masked_less(values, 5.0)
+        filled = utils.nan_filled(masked_values)
+        self.assertFalse(np.shares_memory(filled, values))
+        self.assertTrue(np.all(np.isnan(filled[0, :5])))
+        np.testing.assert_equal(filled[0, 5:], values[0, 5:])
+        np.testing.assert_equal(filled[1], values[1])
+        np.testing.assert_equal(np.ma.getdata(masked_values), values)
+        
     #----------------------------------------------------------------------------------------
     def test_sign_change(self):
         """
@@ -248,7 +281,37 @@ class UtilsTestCase(unittest.TestCase):
         np.testing.assert_raises(ValueError, utils.reshape_to_divs_years_months, values_1d)
         np.testing.assert_raises(ValueError, utils.reshape_to_divs_years_months, values_2d)
         np.testing.assert_raises(ValueError, utils.reshape_to_divs_years_months, np.reshape(values_2d, (3, 3, 3)))
-        
+
+    #----------------------------------------------------------------------------------------
+    def test_reshape_to_years_steps_cells(self):
+        '''
+        Test for the utils.reshape_to_years_steps_cells() and utils.reshape_from_years_steps_cells() functions
+        '''
+
+        # an array of two cells with five time steps each, i.e. two years of three steps with a partial final year
+        values_2d = np.array([[1, 2, 3, 4, 5],
+                              [6, 7, 8, 9, 10]], dtype=float)
+
+        # the expected rearrangement of the above values from (cells, time) to (years, steps, cells)
+        values_3d_expected = np.array([[[1, 6], [2, 7], [3, 8]],
+                                       [[4, 9], [5, 10], [np.NaN, np.NaN]]])
+
+        # exercise the function
+        values_3d_computed = utils.reshape_to_years_steps_cells(values_2d, 3)
+
+        np.testing.assert_equal(values_3d_computed,
+                                values_3d_expected,
+                                'Not rearranging the 2-D array of time series into (years, steps, cells) as expected')
+
+        # verify that the reverse rearrangement gives back the original array
+        np.testing.assert_equal(utils.reshape_from_years_steps_cells(values_3d_computed, 5),
+                                values_2d,
+                                'Not rearranging the 3-D array back into (cells, time) as expected')
+
+        # make sure that the functions croak with a ValueError whenever they get a mis-shaped array
+        np.testing.assert_raises(ValueError, utils.reshape_to_years_steps_cells, values_2d.flatten(), 3)
+        np.testing.assert_raises(ValueError, utils.reshape_from_years_steps_cells, values_2d, 5)
+
     #----------------------------------------------------------------------------------------
     def test_rmse(self):
         """
@@ -349,6 +412,31 @@ class UtilsTestCase(unittest.TestCase):
         np.testing.assert_raises(TypeError, utils.transform_to_366day, values_365, 1972, 4.9)
         np.testing.assert_raises(ValueError, utils.transform_to_366day, values_365, 1972, 24)
     
+    #----------------------------------------------------------------------------------------
+    def test_transform_calendars_grid(self):
+        '''
+        Test for the utils.transform_to_366day() and utils.transform_to_gregorian() functions with 2-D arrays
+        '''
+        
+        # three cells of daily values for the years 1999 through 2001, i.e. with a single leap year
+        days_gregorian = 365 + 366 + 365
+        values = np.array([np.arange(days_gregorian), 
+                           np.arange(days_gregorian) * 2.0, 
+                           np.full((days_gregorian,), np.NaN)])
+        
+        # make sure that the 366 day years of each cell match those computed for the cell alone
+        values_366 = utils.transform_to_366day(values, 1999, 3)
+        self.assertEqual(values_366.shape, (3, 3 * 366))
+        for cell in range(3):
+            np.testing.assert_equal(values_366[cell], 
+                                    utils.transform_to_366day(values[cell], 1999, 3), 
+                                    'Not transforming the 2-D array of days into 366 day years as expected')
+        
+        # make sure that transforming back to the Gregorian calendar gives the original values
+        np.testing.assert_equal(utils.transform_to_gregorian(values_366, 1999), 
+                                values, 
+                                'Not transforming the 2-D array of 366 day years into Gregorian days as expected')
+
 #--------------------------------------------------------------------------------------------
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,45 @@
+import logging
+import os
+import subprocess
+import sys
+import unittest
+
+import climate_indices
+
+# disable logging messages
+logging.disable(logging.CRITICAL)
+
+#-----------------------------------------------------------------------------------------------------------------------
+class WarmupTestCase(unittest.TestCase):
+    """
+    Tests for the warmup() function of `climate_indices/__init__.py`.
+    """
+    
+    #----------------------------------------------------------------------------------------
+    def test_warmup_invalid_index(self):
+        """
+        Test that the climate_indices.warmup() function rejects unsupported index names
+        """
+        
+        self.assertRaises(ValueError, climate_indices.warmup, ['spi', 'unsupported_value'])
+        
+    #----------------------------------------------------------------------------------------
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork()')
+    def test_warmup_then_fork(self):
+        """
+        Test that a process which forks after the climate_indices.warmup() function 
+        has compiled the Palmer kernels (which include parallel loops) exits cleanly
+        """
+        
+        # warm up and fork in a separate Python process, since a process left unable 
+        # to exit would hang at interpreter shutdown rather than failing
+        code = 'import os, sys; sys.path.insert(0, sys.argv[1]); import climate_indices; ' + \
+               'climate_indices.warmup(["palmers"]); pid = os.fork(); ' + \
+               'os._exit(0) if pid == 0 else os.waitpid(pid, 0)'
+        package_parent = os.path.dirname(os.path.dirname(os.path.abspath(climate_indices.__file__)))
+        completed = subprocess.run([sys.executable, '-c', code, package_parent], timeout=900)
+        self.assertEqual(completed.returncode, 0, 'Process forked after warmup did not exit cleanly')
+        
+#--------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    unittest.main()